@@ -0,0 +1,104 @@
+# aggregates.py
+# Per-city and per-type aggregates materialized from the travel graph at load time
+import json
+import os
+from typing import Dict, Iterable, List
+
+from dataset_io import iter_nodes
+
+DATA_FILE = "vietnam_travel_dataset.json"
+AGGREGATES_FILE = "graph_aggregates.json"
+
+MEMBER_RELATIONS = ("Located_In", "Available_In")
+CITY_RELATION = "Connected_To"
+
+# -----------------------------
+# Build / persist
+# -----------------------------
+def build_aggregates(nodes: Iterable[dict]) -> dict:
+    """Group every node under the city it is Located_In / Available_In.
+
+    One streaming pass: node records are not kept, only the compact member entries
+    and city links, which are resolved once every city has been seen (cities may
+    come after their members in the file). The first record of a repeated id wins.
+    """
+    seen = set()
+    cities = {}
+    types: Dict[str, dict] = {}
+    members, links = [], []
+
+    for node in nodes:
+        node_id = node.get("id")
+        if not node_id or node_id in seen:
+            continue
+        seen.add(node_id)
+        node_type = node.get("type", "Unknown")
+        if node_type == "City":
+            cities[node_id] = {
+                "name": node.get("name", node_id),
+                "region": node.get("region", ""),
+                "best_time_to_visit": node.get("best_time_to_visit", ""),
+                "tags": node.get("tags", []),
+                "connected_to": [],
+                "members": {},
+                "counts": {}
+            }
+        type_agg = types.setdefault(node_type, {"count": 0, "by_city": {}, "by_tag": {}})
+        type_agg["count"] += 1
+        for tag in node.get("tags", []):
+            type_agg["by_tag"][tag] = type_agg["by_tag"].get(tag, 0) + 1
+
+        for rel in node.get("connections", []):
+            relation, target = rel.get("relation"), rel.get("target")
+            if relation in MEMBER_RELATIONS:
+                members.append((target, node_type, {"id": node_id, "name": node.get("name", node_id),
+                                                    "tags": node.get("tags", [])}))
+            elif relation == CITY_RELATION and node_type == "City":
+                links.append((node_id, target))
+    seen.clear()
+
+    for target, node_type, member in members:
+        if target not in cities:
+            continue
+        city = cities[target]
+        city["members"].setdefault(node_type, []).append(member)
+        city["counts"][node_type] = city["counts"].get(node_type, 0) + 1
+        by_city = types[node_type]["by_city"]
+        by_city[target] = by_city.get(target, 0) + 1
+    for source, target in links:
+        if target not in cities:
+            continue
+        # Connections are traversed undirected at query time, so store both ends
+        for a, b in ((source, target), (target, source)):
+            if b not in cities[a]["connected_to"]:
+                cities[a]["connected_to"].append(b)
+
+    city_lookup = {}
+    for city_id, city in cities.items():
+        for alias in city_aliases(city["name"]):
+            city_lookup.setdefault(alias, city_id)
+
+    return {"cities": cities, "types": types, "city_lookup": city_lookup}
+
+def city_aliases(name: str) -> List[str]:
+    """Lower-case spellings a user might type for a city name."""
+    name = name.lower()
+    aliases = {name}
+    for suffix in (" city", " bay", " delta"):
+        if name.endswith(suffix):
+            aliases.add(name[: -len(suffix)])
+    aliases |= {a.replace(" ", "") for a in list(aliases)}
+    if name.startswith("ho chi minh"):
+        aliases |= {"saigon", "hcmc"}
+    return sorted(aliases)
+
+def save_aggregates(aggregates: dict, path=AGGREGATES_FILE):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(aggregates, f, ensure_ascii=False)
+
+def load_aggregates(path=AGGREGATES_FILE, data_file=DATA_FILE) -> dict:
+    """Load materialized aggregates, rebuilding from the dataset if they are missing."""
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return build_aggregates(iter_nodes(data_file))
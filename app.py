@@ -1,25 +1,166 @@
 #!/usr/bin/env python3
 # Fixed Flask Web API for Vietnam Travel Assistant
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, request, jsonify, render_template, stream_with_context
 from flask_cors import CORS
-from sentence_transformers import SentenceTransformer
-from pinecone import Pinecone
-from neo4j import GraphDatabase
 try:
     import config_demo as config
 except ImportError:
     import config
+from attribute_index import AttributeIndex, filtered_query, node_metadata
+from dataset_io import iter_nodes
+from knn_graph import load_knn_graph, KNN_K
+from graph_priors import load_priors, apply_priors, PRIOR_WEIGHT
+from graph_loader import NeighborLoader, PING_QUERY, COUNT_QUERY
+from graph_cache import NeighborhoodCache, META_QUERY, shared_tier_from_env
+from route_index import RouteIndex, CITY_LINKS_QUERY
+from aggregates import load_aggregates
+from intent_router import IntentRouter
+from reranker import CrossEncoderReranker, load_candidate_texts, RERANK_FETCH_K
+from mmr import diversify, mmr_enabled, MMR_LAMBDA, MMR_FETCH_K, MAX_PER_CITY
+from prompts import build_prompt, build_session_prompt
+from sessions import SessionStore
+from deadlines import Deadline, StageCosts, SEARCH_BUDGET_MS, CHAT_BUDGET_MS, timed
+from hedging import HedgedIndex
+from prefetch import Prefetcher, prefetch_plan, pool_key, request_pool_key, rank_pool, POOL_K
+from tiered_cache import TieredCache, cached_encoder, shared_store_from_env, L1_ENTRIES
+from tinylfu import TinyLFUCache
+from prewarm import Prewarmer
+import json_responses
+import os
+import json
 import time
 import threading
 
+# BLUE_ENIGMA_BACKEND=local swaps Pinecone, Neo4j, OpenAI and the embedding model
+# for the deterministic stand-ins in local_backends.py (offline benchmarks / tests)
+LOCAL_BACKENDS = os.environ.get("BLUE_ENIGMA_BACKEND", "").lower() == "local"
+if LOCAL_BACKENDS:
+    from local_backends import build_local_backends
+else:
+    from sentence_transformers import SentenceTransformer
+    from pinecone import Pinecone
+    from neo4j import GraphDatabase, Query
+    from openai import OpenAI
+
 app = Flask(__name__)
 CORS(app)
+json_responses.install(app)  # orjson, gzip/brotli and ETags for every response
+
+DATA_FILE = "vietnam_travel_dataset.json"
+CHAT_MODEL = "gpt-4o-mini"
+LOADING_DELAY = 0.0 if LOCAL_BACKENDS else 0.5  # seconds, lets the UI show its loading state
+# Search projections: "fields" picks place-card keys, "include" the optional sections
+PLACE_FIELDS = ("id", "name", "type", "location", "tags", "score", "rerank_score")
+ID_FIELDS = {"id", "score", "rerank_score"}  # available without Pinecone metadata
+SEARCH_SECTIONS = ("connections",)
 
 # Initialize AI components
 print("🚀 Initializing Vietnam Travel Assistant...")
-model = SentenceTransformer('all-MiniLM-L6-v2')
-pc = Pinecone(api_key=config.PINECONE_API_KEY)
-index = pc.Index(config.PINECONE_INDEX_NAME)
+if LOCAL_BACKENDS:
+    local = build_local_backends(DATA_FILE)
+    model = local["model"]
+    index = local["index"]
+    chat_client = local["chat"]
+    print("🧪 Using local backend stand-ins")
+else:
+    model = SentenceTransformer('all-MiniLM-L6-v2')
+    pc = Pinecone(api_key=config.PINECONE_API_KEY)
+    index = pc.Index(config.PINECONE_INDEX_NAME)
+    chat_client = OpenAI(api_key=config.OPENAI_API_KEY)
+
+# Duplicate vector queries that run past the recent p95 (cuts Pinecone's latency tail)
+index = HedgedIndex(index)
+
+# Local bitmap indexes over the metadata pinecone_upload.py writes
+attr_index = AttributeIndex.from_file(DATA_FILE)
+print(f"✅ Attribute index built for {attr_index.size} places")
+
+# Structural questions are answered from aggregates materialized by load_to_neo4j.py
+aggregates = load_aggregates()
+
+# Query embeddings, search results and LLM answers cached in process (L1) and, with
+# RESULT_CACHE_URLS, in a store shared by all workers (L2, sharded by consistent hashing;
+# kv_server.py locally). Result and answer L1s admit by frequency (W-TinyLFU), so one-off
+# questions don't flush the popular ones.
+result_store = shared_store_from_env()
+embedding_cache = TieredCache("emb", result_store)
+search_cache = TieredCache("search", result_store, l1=TinyLFUCache(L1_ENTRIES))
+answer_cache = TieredCache("answer", result_store, l1=TinyLFUCache(L1_ENTRIES))
+encode = cached_encoder(model.encode, embedding_cache)
+router = IntentRouter(aggregates, encode=encode)
+
+# Optional query trace (JSON lines) for replaying through tinylfu.py or benchmark.py
+QUERY_TRACE_FILE = os.environ.get("QUERY_TRACE_FILE")
+trace_lock = threading.Lock()
+
+def trace_query(endpoint, query):
+    if not QUERY_TRACE_FILE:
+        return
+    try:
+        with trace_lock, open(QUERY_TRACE_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"ts": round(time.time(), 3), "endpoint": endpoint, "query": query}) + "\n")
+    except OSError as e:
+        print(f"⚠️ Query trace write failed: {e}")
+
+# All-pairs city routes for itinerary answers, precomputed from the aggregates
+routes = RouteIndex.from_aggregates(aggregates)
+
+# Multi-turn chat state, keyed by the session_id clients send to /api/chat
+sessions = SessionStore()
+
+# Follow-up context warmed in the background while the LLM answers a session turn
+prefetcher = Prefetcher()
+
+# Neighbor lookups from concurrent requests are coalesced into one batched query per tick
+graph_loader = NeighborLoader(lambda query, params: safe_neo4j_query(query, params, raise_on_failure=True))
+
+# Neighborhoods served from memory until load_to_neo4j.py bumps the graph version or
+# publishes changed nodes (shared between workers through GRAPH_CACHE_REDIS_URL or the
+# result cache's shards)
+def read_graph_meta():
+    records = safe_neo4j_query(META_QUERY)
+    return dict(records[0]) if records else None
+
+graph_cache = NeighborhoodCache(read_graph_meta, shared=shared_tier_from_env(result_store))
+
+def sync_routes(changed):
+    """Apply the loaders' change feed to the route index: re-read the Connected_To links
+    of changed cities (every city after a new version) and patch the edges in place"""
+    city_ids = list(routes.positions) if changed is None else [c for c in changed if c in routes.positions]
+    if not city_ids:
+        return
+    # raise rather than read an outage as "no links", which would delete every edge
+    records = safe_neo4j_query(CITY_LINKS_QUERY, {"ids": city_ids}, raise_on_failure=True)
+    updated = routes.sync_links({r["cid"]: r["links"] for r in records})
+    if updated:
+        print(f"🔄 Route index: {updated} city connections changed")
+
+graph_cache.add_listener(sync_routes)
+
+# Typical stage durations, used to decide which optional stages fit a request's budget
+stage_costs = StageCosts()
+
+# PageRank / degree priors computed by load_to_neo4j.py, used to order results
+priors = load_priors(data_file=DATA_FILE)
+
+# Optional cross-encoder reranking between Pinecone and graph expansion
+reranker = None
+if not LOCAL_BACKENDS:
+    try:
+        reranker = CrossEncoderReranker(load_candidate_texts(DATA_FILE))
+        print("✅ Cross-encoder reranker loaded")
+    except Exception as e:
+        print(f"⚠️ Reranker disabled: {e}")
+
+# Precomputed "more like this" neighbors (knn_graph.py), built on first start if missing
+place_meta = {}
+knn_graph = None
+try:
+    place_meta = {node["id"]: node_metadata(node) for node in iter_nodes(DATA_FILE)}
+    knn_graph = load_knn_graph(data_file=DATA_FILE, encoder=model, save=not LOCAL_BACKENDS)
+    print(f"✅ kNN graph loaded for {len(knn_graph)} places")
+except Exception as e:
+    print(f"⚠️ Similar-places lookup disabled: {e}")
 
 # Neo4j driver with better connection management
 driver = None
@@ -32,33 +173,50 @@ def get_neo4j_driver():
     with driver_lock:
         if driver is None:
             try:
-                driver = GraphDatabase.driver(
-                    config.NEO4J_URI, 
-                    auth=(config.NEO4J_USER, config.NEO4J_PASSWORD),
-                    max_connection_lifetime=300,  # 5 minutes
-                    max_connection_pool_size=5,
-                    connection_acquisition_timeout=30
-                )
+                if LOCAL_BACKENDS:
+                    driver = local["driver"]
+                else:
+                    driver = GraphDatabase.driver(
+                        config.NEO4J_URI, 
+                        auth=(config.NEO4J_USER, config.NEO4J_PASSWORD),
+                        max_connection_lifetime=300,  # 5 minutes
+                        max_connection_pool_size=5,
+                        connection_acquisition_timeout=30
+                    )
                 print("✅ Neo4j driver initialized")
             except Exception as e:
                 print(f"❌ Failed to create Neo4j driver: {e}")
                 return None
         return driver
 
-def safe_neo4j_query(query, parameters=None):
-    """Execute Neo4j query with proper error handling and reconnection"""
+def safe_neo4j_query(query, parameters=None, deadline=None, raise_on_failure=False):
+    """Execute Neo4j query with proper error handling and reconnection.
+    With a deadline the query is bounded by the time left and retries stop once it
+    can no longer cover the wait. Failures return [] unless raise_on_failure is set
+    (callers that cache results must not mistake an outage for an empty answer)."""
     neo4j_driver = get_neo4j_driver()
     if not neo4j_driver:
+        if raise_on_failure:
+            raise RuntimeError("Neo4j driver unavailable")
         return []
     
     max_retries = 3
     for attempt in range(max_retries):
+        if deadline is not None and deadline.expired():
+            deadline.degrade("graph", "timeout")
+            return []
         try:
             with neo4j_driver.session() as session:
-                result = session.run(query, parameters or {})
+                if deadline is not None and not LOCAL_BACKENDS:
+                    result = session.run(Query(query, timeout=deadline.remaining_s()), parameters or {})
+                else:
+                    result = session.run(query, parameters or {})
                 return list(result)
         except Exception as e:
             print(f"Neo4j query attempt {attempt + 1} failed: {e}")
+            if deadline is not None and deadline.remaining_ms() < 1000:
+                deadline.degrade("graph", "error")
+                return []
             if attempt < max_retries - 1:
                 time.sleep(1)  # Wait before retry
                 # Reset driver on connection errors
@@ -73,98 +231,752 @@ def safe_neo4j_query(query, parameters=None):
                             driver = None
             else:
                 print(f"❌ Neo4j query failed after {max_retries} attempts")
+                if raise_on_failure:
+                    raise
                 return []
 
-def search_vietnam_api(query_text, top_k=5):
-    """Search function for API endpoint"""
+def structural_response(query_text, structural):
+    """Format an aggregate-backed answer like a regular search response"""
+    city = aggregates["cities"].get(structural["city"] or "", {})
+    places = [
+        {
+            "id": item["id"],
+            "name": item["name"],
+            "type": structural["type"] or "Unknown",
+            "location": city.get("name", "Unknown"),
+            "tags": item.get("tags", []),
+            "score": 1.0
+        }
+        for item in structural["results"]
+    ]
+    return {
+        "success": True,
+        "query": query_text,
+        "results": places,
+        "connections": [],
+        "total_found": structural.get("count", len(places)),
+        "answer": structural["answer"],
+        "route": structural["intent"]
+    }
+
+def retrieve_matches(query_text, top_k=5, filters=None, rerank=True,
+                     mmr_lambda=MMR_LAMBDA, max_per_city=MAX_PER_CITY, timings=None, pool=None,
+                     deadline=None, metadata=True, narrow=None):
+    """Route the query, then run vector retrieval, reranking and MMR.
+
+    Reranking is skipped or shortened when `deadline` (deadlines.Deadline) runs low.
+    With metadata=False Pinecone returns ids and scores only (the MMR city cap still
+    fetches the metadata it needs).
+
+    `pool` is a prefetched candidate set holding every node that matches `filters`;
+    it is ranked locally instead of querying Pinecone. `narrow` holds filters implied
+    by the question (router slots); unlike `filters` they do not skip routing, and they
+    constrain the vector search whether or not a pool was prefetched. The filters
+    actually applied are reported in info["plan"].
+
+    Returns (structural_answer, matches, info); structural_answer is None for
+    open questions.
+    """
+    timings = {} if timings is None else timings
+
+    # Route structural lookups to precomputed aggregates (explicit filters skip routing)
+    with timed(timings, "route"):
+        route = None if filters else router.classify(query_text)
+        structural = router.answer(route) if route else None
+    info = {"route": route["intent"] if route else "filtered",
+            "plan": {"filters": filters or narrow or {}, "narrowed": bool(narrow and not filters)}}
+    if structural:
+        return structural, [], info
+
+    # Get embeddings (reusing the router's) and search Pinecone, constrained by any metadata filters
+    with timed(timings, "embed"):
+        vec = route["vector"] if route and route["vector"] is not None else encode([query_text])[0]
+        vec = vec.tolist()
+    info["vector"] = vec
+    use_rerank = rerank and reranker is not None
+    use_mmr = mmr_enabled(mmr_lambda, max_per_city)
+    pool_k = max(top_k, MMR_FETCH_K) if use_mmr else top_k
+    fetch_k = max(pool_k, RERANK_FETCH_K) if use_rerank else pool_k
+    info["metadata"] = metadata or bool(use_mmr and max_per_city)
+    with timed(timings, "vector"):
+        if pool is not None:
+            matches, info["filter_plan"] = rank_pool(vec, pool, fetch_k), "prefetched"
+        else:
+            matches, info["filter_plan"] = filtered_query(index, vec, fetch_k, info["plan"]["filters"] or None,
+                                                          attr_index,
+                                                          include_values=use_mmr,
+                                                          include_metadata=info["metadata"])
+
+    # Rerank the over-fetched candidates, falling back to vector order past the latency budget
+    info["rerank"] = "off"
+    if use_rerank and deadline is not None and not deadline.allows("rerank"):
+        info["rerank"] = "skipped_budget"
+        deadline.degrade("rerank", "skipped")
+    elif use_rerank:
+        budget_ms = deadline.remaining_ms() if deadline is not None else None
+        with timed(timings, "rerank"):
+            matches, info["rerank"] = reranker.rerank(query_text, matches, pool_k, budget_ms)
+        if deadline is not None and info["rerank"].startswith("fallback"):
+            deadline.degrade("rerank", info["rerank"])
+
+    # Drop near-duplicates (same templated text / same city) with MMR
+    if use_mmr:
+        with timed(timings, "mmr"):
+            matches = diversify(vec, matches, top_k, mmr_lambda, max_per_city)
+
+    # Nudge the final order towards well-connected places (precomputed, no graph round trip)
+    with timed(timings, "prior"):
+        matches = apply_priors(matches[:top_k], priors, PRIOR_WEIGHT)
+    return None, matches, info
+
+def format_places(matches, fields=None):
+    """Place cards for vector matches, limited to `fields` when given"""
+    places = []
+    for match in matches:
+        meta = match.get("metadata") or {}
+        score = match.get("score", 0)
+        place = {
+            "id": match["id"],
+            "name": meta.get('name', 'Unknown'),
+            "type": meta.get('type', 'Unknown'),
+            "location": meta.get('city', 'Unknown'),
+            "tags": meta.get('tags', []),
+            "score": round(score, 3)
+        }
+        if match.get("rerank_score") is not None:
+            place["rerank_score"] = match["rerank_score"]
+        places.append(project_place(place, fields))
+    return places
+
+def project_place(place, fields=None):
+    return place if fields is None else {k: v for k, v in place.items() if k in fields}
+
+def needs_metadata(fields):
+    """Whether the requested place fields need Pinecone metadata (names, types, cities, tags)"""
+    return fields is None or not set(fields) <= ID_FIELDS
+
+def format_connections(nid, rows):
+    """Top graph connections of one result (rows come in centrality order)"""
+    return [{
+        "from": nid,
+        "to": record["name"],
+        "relationship": record["relationship"],
+        "type": record["type"]
+    } for record in rows[:3]]
+
+def stream_search(query_text, top_k=5, filters=None, rerank=True,
+                  mmr_lambda=MMR_LAMBDA, max_per_city=MAX_PER_CITY, deadline=None,
+                  fields=None, include=SEARCH_SECTIONS):
+    """Search as a sequence of events: "results" (place cards) as soon as retrieval is
+    done, one "connections" event per node as its graph lookup completes, then "done"
+    with timings and time_to_first_result_ms ("error" on failure).
+
+    The plan is pruned to the projection: without "connections" in `include` the graph
+    stage never runs, and `fields` that need only ids and scores skip Pinecone metadata."""
+    timings = {}
+    start = time.perf_counter()
+    deadline = deadline or Deadline(SEARCH_BUDGET_MS, stage_costs)
+    with_connections = "connections" in include
     try:
-        # Get embeddings and search Pinecone
-        vec = model.encode([query_text])[0].tolist()
-        results = index.query(
-            vector=vec, 
-            top_k=top_k, 
-            include_metadata=True,
-            include_values=False
-        )
-        
-        # Format results
-        places = []
-        node_ids = []
-        
-        for match in results["matches"]:
-            meta = match["metadata"]
-            score = match.get("score", 0)
-            place = {
-                "id": match["id"],
-                "name": meta.get('name', 'Unknown'),
-                "type": meta.get('type', 'Unknown'),
-                "location": meta.get('city', 'Unknown'),
-                "tags": meta.get('tags', []),
-                "score": round(score, 3)
+        structural, matches, info = retrieve_matches(query_text, top_k, filters, rerank,
+                                                     mmr_lambda, max_per_city, timings,
+                                                     deadline=deadline, metadata=needs_metadata(fields))
+        if structural:
+            first_result_ms = round((time.perf_counter() - start) * 1000, 2)
+            result = dict(structural_response(query_text, structural), event="results")
+            result["results"] = [project_place(place, fields) for place in result["results"]]
+            result["plan"] = {"source": "aggregates", "metadata": False, "graph": "skipped"}
+            if not with_connections:
+                del result["connections"]
+            yield result
+        else:
+            places = format_places(matches, fields)
+            first_result_ms = round((time.perf_counter() - start) * 1000, 2)
+            result = {
+                "event": "results",
+                "success": True,
+                "query": query_text,
+                "results": places,
+                "total_found": len(places),
+                "filters": filters or {},
+                "filter_plan": info["filter_plan"],
+                "rerank": info["rerank"],
+                "route": info["route"],
+                "plan": {"source": "index", "metadata": info["metadata"],
+                         "graph": "on" if with_connections else "skipped"}
             }
-            places.append(place)
-            node_ids.append(match["id"])
+            if with_connections:
+                result["connections"] = []
+            yield result
+            
+            # Graph connections for the top 3, batched with concurrent requests' lookups
+            if with_connections:
+                graph_start = time.perf_counter()
+                node_ids = [match["id"] for match in matches[:3]]
+                for nid, rows in iter_neighbors(node_ids, deadline, loader=graph_loader.scope()):
+                    yield {"event": "connections", "from": nid, "connections": format_connections(nid, rows)}
+                timings["graph"] = round((time.perf_counter() - graph_start) * 1000, 2)
+        timings["total"] = round((time.perf_counter() - start) * 1000, 2)
+        if not structural:
+            stage_costs.observe(timings, skip=deadline.degraded)
+        yield {
+            "event": "done",
+            "success": True,
+            "timings": timings,
+            "time_to_first_result_ms": first_result_ms,
+            "deadline": deadline.report()
+        }
         
-        # Get graph connections with safe query
-        connections = []
-        for nid in node_ids[:3]:  # Top 3 only
-            query = (
-                "MATCH (n:Entity {id:$nid})-[r]-(m:Entity) "
-                "RETURN m.name AS name, m.id AS id, type(r) AS relationship, m.type AS type "
-                "LIMIT 3"
-            )
-            records = safe_neo4j_query(query, {"nid": nid})
-            for record in records:
-                connections.append({
-                    "from": nid,
-                    "to": record["name"],
-                    "relationship": record["relationship"],
-                    "type": record["type"]
-                })
+    except Exception as e:
+        print(f"Search error: {e}")
+        yield {
+            "event": "error",
+            "success": False,
+            "error": str(e),
+            "query": query_text
+        }
+
+def fold_event(result, event):
+    """Merge one stream_search event into a single search response"""
+    event = dict(event)
+    kind = event.pop("event")
+    if kind == "connections":
+        result["connections"].extend(event["connections"])
+    else:
+        event.pop("time_to_first_result_ms", None)
+        result.update(event)
+    return result
+
+def search_vietnam_api(query_text, top_k=5, filters=None, rerank=True,
+                       mmr_lambda=MMR_LAMBDA, max_per_city=MAX_PER_CITY, deadline=None,
+                       fields=None, include=SEARCH_SECTIONS):
+    """Search function for API endpoint"""
+    result = {}
+    for event in stream_search(query_text, top_k, filters, rerank, mmr_lambda, max_per_city, deadline,
+                               fields, include):
+        fold_event(result, event)
+    return result
+
+def search_cache_key(query_text, top_k=5, filters=None, rerank=True,
+                     mmr_lambda=MMR_LAMBDA, max_per_city=MAX_PER_CITY, fields=None, include=SEARCH_SECTIONS):
+    """Keys include the graph version, so loader invalidations also retire cached results"""
+    graph_cache.refresh()
+    return [query_text, top_k, filters or {}, rerank, mmr_lambda, max_per_city, graph_cache.snapshot(),
+            sorted(fields) if fields is not None else None, sorted(include)]
+
+def cacheable_search(result):
+    """Failed or deadline-degraded results are not cached"""
+    return bool(result.get("success")) and not result.get("deadline", {}).get("degraded")
+
+def cached_search(query_text, top_k=5, filters=None, rerank=True,
+                  mmr_lambda=MMR_LAMBDA, max_per_city=MAX_PER_CITY, deadline=None,
+                  fields=None, include=SEARCH_SECTIONS):
+    """search_vietnam_api through the result cache; "cache" says which tier answered.
+    Answers from the cache report their own lookup time instead of the original
+    pipeline timings."""
+    start = time.perf_counter()
+    key = search_cache_key(query_text, top_k, filters, rerank, mmr_lambda, max_per_city, fields, include)
+    result, source = search_cache.get_or_compute(
+        key,
+        lambda: search_vietnam_api(query_text, top_k, filters, rerank, mmr_lambda, max_per_city, deadline,
+                                   fields, include),
+        cacheable=cacheable_search)
+    if source == "computed":
+        return dict(result, cache=source)
+    elapsed = round((time.perf_counter() - start) * 1000, 2)
+    return dict(result, cache=source, timings={"cache": elapsed, "total": elapsed})
+
+def cached_search_events(query_text, top_k=5, filters=None, rerank=True,
+                         mmr_lambda=MMR_LAMBDA, max_per_city=MAX_PER_CITY, deadline=None, use_cache=True,
+                         fields=None, include=SEARCH_SECTIONS):
+    """stream_search through the result cache: a cached result is replayed as the same
+    events, and a streamed result is cached once complete"""
+    start = time.perf_counter()
+    key = search_cache_key(query_text, top_k, filters, rerank, mmr_lambda, max_per_city,
+                           fields, include) if use_cache else None
+    cached, source = search_cache.get(key) if key is not None else (None, None)
+    if cached is not None:
+        head = {k: v for k, v in cached.items() if k not in ("timings", "deadline", "cache")}
+        if "connections" in head:
+            head["connections"] = []
+        yield dict(head, event="results")
+        first_result_ms = round((time.perf_counter() - start) * 1000, 2)
+        by_node = {}
+        for connection in cached.get("connections", []):
+            by_node.setdefault(connection["from"], []).append(connection)
+        for nid, connections in by_node.items():
+            yield {"event": "connections", "from": nid, "connections": connections}
+        elapsed = round((time.perf_counter() - start) * 1000, 2)
+        yield {"event": "done", "success": True, "cache": source, "timings": {"cache": elapsed, "total": elapsed},
+               "time_to_first_result_ms": first_result_ms, "deadline": cached.get("deadline")}
+        return
+    result = {}
+    for event in stream_search(query_text, top_k, filters, rerank, mmr_lambda, max_per_city, deadline,
+                               fields, include):
+        fold_event(result, event)
+        if event["event"] == "done" and key is not None:
+            event = dict(event, cache="computed")
+        yield event
+    if key is not None and cacheable_search(result):
+        search_cache.put(key, result)
+
+def trending_searches(n=10):
+    """Most frequent searches right now (decayed counts), merged across cache keys"""
+    merged = {}
+    for item in search_cache.trending(n * 2):
+        query_text, filters = item["key"][0], item["key"][2]
+        key = json.dumps([query_text, filters], sort_keys=True)
+        entry = merged.setdefault(key, {"query": query_text, "filters": filters, "count": 0})
+        entry["count"] += item["count"]
+    return sorted(merged.values(), key=lambda e: -e["count"])[:n]
+
+def iter_neighbors(node_ids, deadline=None, reserve_ms=0.0, loader=None):
+    """(node id, neighbor rows) in centrality order, as they become available: cached
+    neighborhoods first, then each batched lookup as it completes.
+    Graph expansion is optional: with a deadline it is skipped when the budget (minus
+    reserve_ms for later stages) can't cover it, and ids that don't answer in time are
+    left out"""
+    loader = loader or graph_loader
+    graph_cache.refresh()
+    cached = graph_cache.get_many(node_ids)
+    yield from cached.items()
+    missing = [nid for nid in dict.fromkeys(node_ids) if nid not in cached]
+    if not missing:
+        return
+    timeout = None
+    if deadline is not None:
+        if not deadline.allows("graph", reserve_ms):
+            deadline.degrade("graph", "skipped" if not cached else "partial")
+            return
+        timeout = max(deadline.remaining_ms() - reserve_ms, 0) / 1000
+    snapshot = graph_cache.snapshot()
+    fetched = 0
+    for nid, rows in loader.load_iter(missing, timeout):
+        graph_cache.put_many({nid: rows}, snapshot)
+        fetched += 1
+        yield nid, rows
+    if deadline is not None and fetched < len(missing):
+        deadline.degrade("graph", "partial" if cached or fetched else "timeout")
+
+def load_neighbors(node_ids, deadline=None, reserve_ms=0.0, loader=None):
+    """node id -> neighbor rows through the cache and the batching loader (see iter_neighbors)"""
+    return dict(iter_neighbors(node_ids, deadline, reserve_ms, loader))
+
+def fetch_graph_facts(node_ids, deadline=None, reserve_ms=0.0, loader=None):
+    """Neighboring nodes for the chat prompt (same shape as hybrid_chat.fetch_graph_context)"""
+    neighborhoods = fetch_graph_neighborhoods(node_ids, deadline, reserve_ms, loader)
+    return [f for nid in node_ids for f in neighborhoods.get(nid, [])]
+
+def fetch_graph_neighborhoods(node_ids, deadline=None, reserve_ms=0.0, loader=None):
+    """node id -> graph facts; ids the deadline left no time for are missing"""
+    neighborhoods = {}
+    for nid, records in load_neighbors(node_ids, deadline, reserve_ms, loader).items():
+        facts = neighborhoods[nid] = []
+        for r in records:
+            facts.append({
+                "source": nid,
+                "rel": r["rel"],
+                "target_id": r["id"],
+                "target_name": r["name"],
+                "target_desc": (r["description"] or "")[:400],
+                "labels": r["labels"]
+            })
+    return neighborhoods
+
+def schedule_prefetch(session, vector, matches, facts):
+    """Warm what a follow-up is likely to ask about while the LLM answers this turn:
+    2-hop neighborhoods, hub hotels / activities and their (city, type) vector pools"""
+    nodes, pools = prefetch_plan(matches, facts, aggregates, priors, known=session.facts)
+    for nid in nodes:
+        prefetcher.schedule(session.id, ("graph", nid), lambda nid=nid: prefetch_graph_facts(nid))
+    for city_id, node_type in pools:
+        # Pools hold every member of the (city, type), so any query vector fetches the same set
+        filters = {"city": [aggregates["cities"][city_id]["name"]], "type": [node_type]}
+        prefetcher.schedule(session.id, pool_key(city_id, node_type), lambda filters=filters: filtered_query(
+            index, vector, POOL_K, filters, attr_index, include_values=True)[0])
+
+def prefetch_graph_facts(nid):
+    """(graph cache snapshot, facts); the snapshot is taken before the read so a take()
+    after a version or changelog bump can tell the facts are stale"""
+    graph_cache.refresh()
+    return graph_cache.snapshot(), fetch_graph_facts([nid])
+
+def current_snapshot(warmed):
+    return warmed[0] == graph_cache.snapshot()
+
+def call_chat(prompt_messages, timeout=None):
+    """Call the chat model"""
+    options = {"timeout": timeout} if timeout is not None else {}
+    resp = chat_client.chat.completions.create(
+        model=CHAT_MODEL,
+        messages=prompt_messages,
+        max_tokens=600,
+        temperature=0.2,
+        **options
+    )
+    return resp.choices[0].message.content
+
+def partial_answer(matches):
+    """Answer from retrieval alone, used when the LLM call does not fit the budget"""
+    if not matches:
+        return "No matching places found."
+    lines = []
+    for m in matches:
+        meta = m.get("metadata") or {}
+        place = f", {meta['city']}" if meta.get("city") else ""
+        lines.append(f"- {meta.get('name', m['id'])} ({meta.get('type', '')}{place}) [{m['id']}]")
+    return "Top matches for your question:\n" + "\n".join(lines)
+
+def generate_answer(prompt, matches, timings, deadline):
+    """LLM answer bounded by the deadline; degrades to the match list when it can't fit"""
+    if not deadline.allows("llm"):
+        deadline.degrade("llm", "skipped")
+        return partial_answer(matches)
+    start = time.perf_counter()
+    try:
+        answer, source = answer_cache.get_or_compute(
+            [CHAT_MODEL, prompt], lambda: call_chat(prompt, timeout=deadline.remaining_s()))
+    except Exception as e:
+        timings["llm"] = round((time.perf_counter() - start) * 1000, 2)
+        if not deadline.expired():
+            raise
+        print(f"⚠️ LLM call cut off by the request deadline: {e}")
+        deadline.degrade("llm", "timeout")
+        return partial_answer(matches)
+    # cached answers are timed separately so they don't lower the learned LLM cost
+    stage = "llm" if source == "computed" else "answer_cache"
+    timings[stage] = round((time.perf_counter() - start) * 1000, 2)
+    return answer
+
+def chat_vietnam_api(query_text, top_k=5, filters=None, deadline=None):
+    """Hybrid answer: retrieval, graph facts and an LLM call"""
+    timings = {}
+    start = time.perf_counter()
+    deadline = deadline or Deadline(CHAT_BUDGET_MS, stage_costs)
+    try:
+        structural, matches, info = retrieve_matches(query_text, top_k, filters, timings=timings,
+                                                     deadline=deadline)
+        itinerary = None
+        if structural:
+            answer = structural["answer"]
+            sources = [item["id"] for item in structural["results"]]
+        else:
+            with timed(timings, "graph"):
+                facts = fetch_graph_facts([m["id"] for m in matches], deadline,
+                                          stage_costs.estimate("llm"), graph_loader.scope())
+            with timed(timings, "itinerary"):
+                itinerary = routes.route_for(query_text, matches)
+            prompt = build_prompt(query_text, matches, facts,
+                                  routes.describe(itinerary) if itinerary else None)
+            answer = generate_answer(prompt, matches, timings, deadline)
+            sources = [m["id"] for m in matches]
+        timings["total"] = round((time.perf_counter() - start) * 1000, 2)
+        stage_costs.observe(timings, skip=deadline.degraded)
         
         return {
             "success": True,
             "query": query_text,
-            "results": places,
-            "connections": connections,
-            "total_found": len(places)
+            "response": answer,
+            "sources": sources,
+            "itinerary": itinerary,
+            "route": info["route"],
+            "timings": timings,
+            "deadline": deadline.report()
         }
         
     except Exception as e:
-        print(f"Search error: {e}")
+        print(f"Chat error: {e}")
         return {
             "success": False,
             "error": str(e),
             "query": query_text
         }
 
+def chat_session_turn(session, query_text, top_k=5, filters=None, deadline=None):
+    """One turn of a multi-turn conversation: only neighborhoods the session has not
+    fetched yet hit Neo4j, and the prompt carries only context the model has not seen"""
+    timings = {}
+    start = time.perf_counter()
+    deadline = deadline or Deadline(CHAT_BUDGET_MS, stage_costs)
+    try:
+        with session.lock:
+            slots = router.extract_slots(query_text)
+            city = aggregates["cities"].get(slots["city"] or "", {}).get("name")
+            retrieval_query = session.contextualize(query_text, city)
+            if retrieval_query != query_text:
+                slots = router.extract_slots(retrieval_query)
+            # The previous turn's prefetch may already hold this candidate pool
+            prefetcher.cancel(session.id)
+            key = request_pool_key(filters, aggregates["city_lookup"])
+            pool = prefetcher.take(key) if key else None
+            narrow = None if filters else router.implied_filters(slots)
+            structural, matches, info = retrieve_matches(retrieval_query, top_k, filters,
+                                                         timings=timings, pool=pool, deadline=deadline,
+                                                         narrow=narrow)
+            itinerary = None
+            reused = fetched = 0
+            unfetched = []
+            if structural:
+                answer = structural["answer"]
+                sources = [item["id"] for item in structural["results"]]
+                session.record_turn(query_text, query_text, answer, [])
+            else:
+                ids = [m["id"] for m in matches]
+                missing = session.missing_neighborhoods(ids)
+                reused, fetched = len(ids) - len(missing), len(missing)
+                with timed(timings, "graph"):
+                    facts, unfetched = [], []
+                    graph_cache.refresh()
+                    for nid in missing:
+                        warmed = prefetcher.take(("graph", nid), accept=current_snapshot)
+                        if warmed is None:
+                            unfetched.append(nid)
+                        else:
+                            facts.extend(warmed[1])
+                    neighborhoods = fetch_graph_neighborhoods(unfetched, deadline, stage_costs.estimate("llm"),
+                                                              graph_loader.scope())
+                    facts += [f for nid in unfetched for f in neighborhoods.get(nid, [])]
+                # Neighborhoods the deadline skipped stay missing so a later turn fetches them
+                skipped = {nid for nid in unfetched if nid not in neighborhoods}
+                session.add_context(matches, facts, [nid for nid in ids if nid not in skipped])
+                schedule_prefetch(session, info["vector"], matches, facts)
+                new_matches, new_facts, known = session.split_context(ids)
+                with timed(timings, "itinerary"):
+                    itinerary = routes.route_for(retrieval_query, matches)
+                prompt = build_session_prompt(query_text, new_matches, new_facts, session.history(),
+                                              session.summary, known,
+                                              routes.describe(itinerary) if itinerary else None)
+                answer = generate_answer(prompt, matches, timings, deadline)
+                # Only context that went out complete counts as seen; skipped ids are resent with their facts
+                session.record_turn(query_text, prompt[-1]["content"], answer,
+                                    [m["id"] for m in new_matches if m["id"] not in skipped])
+                sources = ids
+        timings["total"] = round((time.perf_counter() - start) * 1000, 2)
+        
+        return {
+            "success": True,
+            "query": query_text,
+            "session_id": session.id,
+            "response": answer,
+            "sources": sources,
+            "itinerary": itinerary,
+            "context": {"reused_neighborhoods": reused, "fetched_neighborhoods": fetched,
+                        "prefetched_neighborhoods": fetched - len(unfetched), "turn": session.turn_no},
+            "route": info["route"],
+            "plan": info["plan"],
+            "timings": timings,
+            "deadline": deadline.report()
+        }
+        
+    except Exception as e:
+        print(f"Chat error: {e}")
+        return {
+            "success": False,
+            "error": str(e),
+            "query": query_text,
+            "session_id": session.id
+        }
+
+# Suggestion-chip queries run through the full pipeline at startup and every
+# PREWARM_INTERVAL_S; /api/ready reports 503 until the first pass is done.
+# PREWARM=0 turns it off (off by default with the local stand-ins).
+prewarmer = Prewarmer(search=lambda query, filters: cached_search(query, filters=filters),
+                      chat=lambda query, filters: chat_vietnam_api(query, filters=filters),
+                      encode=model.encode, trending=trending_searches)
+if os.environ.get("PREWARM", "0" if LOCAL_BACKENDS else "1") != "0":
+    prewarmer.start()
+else:
+    prewarmer.skip()
+
 @app.route('/')
 def home():
     """Serve the main page"""
     return render_template('index.html')
 
+def parse_search_request(data):
+    """(search kwargs, None) or (None, error message) for a /api/search body"""
+    query = (data.get('query') or '').strip()
+    if not query:
+        return None, "Query is required"
+    
+    # Optional metadata filters, e.g. {"type": "Hotel", "city": "Hoi An"}
+    try:
+        filters = attr_index.normalize_filters(data.get('filters') or {})
+    except ValueError as e:
+        return None, str(e)
+    
+    # Optional diversification controls
+    try:
+        mmr_lambda = float(data.get('mmr_lambda', MMR_LAMBDA))
+        max_per_city = data.get('max_per_city', MAX_PER_CITY)
+        max_per_city = int(max_per_city) if max_per_city else None
+    except (TypeError, ValueError):
+        return None, "mmr_lambda and max_per_city must be numbers"
+    if not 0.0 <= mmr_lambda <= 1.0:
+        return None, "mmr_lambda must be between 0 and 1"
+    
+    # Optional latency budget in ms; optional stages are degraded to stay within it
+    try:
+        deadline = Deadline.from_request(data.get('budget_ms'), SEARCH_BUDGET_MS, stage_costs)
+    except (TypeError, ValueError):
+        return None, "budget_ms must be a number"
+    
+    # Optional projection, e.g. {"fields": ["id", "name", "score"], "include": []}
+    try:
+        fields = parse_names(data.get('fields'), None)
+        include = parse_names(data.get('include'), SEARCH_SECTIONS)
+    except TypeError:
+        return None, "fields and include must be lists or comma-separated strings"
+    unknown = sorted(set(fields or ()) - set(PLACE_FIELDS)) + sorted(set(include) - set(SEARCH_SECTIONS))
+    if unknown:
+        return None, f"Unknown fields or sections: {', '.join(map(str, unknown))}"
+    
+    try:
+        rerank = parse_flag(data.get('rerank'), True)
+    except ValueError:
+        return None, "rerank must be a boolean"
+    
+    return {"query_text": query, "filters": filters, "rerank": rerank,
+            "mmr_lambda": mmr_lambda, "max_per_city": max_per_city, "deadline": deadline,
+            "fields": fields, "include": include}, None
+
+def parse_flag(value, default):
+    """JSON boolean (or "true" / "false" style string) -> bool; ValueError otherwise"""
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ("true", "1", "yes", "on"):
+        return True
+    if text in ("false", "0", "no", "off"):
+        return False
+    raise ValueError(value)
+
+def parse_names(value, default):
+    """List or comma-separated string -> tuple of names (default when absent)"""
+    if value is None:
+        return default
+    if isinstance(value, str):
+        value = value.split(",")
+    return tuple(str(v).strip() for v in value if str(v).strip())
+
 @app.route('/api/search', methods=['POST'])
 def api_search():
     """API endpoint for search"""
-    data = request.get_json()
-    query = data.get('query', '').strip()
+    # Add small delay to show loading effect (before the request's latency budget starts)
+    time.sleep(LOADING_DELAY)
+    
+    data = request.get_json() or {}
+    params, error = parse_search_request(data)
+    if error:
+        return jsonify({"success": False, "error": error}), 400
+    
+    # "cache": false runs the full pipeline (e.g. benchmark.py --body '{"cache": false}')
+    try:
+        use_cache = parse_flag(data.get('cache'), True)
+    except ValueError:
+        return jsonify({"success": False, "error": "cache must be a boolean"}), 400
+    search = cached_search if use_cache else search_vietnam_api
+    trace_query("search", params["query_text"])
+    return jsonify(search(**params))
+
+@app.route('/api/search/stream', methods=['POST'])
+def api_search_stream():
+    """Streaming search: newline-delimited JSON events, so place cards render before
+    graph connections are ready ("results", then "connections" per node, then "done")"""
+    data = request.get_json() or {}
+    params, error = parse_search_request(data)
+    if error:
+        return jsonify({"success": False, "error": error}), 400
+    try:
+        use_cache = parse_flag(data.get('cache'), True)
+    except ValueError:
+        return jsonify({"success": False, "error": "cache must be a boolean"}), 400
+    trace_query("search", params["query_text"])
+    
+    def generate():
+        for event in cached_search_events(use_cache=use_cache, **params):
+            yield json_responses.dumps(event) + b"\n"
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route('/api/chat', methods=['POST'])
+def api_chat():
+    """API endpoint for hybrid chat answers"""
+    data = request.get_json() or {}
+    query = (data.get('query') or '').strip()
     
     if not query:
         return jsonify({"success": False, "error": "Query is required"}), 400
     
-    # Add small delay to show loading effect
-    time.sleep(0.5)
+    try:
+        filters = attr_index.normalize_filters(data.get('filters') or {})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    
+    try:
+        deadline = Deadline.from_request(data.get('budget_ms'), CHAT_BUDGET_MS, stage_costs)
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "error": "budget_ms must be a number"}), 400
+    
+    trace_query("chat", query)
     
-    result = search_vietnam_api(query)
+    # Sending "session_id" (null to start one) makes the request part of a conversation
+    if 'session_id' in data:
+        result = chat_session_turn(sessions.get(data['session_id']), query, filters=filters, deadline=deadline)
+    else:
+        result = chat_vietnam_api(query, filters=filters, deadline=deadline)
     return jsonify(result)
 
+@app.route('/api/chat/<session_id>', methods=['DELETE'])
+def end_chat_session(session_id):
+    """Forget a conversation"""
+    prefetcher.cancel(session_id)
+    return jsonify({"success": sessions.end(session_id), "session_id": session_id})
+
+@app.route('/api/similar/<node_id>', methods=['GET'])
+def api_similar(node_id):
+    """Places most similar to a result card, from the precomputed kNN graph"""
+    if knn_graph is None:
+        return jsonify({"success": False, "error": "Similar places are not available"}), 503
+    if node_id not in knn_graph:
+        return jsonify({"success": False, "error": f"Unknown place '{node_id}'"}), 404
+    
+    top_k = request.args.get('top_k', KNN_K, type=int)
+    places = []
+    for neighbor_id, score in knn_graph.similar(node_id, max(1, min(top_k, KNN_K))):
+        meta = place_meta.get(neighbor_id, {})
+        places.append({
+            "id": neighbor_id,
+            "name": meta.get('name', 'Unknown'),
+            "type": meta.get('type', 'Unknown'),
+            "location": meta.get('city', 'Unknown'),
+            "tags": meta.get('tags', []),
+            "score": round(score, 3)
+        })
+    return jsonify({"success": True, "id": node_id, "results": places, "total_found": len(places)})
+
+@app.route('/api/trending', methods=['GET'])
+def api_trending():
+    """Most frequent search queries right now, e.g. to choose what to prewarm"""
+    n = max(1, min(request.args.get('n', 10, type=int), 50))
+    return jsonify({"success": True, "searches": trending_searches(n)})
+
+@app.route('/api/ready', methods=['GET'])
+def readiness():
+    """Readiness probe: 503 while the startup prewarm is still running"""
+    report = prewarmer.report()
+    body = {"ready": report["ready"], "prewarm": report["state"], "passes": report["passes"]}
+    return jsonify(body), 200 if report["ready"] else 503
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     # Test Neo4j connection
     neo4j_status = "connected"
     try:
-        records = safe_neo4j_query("RETURN 1 as test")
+        records = safe_neo4j_query(PING_QUERY)
         if not records:
             neo4j_status = "error"
     except:
@@ -176,7 +988,8 @@ def health_check():
             "pinecone": "connected",
             "neo4j": neo4j_status,
             "embeddings": "loaded"
-        }
+        },
+        "warmup": prewarmer.state
     })
 
 @app.route('/api/stats', methods=['GET'])
@@ -188,7 +1001,7 @@ def get_stats():
         
         # Get Neo4j stats with safe query
         neo4j_count = 0
-        records = safe_neo4j_query("MATCH (n:Entity) RETURN count(n) as count")
+        records = safe_neo4j_query(COUNT_QUERY)
         if records:
             neo4j_count = records[0]["count"]
         
@@ -198,7 +1011,14 @@ def get_stats():
                 "total_places": pinecone_stats.total_vector_count,
                 "graph_nodes": neo4j_count,
                 "embedding_model": "all-MiniLM-L6-v2",
-                "vector_dimensions": 384
+                "vector_dimensions": 384,
+                "prefetch": prefetcher.report(),
+                "vector_hedging": index.report(),
+                "graph_batching": graph_loader.report(),
+                "graph_cache": graph_cache.report(),
+                "result_cache": {"embeddings": embedding_cache.report(), "search": search_cache.report(),
+                                 "answers": answer_cache.report()},
+                "prewarm": prewarmer.report()
             }
         })
     except Exception as e:
@@ -2,11 +2,20 @@
 # Demo Flask App for Vietnam Travel Assistant (Loom Video)
 from flask import Flask, request, jsonify, render_template
 from flask_cors import CORS
+from json_responses import install, PayloadCache
+import base64
+import binascii
 import json
 import time
 
 app = Flask(__name__)
 CORS(app)
+install(app)  # orjson, gzip/brotli and ETags for every response
+
+# /api/destinations pages, serialized and compressed once per (cursor, limit, fields)
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+payloads = PayloadCache()
 
 print("🚀 Initializing Vietnam Travel Assistant Demo...")
 
@@ -38,6 +47,39 @@ except Exception as e:
         }
     ]
 
+# Stable keyset order for cursors (mock entries have no id, so fall back to the name)
+def destination_key(item):
+    return str(item.get('id') or item.get('name'))
+
+positions = {destination_key(item): i for i, item in enumerate(travel_data)}
+known_fields = sorted({field for item in travel_data for field in item})
+
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(key.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """Position after the item the cursor points at"""
+    try:
+        key = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+    except (binascii.Error, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+    if key not in positions:
+        raise ValueError("Invalid cursor")
+    return positions[key] + 1
+
+def destinations_page(start, limit, fields):
+    """One page of destinations, projected to `fields` when given"""
+    items = travel_data[start:start + limit] if limit else travel_data[start:]
+    if fields:
+        items = [{f: item[f] for f in fields if f in item} for item in items]
+    end = start + len(items)
+    return {
+        'destinations': items,
+        'total_count': len(travel_data),
+        'count': len(items),
+        'next_cursor': encode_cursor(destination_key(travel_data[end - 1])) if limit and end < len(travel_data) else None
+    }
+
 def simple_search(query, data):
     """Simple keyword-based search for demo purposes"""
     query_lower = query.lower()
@@ -134,11 +176,28 @@ def health_check():
 
 @app.route('/api/destinations', methods=['GET'])
 def get_destinations():
-    """Get all available destinations"""
-    return jsonify({
-        'destinations': travel_data,
-        'total_count': len(travel_data)
-    })
+    """Get available destinations.
+
+    Optional ?limit=N pages the list (max 200; the response's next_cursor goes in
+    ?cursor=) and ?fields=id,name,type keeps only those fields. Without them the
+    full dataset is returned as before.
+    """
+    cursor = request.args.get('cursor')
+    fields = tuple(f.strip() for f in request.args.get('fields', '').split(',') if f.strip())
+    unknown = [f for f in fields if f not in known_fields]
+    if unknown:
+        return jsonify({'error': f"Unknown fields: {', '.join(unknown)}", 'fields': known_fields}), 400
+    try:
+        start = decode_cursor(cursor) if cursor else 0
+        limit = request.args.get('limit')
+        limit = int(limit) if limit else (DEFAULT_PAGE_SIZE if cursor else None)
+        if limit is not None and not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return payloads.response(('destinations', start, limit, fields),
+                             lambda: destinations_page(start, limit, fields))
 
 # For Vercel deployment
 handler = app
@@ -0,0 +1,194 @@
+# attribute_index.py
+# Bitmap attribute indexes over node metadata for filtered vector search
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from dataset_io import iter_nodes
+
+# -----------------------------
+# Config
+# -----------------------------
+DATA_FILE = "vietnam_travel_dataset.json"
+FILTER_FIELDS = ("type", "city", "tags")
+
+# Filters matching at most this fraction of nodes are pushed down to Pinecone
+# as a metadata pre-filter; broader filters over-fetch and filter locally.
+PREFILTER_SELECTIVITY = 0.05
+POSTFILTER_OVERFETCH = 2.0
+MAX_FETCH_K = 1000
+
+# -----------------------------
+# Helper functions
+# -----------------------------
+def node_metadata(node):
+    """Metadata stored alongside each vector in Pinecone."""
+    return {
+        "id": node.get("id"),
+        "type": node.get("type"),
+        "name": node.get("name"),
+        "city": node.get("city", node.get("region", "")),
+        "tags": node.get("tags", [])
+    }
+
+def _norm(value) -> str:
+    return str(value).strip().lower()
+
+class AttributeIndex:
+    """One posting list per (field, value) holding the positions of the nodes with that
+    value. Filters are evaluated as numpy boolean bitmaps (one entry per node)."""
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.positions: Dict[str, int] = {}
+        self.postings: Dict[str, Dict[str, list]] = {f: {} for f in FILTER_FIELDS}
+        self.raw_values: Dict[str, Dict[str, set]] = {f: {} for f in FILTER_FIELDS}
+        self._arrays: Dict[Tuple[str, str], np.ndarray] = {}
+
+    @classmethod
+    def from_nodes(cls, nodes: Iterable[dict]):
+        idx = cls()
+        for node in nodes:
+            idx.add(node_metadata(node))
+        return idx
+
+    @classmethod
+    def from_file(cls, path=DATA_FILE):
+        return cls.from_nodes(iter_nodes(path))
+
+    @property
+    def size(self) -> int:
+        return len(self.ids)
+
+    @property
+    def all_bits(self) -> np.ndarray:
+        return np.ones(self.size, dtype=bool)
+
+    def add(self, meta: dict):
+        """Index one metadata record (re-adding an id is a no-op)."""
+        node_id = meta.get("id")
+        if not node_id or node_id in self.positions:
+            return
+        pos = len(self.ids)
+        self.ids.append(node_id)
+        self.positions[node_id] = pos
+        if self._arrays:
+            self._arrays = {}
+        for field in FILTER_FIELDS:
+            values = meta.get(field)
+            if values is None or values == "":
+                continue
+            if not isinstance(values, (list, tuple)):
+                values = [values]
+            for value in values:
+                key = _norm(value)
+                self.postings[field].setdefault(key, []).append(pos)
+                self.raw_values[field].setdefault(key, set()).add(value)
+
+    def normalize_filters(self, filters: Optional[dict]) -> Dict[str, List[str]]:
+        """Validate a filter dict and turn every field into a list of values."""
+        if not filters:
+            return {}
+        if not isinstance(filters, dict):
+            raise ValueError("filters must be an object")
+        normalized = {}
+        for field, values in filters.items():
+            if field not in FILTER_FIELDS:
+                raise ValueError(f"Unsupported filter field: {field}")
+            if values is None or values == "" or values == []:
+                continue
+            if not isinstance(values, (list, tuple)):
+                values = [values]
+            normalized[field] = [str(v) for v in values]
+        return normalized
+
+    def positions_for(self, field: str, value) -> np.ndarray:
+        """Positions of the nodes with `value` (posting lists are converted once per build)."""
+        key = (field, _norm(value))
+        array = self._arrays.get(key)
+        if array is None:
+            array = self._arrays[key] = np.asarray(self.postings[field].get(key[1], ()), dtype=np.int64)
+        return array
+
+    def bitmap(self, field: str, values: Iterable) -> np.ndarray:
+        """Nodes having any of `values` for `field`."""
+        bits = np.zeros(self.size, dtype=bool)
+        for value in values:
+            bits[self.positions_for(field, value)] = True
+        return bits
+
+    def match(self, filters: Optional[dict]) -> np.ndarray:
+        """Bitmap of nodes matching the filters: OR within a field, AND across fields."""
+        bits = self.all_bits
+        for field, values in self.normalize_filters(filters).items():
+            bits &= self.bitmap(field, values)
+            if not bits.any():
+                break
+        return bits
+
+    def count(self, bits: np.ndarray) -> int:
+        return int(np.count_nonzero(bits))
+
+    def selectivity(self, filters: Optional[dict]) -> float:
+        if not self.size:
+            return 0.0
+        return self.count(self.match(filters)) / self.size
+
+    def contains(self, bits: np.ndarray, node_id: str) -> bool:
+        pos = self.positions.get(node_id)
+        return pos is not None and bool(bits[pos])
+
+    def ids_for(self, bits: np.ndarray) -> List[str]:
+        return [self.ids[pos] for pos in np.flatnonzero(bits)]
+
+    def pinecone_filter(self, filters: Optional[dict]) -> dict:
+        """Translate filters to Pinecone metadata filter syntax using the stored spellings."""
+        clauses = []
+        for field, values in self.normalize_filters(filters).items():
+            raw = set()
+            for value in values:
+                raw |= self.raw_values[field].get(_norm(value), {value})
+            clauses.append({field: {"$in": sorted(raw)}})
+        if not clauses:
+            return {}
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+# -----------------------------
+# Filtered search
+# -----------------------------
+def filtered_query(index, vector, top_k, filters, attr_index: AttributeIndex,
+                   include_values=False, include_metadata=True) -> Tuple[list, str]:
+    """Query Pinecone with filters, picking pre- or post-filtering by selectivity.
+    Post-filtering checks ids against the local bitmaps, so no plan needs metadata back.
+
+    Returns (matches, plan) where plan is one of "none", "empty", "prefilter"
+    or "postfilter".
+    """
+    if not attr_index.normalize_filters(filters):
+        res = index.query(vector=vector, top_k=top_k, include_metadata=include_metadata,
+                          include_values=include_values)
+        return res["matches"], "none"
+
+    bits = attr_index.match(filters)
+    matched = attr_index.count(bits)
+    if matched == 0:
+        return [], "empty"
+
+    selectivity = matched / attr_index.size
+    if selectivity > PREFILTER_SELECTIVITY and matched > top_k:
+        fetch_k = min(MAX_FETCH_K, attr_index.size,
+                      int(top_k / selectivity * POSTFILTER_OVERFETCH) + 1)
+        res = index.query(vector=vector, top_k=fetch_k, include_metadata=include_metadata,
+                          include_values=include_values)
+        kept = [m for m in res["matches"] if attr_index.contains(bits, m["id"])]
+        if len(kept) >= top_k:
+            return kept[:top_k], "postfilter"
+
+    res = index.query(
+        vector=vector,
+        top_k=min(top_k, matched),
+        filter=attr_index.pinecone_filter(filters),
+        include_metadata=include_metadata,
+        include_values=include_values
+    )
+    return res["matches"], "prefilter"
@@ -0,0 +1,154 @@
+# batch_qa.py
+# Batch question answering for nightly evaluation / content jobs (hybrid_chat.py --batch).
+# Questions are read as JSONL, embedded in large batches, retrieved with bounded
+# concurrency and answered under a separate LLM concurrency limit with retries.
+# Answers stream to a JSONL file as they finish, with per-stage timings; rerunning
+# with the same output file skips questions that were already answered.
+import json
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, Set
+
+from deadlines import timed
+
+# -----------------------------
+# Config
+# -----------------------------
+EMBED_BATCH = 64        # questions encoded per model call
+WORKERS = 8             # concurrent retrieval (vector + graph) pipelines
+LLM_WORKERS = 4         # concurrent LLM calls
+LLM_RETRIES = 3         # attempts after the first failure
+RETRY_DELAY = 1.0       # seconds, doubled per attempt (plus jitter)
+OUTPUT_FILE = "batch_answers.jsonl"
+
+# -----------------------------
+# Input / resume
+# -----------------------------
+def read_questions(path: str) -> List[dict]:
+    """JSONL of {"id", "query", optional "filters"} objects or bare strings; "-" reads stdin.
+    Questions without an id are numbered by line so reruns line up."""
+    stream = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    questions = []
+    try:
+        for line_no, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            if isinstance(item, str):
+                item = {"query": item}
+            if not item.get("query"):
+                print(f"⚠️ Skipping line {line_no}: no query")
+                continue
+            item.setdefault("id", f"q{line_no}")
+            item["id"] = str(item["id"])
+            questions.append(item)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    return questions
+
+def completed_ids(output_path: str) -> Set[str]:
+    """Ids already answered in an earlier (possibly interrupted) run. Failed questions
+    and a half-written last line are retried."""
+    done = set()
+    try:
+        with open(output_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if "error" not in record:
+                    done.add(str(record.get("id")))
+    except FileNotFoundError:
+        pass
+    return done
+
+def _ends_with_newline(path: str) -> bool:
+    with open(path, "rb") as f:
+        f.seek(-1, 2)
+        return f.read(1) == b"\n"
+
+def _chunks(items: list, size: int) -> Iterable[list]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+# -----------------------------
+# Runner
+# -----------------------------
+def call_with_retries(fn: Callable, retries=LLM_RETRIES, delay=RETRY_DELAY):
+    """fn() with exponential backoff; returns (result, attempts) or raises the last error."""
+    for attempt in range(retries + 1):
+        try:
+            return fn(), attempt + 1
+        except Exception as e:
+            if attempt == retries:
+                raise
+            wait = delay * (2 ** attempt) * (1 + random.random() * 0.25)
+            print(f"⚠️ LLM call failed ({e}); retrying in {wait:.1f}s")
+            time.sleep(wait)
+
+def run_batch(questions: List[dict], embed: Callable, retrieve: Callable, generate: Callable,
+              output_path=OUTPUT_FILE, embed_batch=EMBED_BATCH, workers=WORKERS,
+              llm_workers=LLM_WORKERS, retries=LLM_RETRIES, retry_delay=RETRY_DELAY) -> dict:
+    """Answer `questions`, appending one JSON line per question to `output_path`.
+
+    embed(texts) -> vectors; retrieve(question, vector, timings) -> (prompt, sources, answer)
+    where answer is set when no LLM call is needed (prompt is then None);
+    generate(prompt) -> answer text.
+    """
+    done = completed_ids(output_path)
+    todo = [q for q in questions if q["id"] not in done]
+    print(f"📝 {len(todo)} questions to answer ({len(questions) - len(todo)} already done)")
+
+    llm_slots = threading.BoundedSemaphore(llm_workers)
+    in_flight = threading.BoundedSemaphore(workers * 2)   # caps queued work between batches
+    write_lock = threading.Lock()
+    stats = {"answered": 0, "failed": 0, "skipped": len(questions) - len(todo), "llm_retries": 0}
+    start = time.perf_counter()
+
+    def answer_one(question, vector, embed_ms, out):
+        timings = {"embed": embed_ms}
+        record = {"id": question["id"], "query": question["query"]}
+        began = time.perf_counter()
+        try:
+            prompt, sources, answer = retrieve(question, vector, timings)
+            attempts = 0
+            if prompt is not None:
+                with llm_slots, timed(timings, "llm"):
+                    answer, attempts = call_with_retries(lambda: generate(prompt), retries, retry_delay)
+            record.update(answer=answer, sources=sources, attempts=attempts)
+        except Exception as e:
+            record["error"] = str(e)
+        finally:
+            in_flight.release()
+        timings["total"] = round((time.perf_counter() - began) * 1000 + embed_ms, 2)
+        record["timings"] = timings
+        with write_lock:
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            if "error" in record:
+                stats["failed"] += 1
+            else:
+                stats["answered"] += 1
+                stats["llm_retries"] += max(0, record["attempts"] - 1)
+
+    with open(output_path, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=workers) as pool:
+        if out.tell() and not _ends_with_newline(output_path):
+            out.write("\n")   # finish a line cut off by an interrupted run
+        for chunk in _chunks(todo, embed_batch):
+            began = time.perf_counter()
+            vectors = embed([q["query"] for q in chunk])
+            # one model call per chunk, shared equally by its questions
+            embed_ms = round((time.perf_counter() - began) * 1000 / len(chunk), 2)
+            for question, vector in zip(chunk, vectors):
+                in_flight.acquire()
+                pool.submit(answer_one, question, vector, embed_ms, out)
+
+    stats["seconds"] = round(time.perf_counter() - start, 2)
+    print(f"✅ Batch done: {stats}")
+    return stats
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+# Load generator and latency benchmark for /api/search and /api/chat.
+# Streaming endpoints (e.g. --endpoints search,search/stream) also report time to
+# the first event as the "first_result" stage, and --projections runs the search
+# endpoints once per response projection to show the latency each one saves.
+#
+# By default the Flask app is driven in-process against the deterministic
+# stand-ins in local_backends.py; pass --url to benchmark a running server.
+# Results (p50/p95/p99 per stage, throughput per load level) are written as JSON
+# so runs can be diffed over time.
+import argparse
+import json
+import math
+import os
+import random
+import subprocess
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+# -----------------------------
+# Config
+# -----------------------------
+DEFAULT_QUERIES = [
+    "Best places to visit in Hanoi",
+    "Beach destinations in Vietnam",
+    "Cultural attractions in Ho Chi Minh City",
+    "Food experiences in Vietnam",
+    "What hotels are in Da Nang?",
+    "Activities available in Sapa",
+    "Romantic riverside stay in Hoi An",
+    "Trekking and mountain adventures in the north",
+    "Floating markets and rural life in the Mekong Delta",
+    "Imperial history and architecture in Hue",
+]
+OUTPUT_FILE = "bench_results.json"
+PERCENTILES = (50, 95, 99)
+# Search projections ("fields" / "include" request bodies) compared by --projections
+PROJECTIONS = {
+    "full": {},
+    "no_connections": {"include": []},
+    "widget": {"fields": ["id", "name", "score"], "include": []},
+    "ids": {"fields": ["id", "score"], "include": []},
+}
+
+# -----------------------------
+# Transports
+# -----------------------------
+NDJSON = "application/x-ndjson"
+
+def read_stream(lines) -> dict:
+    """Fold newline-delimited JSON events into the final "done" / "error" event,
+    noting when the first event arrived."""
+    data, first_at = {}, None
+    for line in lines:
+        if not line.strip():
+            continue
+        if first_at is None:
+            first_at = time.perf_counter()
+        event = json.loads(line)
+        if event.get("event") in ("done", "error"):
+            data = event
+    data["first_event_at"] = first_at
+    return data
+
+def http_sender(base_url: str, timeout=60) -> Callable:
+    """POST to a running server."""
+    def send(endpoint, body):
+        req = urllib.request.Request(
+            f"{base_url.rstrip('/')}/api/{endpoint}",
+            data=json.dumps(body).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            if resp.headers.get_content_type() == NDJSON:
+                return resp.status, read_stream(resp)
+            return resp.status, json.loads(resp.read().decode("utf-8"))
+    return send
+
+def in_process_sender(latency_scale: float) -> Callable:
+    """Import app.py with local backend stand-ins and call it through Flask's test client."""
+    os.environ["BLUE_ENIGMA_BACKEND"] = "local"
+    os.environ["BLUE_ENIGMA_LATENCY_SCALE"] = str(latency_scale)
+    import app as app_module
+    local = threading.local()
+
+    def send(endpoint, body):
+        if not hasattr(local, "client"):
+            local.client = app_module.app.test_client()
+        resp = local.client.post(f"/api/{endpoint}", json=body, buffered=False)
+        if resp.mimetype == NDJSON:
+            return resp.status_code, read_stream(resp.response)
+        return resp.status_code, resp.get_json()
+    return send
+
+# -----------------------------
+# Load generation
+# -----------------------------
+def _timed_call(send, endpoint, body, scheduled):
+    """Latency is measured from the scheduled send time, so queueing counts."""
+    try:
+        status, data = send(endpoint, body)
+        ok = status == 200 and data.get("success", True)
+        timings = data.get("timings", {}) if isinstance(data, dict) else {}
+        if isinstance(data, dict) and data.get("first_event_at"):
+            timings = dict(timings, first_result=(data["first_event_at"] - scheduled) * 1000)
+    except Exception as e:
+        ok, timings = False, {"error": str(e)}
+    return {"ok": ok, "latency_ms": (time.perf_counter() - scheduled) * 1000, "timings": timings}
+
+def run_open_loop(send, endpoint, queries, rate, duration, workers, seed=0, extra_body=None):
+    """Poisson arrivals at `rate` req/s for `duration` seconds, independent of completions."""
+    rng = random.Random(seed)
+    arrivals, t = [], 0.0
+    while True:
+        t += rng.expovariate(rate)
+        if t >= duration:
+            break
+        arrivals.append(t)
+    samples = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        start = time.perf_counter()
+        futures = []
+        for i, offset in enumerate(arrivals):
+            scheduled = start + offset
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            body = dict(extra_body or {}, query=queries[i % len(queries)])
+            futures.append(pool.submit(_timed_call, send, endpoint, body, scheduled))
+        samples = [f.result() for f in futures]
+        elapsed = time.perf_counter() - start
+    return samples, elapsed
+
+def run_closed_loop(send, endpoint, queries, concurrency, requests_per_worker, extra_body=None):
+    """`concurrency` workers each send back-to-back requests."""
+    def worker(w):
+        out = []
+        for i in range(requests_per_worker):
+            body = dict(extra_body or {}, query=queries[(w + i * concurrency) % len(queries)])
+            out.append(_timed_call(send, endpoint, body, time.perf_counter()))
+        return out
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return [s for r in results for s in r], elapsed
+
+# -----------------------------
+# Reporting
+# -----------------------------
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def summarize_latencies(values: List[float]) -> Dict[str, float]:
+    values = sorted(values)
+    out = {f"p{p}": round(percentile(values, p), 2) for p in PERCENTILES}
+    out["mean"] = round(sum(values) / len(values), 2) if values else 0.0
+    out["max"] = round(values[-1], 2) if values else 0.0
+    out["count"] = len(values)
+    return out
+
+def summarize_run(samples, elapsed, **labels) -> dict:
+    ok = [s for s in samples if s["ok"]]
+    stages: Dict[str, List[float]] = {}
+    for s in ok:
+        for stage, ms in s["timings"].items():
+            if isinstance(ms, (int, float)):
+                stages.setdefault(stage, []).append(ms)
+    run = dict(labels)
+    run.update({
+        "requests": len(samples),
+        "errors": len(samples) - len(ok),
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(len(ok) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {"end_to_end": summarize_latencies([s["latency_ms"] for s in ok])},
+    })
+    for stage, values in sorted(stages.items()):
+        run["latency_ms"][stage] = summarize_latencies(values)
+    return run
+
+def compare_reports(current: dict, baseline: dict, stat="p95") -> List[str]:
+    """Human-readable stat deltas for runs present in both reports."""
+    def key(run):
+        return (run["endpoint"], run["mode"], run["level"], run.get("projection"))
+    base = {key(r): r for r in baseline.get("runs", [])}
+    lines = []
+    for run in current["runs"]:
+        old = base.get(key(run))
+        if not old:
+            continue
+        for stage, stats in run["latency_ms"].items():
+            if stage in old["latency_ms"]:
+                before, after = old["latency_ms"][stage][stat], stats[stat]
+                change = (after - before) / before * 100 if before else 0.0
+                lines.append(f"{run['endpoint']:<7} {run['mode']:<6} {run['level']:>6} {stage:<10} "
+                             f"{stat} {before:9.2f} -> {after:9.2f} ms ({change:+.1f}%)")
+    return lines
+
+def projection_savings(runs: List[dict], stat="p50", stage="end_to_end") -> List[str]:
+    """Latency each projection saves against the "full" run at the same endpoint and level."""
+    full = {(r["endpoint"], r["level"]): r for r in runs if r.get("projection") == "full"}
+    lines = []
+    for run in runs:
+        base = full.get((run["endpoint"], run["level"]))
+        if not base or run is base:
+            continue
+        before, after = base["latency_ms"][stage][stat], run["latency_ms"][stage][stat]
+        change = (after - before) / before * 100 if before else 0.0
+        lines.append(f"{run['endpoint']:<13} {run['level']:>6} {run['projection']:<15} "
+                     f"{stat} {before:9.2f} -> {after:9.2f} ms ({change:+.1f}%)")
+    return lines
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return "unknown"
+
+def load_queries(path) -> List[str]:
+    """One query per line, or JSONL objects with a "query" field."""
+    queries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            queries.append(json.loads(line)["query"] if line.startswith("{") else line)
+    return queries
+
+# -----------------------------
+# Main
+# -----------------------------
+def run_benchmark(send, endpoints, mode, levels, queries, duration=10.0, workers=32,
+                  requests_per_worker=20, seed=0, extra_body=None, projections=None) -> List[dict]:
+    """One run per endpoint and level; with `projections` (names in PROJECTIONS) search
+    endpoints get one run per projection, labelled with its name."""
+    runs = []
+    for endpoint in endpoints:
+        variants = [None]
+        if projections and endpoint.startswith("search"):
+            variants = list(projections)
+        for level in levels:
+            for projection in variants:
+                # Projections are compared on computed responses, never on cache hits
+                body = dict(extra_body or {}, **PROJECTIONS[projection], cache=False) if projection else extra_body
+                labels = {"projection": projection} if projection else {}
+                print(f"⏱️  {endpoint} {mode} level={level}" + (f" projection={projection}" if projection else ""))
+                if mode == "open":
+                    samples, elapsed = run_open_loop(send, endpoint, queries, level, duration,
+                                                     workers, seed, body)
+                else:
+                    samples, elapsed = run_closed_loop(send, endpoint, queries, int(level),
+                                                       requests_per_worker, body)
+                run = summarize_run(samples, elapsed, endpoint=endpoint, mode=mode, level=level, **labels)
+                e2e = run["latency_ms"]["end_to_end"]
+                print(f"   {run['throughput_rps']} req/s, p50 {e2e['p50']} ms, p95 {e2e['p95']} ms, "
+                      f"p99 {e2e['p99']} ms, errors {run['errors']}")
+                runs.append(run)
+    return runs
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Latency benchmark for the travel assistant API")
+    parser.add_argument("--url", help="Benchmark a running server instead of in-process local stand-ins")
+    parser.add_argument("--endpoints", default="search,chat", help="Comma separated: search,chat,search/stream")
+    parser.add_argument("--mode", choices=("open", "closed"), default="open")
+    parser.add_argument("--levels", default="5,10,20",
+                        help="Arrival rates in req/s (open) or concurrency levels (closed)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per open-loop level")
+    parser.add_argument("--workers", type=int, default=32, help="Max in-flight requests in open-loop mode")
+    parser.add_argument("--requests-per-worker", type=int, default=20, help="Closed-loop requests per worker")
+    parser.add_argument("--queries", help="Query corpus (text lines or JSONL with a 'query' field)")
+    parser.add_argument("--body", help="Extra JSON merged into every request body")
+    parser.add_argument("--projections", help="Comma separated search projections to compare "
+                                              "(run uncached): " + ",".join(PROJECTIONS))
+    parser.add_argument("--latency-scale", type=float, default=1.0,
+                        help="Multiplier on injected stand-in latency (0 disables it)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--baseline", help="Previous results file to compare p95 against")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    queries = load_queries(args.queries) if args.queries else DEFAULT_QUERIES
+    extra_body = json.loads(args.body) if args.body else None
+    levels = [float(x) if args.mode == "open" else int(x) for x in args.levels.split(",")]
+    projections = args.projections.split(",") if args.projections else None
+    if projections and not set(projections) <= set(PROJECTIONS):
+        raise SystemExit(f"Unknown projection; choose from {', '.join(PROJECTIONS)}")
+    send = http_sender(args.url) if args.url else in_process_sender(args.latency_scale)
+
+    runs = run_benchmark(send, args.endpoints.split(","), args.mode, levels, queries,
+                         args.duration, args.workers, args.requests_per_worker, args.seed, extra_body,
+                         projections)
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git_revision": git_revision(),
+            "target": args.url or "in-process local stand-ins",
+            "latency_scale": None if args.url else args.latency_scale,
+            "queries": len(queries),
+            "body": extra_body or {},
+            "seed": args.seed,
+        },
+        "runs": runs,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Wrote {args.output}")
+
+    if projections:
+        print("📊 Latency saved per projection (vs full):")
+        for line in projection_savings(runs):
+            print(line)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            for line in compare_reports(report, json.load(f)):
+                print(line)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# corpus_embeddings.py
+# Embed every node's semantic text once, optionally caching the matrix on disk
+import os
+from typing import List, Tuple
+
+import numpy as np
+
+from attribute_index import node_metadata
+from dataset_io import iter_nodes
+
+DATA_FILE = "vietnam_travel_dataset.json"
+EMBED_MODEL_NAME = "all-MiniLM-L6-v2"
+BATCH_SIZE = 256
+
+def load_corpus(data_file=DATA_FILE) -> Tuple[List[str], List[str], List[dict]]:
+    """ids, texts and metadata for every node, using the same text as pinecone_upload.py."""
+    ids, texts, metas = [], [], []
+    for node in iter_nodes(data_file):
+        text = node.get("semantic_text") or (node.get("description") or "")[:1000]
+        if not text.strip():
+            continue
+        ids.append(node["id"])
+        texts.append(text)
+        metas.append(node_metadata(node))
+    return ids, texts, metas
+
+def get_encoder(local=False):
+    """SentenceTransformer, or the hashing stand-in when running offline."""
+    if local:
+        from local_backends import LocalEmbedder
+        return LocalEmbedder()
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(EMBED_MODEL_NAME)
+
+def embed_texts(encoder, texts, batch_size=BATCH_SIZE) -> np.ndarray:
+    """Unit-normalized float32 embeddings, encoded in batches."""
+    chunks = [np.asarray(encoder.encode(texts[i:i + batch_size]), dtype=np.float32)
+              for i in range(0, len(texts), batch_size)]
+    vecs = np.vstack(chunks) if chunks else np.zeros((0, 0), dtype=np.float32)
+    return vecs / np.maximum(np.linalg.norm(vecs, axis=1, keepdims=True), 1e-12)
+
+def load_or_embed(data_file=DATA_FILE, encoder=None, cache_path=None):
+    """Return (ids, metas, vectors); vectors are read from cache_path (.npy) when present."""
+    ids, texts, metas = load_corpus(data_file)
+    if cache_path and os.path.exists(cache_path):
+        vecs = np.load(cache_path, mmap_mode="r")
+        if len(vecs) == len(ids):
+            return ids, metas, np.asarray(vecs, dtype=np.float32)
+        print(f"⚠️ {cache_path} has {len(vecs)} rows for {len(ids)} nodes, re-embedding")
+    vecs = embed_texts(encoder or get_encoder(), texts)
+    if cache_path:
+        np.save(cache_path, vecs)
+    return ids, metas, vecs
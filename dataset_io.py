@@ -0,0 +1,19 @@
+# dataset_io.py
+# Read travel datasets stored as a JSON array or as JSON Lines
+import json
+from typing import Iterator, List
+
+DATA_FILE = "vietnam_travel_dataset.json"
+
+def iter_nodes(path=DATA_FILE) -> Iterator[dict]:
+    """Yield nodes one at a time; .jsonl files are streamed line by line."""
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from json.load(f)
+
+def load_nodes(path=DATA_FILE) -> List[dict]:
+    return list(iter_nodes(path))
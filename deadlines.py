@@ -0,0 +1,86 @@
+# deadlines.py
+# Per-request latency budgets. A Deadline travels with the request; required stages
+# (routing, embedding, vector search) always run, optional ones (reranking, graph
+# expansion, the LLM call) are skipped or cut short when the time left is below what
+# the stage usually costs. Every shortcut is recorded so responses can report which
+# stages were degraded.
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+# -----------------------------
+# Config
+# -----------------------------
+SEARCH_BUDGET_MS = 1500
+CHAT_BUDGET_MS = 8000
+MIN_BUDGET_MS = 50
+MAX_BUDGET_MS = 60000
+COST_ALPHA = 0.2           # EWMA weight of the newest stage timing
+DEFAULT_COSTS_MS = {"rerank": 100.0, "graph": 30.0, "llm": 1500.0}
+
+@contextmanager
+def timed(timings, stage):
+    """Record how long a pipeline stage took, in milliseconds (repeated stages add up)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = round(timings.get(stage, 0) + (time.perf_counter() - start) * 1000, 2)
+
+class StageCosts:
+    """Exponentially weighted stage durations, learned from request timings."""
+
+    def __init__(self, defaults: Optional[Dict[str, float]] = None, alpha=COST_ALPHA):
+        self.costs = dict(DEFAULT_COSTS_MS if defaults is None else defaults)
+        self.alpha = alpha
+        self.lock = threading.Lock()
+
+    def estimate(self, stage: str) -> float:
+        with self.lock:
+            return self.costs.get(stage, 0.0)
+
+    def observe(self, timings: Dict[str, float], skip=()):
+        """Fold a request's stage timings in (stages that were cut short are passed in skip)."""
+        with self.lock:
+            for stage, ms in timings.items():
+                if stage == "total" or stage in skip or not isinstance(ms, (int, float)):
+                    continue
+                old = self.costs.get(stage)
+                self.costs[stage] = ms if old is None else (1 - self.alpha) * old + self.alpha * ms
+
+class Deadline:
+    """Time budget of one request, plus the stages degraded to stay within it."""
+
+    def __init__(self, budget_ms: float, costs: Optional[StageCosts] = None):
+        self.budget_ms = float(budget_ms)
+        self.costs = costs or StageCosts()
+        self.start = time.perf_counter()
+        self.degraded: Dict[str, str] = {}
+
+    @classmethod
+    def from_request(cls, value, default_ms: float, costs: Optional[StageCosts] = None) -> "Deadline":
+        """Budget from a client-supplied value (ms), clamped; raises ValueError if not a number."""
+        budget = default_ms if value in (None, "") else float(value)
+        return cls(min(max(budget, MIN_BUDGET_MS), MAX_BUDGET_MS), costs)
+
+    def remaining_ms(self) -> float:
+        return self.budget_ms - (time.perf_counter() - self.start) * 1000
+
+    def remaining_s(self) -> float:
+        return max(self.remaining_ms(), 0.0) / 1000
+
+    def expired(self) -> bool:
+        return self.remaining_ms() <= 0
+
+    def allows(self, stage: str, reserve_ms: float = 0.0) -> bool:
+        """Whether an optional stage is expected to fit, keeping reserve_ms for later stages."""
+        return self.remaining_ms() - reserve_ms >= self.costs.estimate(stage)
+
+    def degrade(self, stage: str, how: str):
+        self.degraded.setdefault(stage, how)
+
+    def report(self) -> dict:
+        return {"budget_ms": round(self.budget_ms, 2),
+                "remaining_ms": round(self.remaining_ms(), 2),
+                "degraded": dict(self.degraded)}
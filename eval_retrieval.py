@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+# eval_retrieval.py
+# Recall-versus-latency evaluation of the retrieval configurations used by
+# pinecone_query / search_vietnam_api. Ground truth is exact brute-force cosine
+# search over the dataset embeddings; every configuration is scored on recall@k,
+# nDCG@k and per-query latency, and the non-dominated ones form the Pareto front.
+# A second query set pairs the queries with metadata filters and scores the
+# filtered_query pre- / post-filter paths against exact search over the matching
+# nodes; the pipeline configurations add cross-encoder reranking and MMR the way
+# retrieve_matches serves them.
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import List, Optional
+
+import numpy as np
+
+from attribute_index import AttributeIndex, filtered_query
+from benchmark import DEFAULT_QUERIES, load_queries, summarize_latencies, git_revision
+from corpus_embeddings import DATA_FILE, embed_texts, get_encoder, load_corpus, load_or_embed
+from mmr import diversify, mmr_select, MMR_FETCH_K, MMR_LAMBDA
+from quantized_store import QuantizedVectorStore
+from reduced_index import ReducedIndex
+from reranker import RERANK_FETCH_K
+
+# -----------------------------
+# Config
+# -----------------------------
+TOP_K = 5
+OUTPUT_FILE = "eval_results.json"
+MMR_LAMBDAS = (0.9, 0.7, 0.5)
+# (mode, rescore factor); factor 0 means approximate scores with no float32 rescore
+QUANTIZED_CONFIGS = (("int8", 0), ("int8", 2), ("binary", 0), ("binary", 4), ("binary", 10))
+# (method, dims, rescore factor) for reduced-dimension indexes
+REDUCED_CONFIGS = (("pca", 64, 0), ("pca", 64, 4), ("pca", 128, 0), ("pca", 128, 4), ("truncate", 128, 4))
+CITY_FILTERS = 5         # largest cities used in the filtered query set
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    k = min(k, len(scores))
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top], kind="stable")]
+
+# -----------------------------
+# Retrieval configurations
+# -----------------------------
+class ExactRetriever:
+    """Brute-force cosine over the full-precision matrix (the ground truth)."""
+
+    def __init__(self, vectors: np.ndarray):
+        self.vectors = vectors
+
+    def search(self, query: np.ndarray, k: int) -> List[int]:
+        return top_k_indices(self.vectors @ query, k).tolist()
+
+class MMRRetriever:
+    """Exact candidate pool followed by MMR diversification (mmr.py)."""
+
+    def __init__(self, vectors: np.ndarray, lambda_mult: float, pool_k=MMR_FETCH_K):
+        self.vectors = vectors
+        self.lambda_mult = lambda_mult
+        self.pool_k = pool_k
+
+    def search(self, query, k):
+        pool = top_k_indices(self.vectors @ query, max(k, self.pool_k))
+        order = mmr_select(query, self.vectors[pool], k, self.lambda_mult)
+        return pool[order].tolist()
+
+class QuantizedRetriever:
+    """Compressed-code prefilter plus exact rescore (quantized_store.py)."""
+
+    def __init__(self, store: QuantizedVectorStore, mode: str, rescore_factor: int):
+        self.store = store
+        self.mode = mode
+        self.rescore_factor = rescore_factor
+
+    def search(self, query, k):
+        return [row for row, _ in self.store.search(query, k, self.mode, self.rescore_factor)]
+
+class ReducedRetriever:
+    """Projected-query search with optional full-dimension rescore (reduced_index.py)."""
+
+    def __init__(self, index: ReducedIndex, rescore_factor: int):
+        self.index = index
+        self.rescore_factor = rescore_factor
+
+    def search(self, query, k):
+        return [row for row, _ in self.index.search(query, k, self.rescore_factor)]
+
+class PineconeRetriever:
+    """The live index, for comparing the hosted service against exact search."""
+
+    def __init__(self, index, ids: List[str]):
+        self.index = index
+        self.positions = {node_id: i for i, node_id in enumerate(ids)}
+
+    def search(self, query, k):
+        res = self.index.query(vector=query.tolist(), top_k=k, include_metadata=False)
+        return [self.positions[m["id"]] for m in res["matches"] if m["id"] in self.positions]
+
+class PipelineRetriever:
+    """The serving path: filtered_query (pre- / post-filter by selectivity), then the
+    cross-encoder and MMR when given, with retrieve_matches' over-fetch sizes."""
+
+    def __init__(self, index, attr_index: AttributeIndex, ids: List[str], reranker=None,
+                 mmr_lambda: Optional[float] = None):
+        self.index = index
+        self.attr_index = attr_index
+        self.positions = {node_id: i for i, node_id in enumerate(ids)}
+        self.reranker = reranker
+        self.mmr_lambda = mmr_lambda
+        self.plans = Counter()
+        self.reranks = Counter()
+
+    def search(self, query, k, text=None, filters=None):
+        pool_k = max(k, MMR_FETCH_K) if self.mmr_lambda is not None else k
+        fetch_k = max(pool_k, RERANK_FETCH_K) if self.reranker is not None else pool_k
+        matches, plan = filtered_query(self.index, query.tolist(), fetch_k, filters, self.attr_index,
+                                       include_values=self.mmr_lambda is not None)
+        self.plans[plan] += 1
+        if self.reranker is not None:
+            matches, status = self.reranker.rerank(text, matches, pool_k)
+            self.reranks[status] += 1
+        if self.mmr_lambda is not None:
+            matches = diversify(query, matches, k, self.mmr_lambda)
+        return [self.positions[m["id"]] for m in matches[:k] if m["id"] in self.positions]
+
+    def report(self) -> dict:
+        out = {"plans": dict(self.plans)}
+        if self.reranker is not None:
+            out["rerank"] = dict(self.reranks)
+        return out
+
+def local_index(vectors: np.ndarray, ids: List[str], metas: List[dict]):
+    """Brute-force index with Pinecone's query / filter call shapes over the same vectors."""
+    from local_backends import LocalVectorIndex
+    index = LocalVectorIndex(dim=vectors.shape[1])
+    index.upsert([{"id": i, "values": v, "metadata": m} for i, v, m in zip(ids, vectors, metas)])
+    return index
+
+def load_reranker(data_file):
+    try:
+        from reranker import CrossEncoderReranker, load_candidate_texts
+        return CrossEncoderReranker(load_candidate_texts(data_file))
+    except Exception as e:
+        print(f"⚠️ Rerank configurations skipped: {e}")
+        return None
+
+def pipeline_configs(index, attr_index, ids, reranker, prefix: str, gated: bool) -> List[dict]:
+    """filtered_query alone, plus rerank and rerank + MMR (the default serving path)
+    when a reranker is available. Reranking and MMR reorder on purpose, so they are
+    reported but not gated against cosine ground truth."""
+    configs = [{"name": f"{prefix}query", "params": {}, "gated": gated,
+                "retriever": PipelineRetriever(index, attr_index, ids)}]
+    if reranker is not None:
+        configs.append({"name": f"{prefix}rerank", "params": {"fetch_k": RERANK_FETCH_K}, "gated": False,
+                        "retriever": PipelineRetriever(index, attr_index, ids, reranker)})
+        configs.append({"name": f"{prefix}rerank_mmr_{MMR_LAMBDA}", "params": {"lambda": MMR_LAMBDA},
+                        "gated": False,
+                        "retriever": PipelineRetriever(index, attr_index, ids, reranker, MMR_LAMBDA)})
+    return configs
+
+def filter_sets(attr_index: AttributeIndex, count: int, seed=0) -> List[dict]:
+    """`count` filters cycling through one type (broad: post-filter), one of the largest
+    cities (selective: pre-filter) and a type present in that city."""
+    types = sorted(attr_index.postings["type"])
+    cities = sorted(attr_index.postings["city"], key=lambda c: -len(attr_index.postings["city"][c]))
+    cities = cities[:CITY_FILTERS]
+    rng = random.Random(seed)
+    filters = []
+    for i in range(count):
+        node_type, city = rng.choice(types), rng.choice(cities) if cities else None
+        shape = i % 3
+        if shape == 0 or not city:
+            filters.append({"type": [node_type]})
+        elif shape == 1:
+            filters.append({"city": [city]})
+        else:
+            present = [t for t in types if attr_index.count(attr_index.match({"type": [t], "city": [city]}))]
+            filters.append({"type": [rng.choice(present)], "city": [city]})
+    return filters
+
+def build_configs(vectors: np.ndarray, ids: List[str], args) -> List[dict]:
+    """Every configuration to evaluate. `gated` ones are held to the recall threshold;
+    MMR and un-rescored quantized scans deliberately trade recall away, so they are
+    reported but not gated."""
+    configs = [{"name": "exact", "params": {"bytes_per_vector": vectors.shape[1] * 4}, "gated": True, "retriever": ExactRetriever(vectors)}]
+    for lam in MMR_LAMBDAS:
+        configs.append({"name": f"mmr_lambda_{lam}", "params": {"lambda": lam}, "gated": False,
+                        "retriever": MMRRetriever(vectors, lam)})
+    store_dir = args.store_dir or tempfile.mkdtemp(prefix="quantized_store_")
+    store = QuantizedVectorStore.build(ids, vectors, store_dir)
+    memory = store.memory_report()
+    for mode, factor in QUANTIZED_CONFIGS:
+        configs.append({"name": f"{mode}_rescore_{factor}" if factor else f"{mode}_only",
+                        "params": {"mode": mode, "rescore_factor": factor,
+                                   "bytes_per_vector": memory[f"{mode}_bytes_per_vector"]},
+                        "gated": bool(factor), "retriever": QuantizedRetriever(store, mode, factor)})
+    reduced = {}
+    for method, dims, factor in REDUCED_CONFIGS:
+        if (method, dims) not in reduced:
+            reduced[(method, dims)] = ReducedIndex.build(ids, vectors, dims, method,
+                                                         os.path.join(store_dir, f"{method}_{dims}"))
+        index = reduced[(method, dims)]
+        report = index.memory_report()
+        configs.append({"name": f"{method}{dims}_rescore_{factor}" if factor else f"{method}{dims}_only",
+                        "params": {"method": method, "dims": dims, "rescore_factor": factor,
+                                   "bytes_per_vector": report["reduced_bytes_per_vector"],
+                                   "explained_energy": report["explained_energy"]},
+                        "gated": bool(factor), "retriever": ReducedRetriever(index, factor)})
+    if args.pinecone:
+        configs.append({"name": "pinecone", "params": {}, "gated": True,
+                        "retriever": PineconeRetriever(pinecone_index(), ids)})
+    return configs
+
+def pinecone_index():
+    from pinecone import Pinecone
+    import config
+    return Pinecone(api_key=config.PINECONE_API_KEY).Index(config.PINECONE_INDEX_NAME)
+
+# -----------------------------
+# Metrics
+# -----------------------------
+TIE_EPS = 1e-5
+
+def ground_truth(vectors: np.ndarray, queries: np.ndarray, k: int, masks=None) -> List[set]:
+    """Rows scoring at least the exact k-th best score. Templated descriptions embed
+    to identical vectors, so ties are common and any tied row counts as a hit.
+    With `masks` (one boolean row mask per query) only matching rows compete."""
+    truth = []
+    for i, q in enumerate(queries):
+        scores = vectors @ q
+        if masks is not None:
+            scores = np.where(masks[i], scores, -np.inf)
+            if not masks[i].any():
+                truth.append(set())
+                continue
+        kth = scores[top_k_indices(scores, min(k, int(np.count_nonzero(np.isfinite(scores)))))[-1]]
+        truth.append(set(np.flatnonzero(scores >= kth - TIE_EPS).tolist()))
+    return truth
+
+def filter_masks(attr_index: AttributeIndex, ids: List[str], filters: List[dict]) -> List[np.ndarray]:
+    """Row masks (aligned with `ids`) for each filter, from the attribute bitmaps."""
+    rows = np.asarray([attr_index.positions[i] for i in ids])
+    return [attr_index.match(f)[rows] for f in filters]
+
+def recall_at_k(retrieved: List[int], relevant: set, k: int) -> float:
+    expected = min(k, len(relevant))
+    return len(set(retrieved[:k]) & relevant) / expected if expected else 1.0
+
+def ndcg_at_k(retrieved: List[int], relevant: set, k: int) -> float:
+    """Binary relevance: an item is relevant if it ties or beats the exact k-th score."""
+    dcg = sum(1 / np.log2(rank + 2) for rank, i in enumerate(retrieved[:k]) if i in relevant)
+    idcg = sum(1 / np.log2(rank + 2) for rank in range(min(k, len(relevant))))
+    return float(dcg / idcg) if idcg else 1.0
+
+def evaluate(retriever, queries: np.ndarray, truth: List[set], k: int, contexts=None) -> dict:
+    """contexts: per-query keyword arguments (text, filters) for retrievers that take them."""
+    recalls, ndcgs, latencies = [], [], []
+    for i, (q, expected) in enumerate(zip(queries, truth)):
+        start = time.perf_counter()
+        got = retriever.search(q, k, **contexts[i]) if contexts else retriever.search(q, k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        recalls.append(recall_at_k(got, expected, k))
+        ndcgs.append(ndcg_at_k(got, expected, k))
+    return {
+        f"recall@{k}": round(float(np.mean(recalls)), 4),
+        f"ndcg@{k}": round(float(np.mean(ndcgs)), 4),
+        "latency_ms": summarize_latencies(latencies),
+    }
+
+def pareto_front(results: List[dict], k: int) -> List[str]:
+    """Configs not beaten on both p50 latency and recall by any other config."""
+    front = []
+    for r in results:
+        lat, rec = r["latency_ms"]["p50"], r[f"recall@{k}"]
+        dominated = any(
+            o is not r and o["latency_ms"]["p50"] <= lat and o[f"recall@{k}"] >= rec
+            and (o["latency_ms"]["p50"] < lat or o[f"recall@{k}"] > rec)
+            for o in results
+        )
+        if not dominated:
+            front.append(r["name"])
+    return sorted(front, key=lambda n: next(r["latency_ms"]["p50"] for r in results if r["name"] == n))
+
+def check_regressions(results: List[dict], k: int, min_recall=None, baseline=None, max_drop=0.02) -> List[str]:
+    failures = []
+    old = {r["name"]: r for r in (baseline or {}).get("results", [])}
+    for r in results:
+        if not r["gated"]:
+            continue
+        recall = r[f"recall@{k}"]
+        if min_recall is not None and recall < min_recall:
+            failures.append(f"{r['name']}: recall@{k} {recall} below threshold {min_recall}")
+        before = old.get(r["name"], {}).get(f"recall@{k}")
+        if before is not None and before - recall > max_drop:
+            failures.append(f"{r['name']}: recall@{k} dropped {before} -> {recall} (max drop {max_drop})")
+    return failures
+
+# -----------------------------
+# Main
+# -----------------------------
+def parse_args():
+    parser = argparse.ArgumentParser(description="Recall vs latency evaluation for retrieval modes")
+    parser.add_argument("--data", default=DATA_FILE, help="Dataset (.json array or .jsonl)")
+    parser.add_argument("--embeddings", help="Cache file (.npy) for corpus embeddings")
+    parser.add_argument("--local", action="store_true", help="Use the offline hashing embedder")
+    parser.add_argument("--queries", help="Query file (text lines or JSONL with a 'query' field)")
+    parser.add_argument("--corpus-queries", type=int, default=0,
+                        help="Also use N randomly chosen node texts as queries")
+    parser.add_argument("--k", type=int, default=TOP_K)
+    parser.add_argument("--store-dir", help="Where to build the quantized / reduced indexes (default: a temp dir)")
+    parser.add_argument("--pinecone", action="store_true", help="Include the live Pinecone index")
+    parser.add_argument("--no-rerank", action="store_true", help="Skip the cross-encoder configurations")
+    parser.add_argument("--min-recall", type=float, help="Fail if a gated config falls below this recall")
+    parser.add_argument("--baseline", help="Previous results file; fail on recall drops beyond --max-drop")
+    parser.add_argument("--max-drop", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    encoder = get_encoder(local=args.local)
+    ids, metas, vectors = load_or_embed(args.data, encoder, args.embeddings)
+    print(f"Loaded {len(ids)} corpus vectors ({vectors.shape[1]} dims)")
+
+    query_texts = load_queries(args.queries) if args.queries else list(DEFAULT_QUERIES)
+    if args.corpus_queries:
+        _, texts, _ = load_corpus(args.data)
+        query_texts += random.Random(args.seed).sample(texts, min(args.corpus_queries, len(texts)))
+    queries = embed_texts(encoder, query_texts)
+
+    truth = ground_truth(vectors, queries, args.k)
+
+    # The serving path over the same vectors (and the live index with --pinecone)
+    attr_index = AttributeIndex()
+    for meta in metas:
+        attr_index.add(meta)
+    index = local_index(vectors, ids, metas)
+    reranker = None if args.no_rerank else load_reranker(args.data)
+    texts = [{"text": t} for t in query_texts]
+    filters = filter_sets(attr_index, len(query_texts) * 3, args.seed)
+    filtered = [{"text": query_texts[i % len(query_texts)], "filters": f} for i, f in enumerate(filters)]
+    filtered_vecs = queries[[i % len(query_texts) for i in range(len(filters))]]
+    filtered_truth = ground_truth(vectors, filtered_vecs, args.k, filter_masks(attr_index, ids, filters))
+    live = [pinecone_index()] if args.pinecone else []
+
+    runs = [(cfg, "vector", queries, truth, None) for cfg in build_configs(vectors, ids, args)]
+    runs += [(cfg, "vector", queries, truth, texts)
+             for cfg in pipeline_configs(index, attr_index, ids, reranker, "pipeline_", True)[1:]]
+    runs += [(cfg, "filtered", filtered_vecs, filtered_truth, filtered)
+             for cfg in pipeline_configs(index, attr_index, ids, reranker, "filtered_", True)]
+    runs += [(cfg, "filtered", filtered_vecs, filtered_truth, filtered)
+             for pc in live for cfg in pipeline_configs(pc, attr_index, ids, None, "filtered_pinecone_", True)]
+
+    results = []
+    for cfg, query_set, set_queries, set_truth, contexts in runs:
+        stats = evaluate(cfg["retriever"], set_queries, set_truth, args.k, contexts)
+        params = dict(cfg["params"], **cfg["retriever"].report()) if hasattr(cfg["retriever"], "report") else cfg["params"]
+        results.append({"name": cfg["name"], "query_set": query_set, "params": params, "gated": cfg["gated"], **stats})
+        print(f"{cfg['name']:<22} recall@{args.k} {stats[f'recall@{args.k}']:.4f}  "
+              f"ndcg@{args.k} {stats[f'ndcg@{args.k}']:.4f}  p50 {stats['latency_ms']['p50']:.3f} ms  "
+              f"p95 {stats['latency_ms']['p95']:.3f} ms")
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git_revision": git_revision(),
+            "data": args.data,
+            "corpus_size": len(ids),
+            "dims": int(vectors.shape[1]),
+            "queries": len(query_texts),
+            "filtered_queries": len(filters),
+            "k": args.k,
+            "encoder": "local" if args.local else "all-MiniLM-L6-v2",
+        },
+        "results": results,
+        "pareto_front": pareto_front([r for r in results if r["query_set"] == "vector"], args.k),
+        "pareto_front_filtered": pareto_front([r for r in results if r["query_set"] == "filtered"], args.k),
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Pareto front: {', '.join(report['pareto_front'])}")
+    print(f"Pareto front (filtered): {', '.join(report['pareto_front_filtered'])}")
+    print(f"✅ Wrote {args.output}")
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    failures = check_regressions(results, args.k, args.min_recall, baseline, args.max_drop)
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
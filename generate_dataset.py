@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# generate_dataset.py
+# Deterministic synthetic travel datasets for scale testing (10^5 - 10^7 nodes).
+#
+# Output follows vietnam_travel_dataset.json: City nodes linked by Connected_To,
+# Attractions / Hotels Located_In a city and Activities Available_In a city.
+# City sizes are Zipf distributed and the city graph grows by preferential
+# attachment, so hubs and long tails look like the real data at scale. Nodes are
+# streamed to disk, so memory stays proportional to the number of cities.
+import argparse
+import bisect
+import itertools
+import json
+import random
+from typing import Iterator, List
+
+# -----------------------------
+# Config
+# -----------------------------
+REGIONS = ["Northern Vietnam", "Central Vietnam", "Southern Vietnam"]
+CITY_TAGS = ["culture", "food", "heritage", "beach", "mountain", "nature", "urban", "history",
+             "romantic", "adventure", "rural", "river", "markets", "architecture", "resort"]
+POI_TAGS = ["beach", "romantic", "mountain", "history", "resort", "heritage", "food", "imperial",
+            "lanterns", "flowers", "river", "nature", "urban", "markets", "cruise", "adventure",
+            "rural", "culture", "ethnic", "modern", "architecture", "floating_markets", "trekking", "diving"]
+MONTHS = ["January", "February", "March", "April", "May", "June", "July",
+          "August", "September", "October", "November", "December"]
+SYLLABLES = ["an", "ba", "binh", "cam", "chau", "da", "dong", "giang", "ha", "hai", "hoa", "hoi",
+             "kien", "lam", "lang", "long", "minh", "my", "nam", "ninh", "phu", "quang", "son",
+             "tan", "thai", "thanh", "tra", "trang", "tuy", "vinh", "yen"]
+ACTIVITY_KINDS = ["cooking classes", "boat tours", "street food walks", "cycling trips",
+                  "lantern making", "kayaking", "trekking", "snorkeling", "market visits", "tea tastings"]
+
+# Share of non-city nodes per type, matching the original 150/100/100 split
+TYPE_MIX = (("Attraction", 0.43), ("Hotel", 0.285), ("Activity", 0.285))
+CITY_EDGES = 2          # Connected_To edges added per new city
+ZIPF_EXPONENT = 1.1     # city size skew
+
+class DatasetGenerator:
+    """Seeded generator; the same arguments always produce the same nodes."""
+
+    def __init__(self, total_nodes: int, cities: int = None, seed: int = 42):
+        self.rng = random.Random(seed)
+        self.total_nodes = total_nodes
+        self.num_cities = cities or max(10, int(total_nodes ** 0.5 / 3))
+        self.cities = self._make_cities()
+        weights = [1 / (rank + 1) ** ZIPF_EXPONENT for rank in range(self.num_cities)]
+        self.rng.shuffle(weights)
+        self.city_cum_weights = list(itertools.accumulate(weights))
+        self.type_cum_weights = list(itertools.accumulate(w for _, w in TYPE_MIX))
+
+    def _city_name(self, i: int) -> str:
+        parts = [self.rng.choice(SYLLABLES).title() for _ in range(self.rng.choice((1, 2, 2, 3)))]
+        return f"{' '.join(parts)} {i}"
+
+    def _make_cities(self) -> List[dict]:
+        cities = []
+        degree_pool = []  # each city appears once per incident edge (preferential attachment)
+        for i in range(self.num_cities):
+            name = self._city_name(i)
+            tags = self.rng.sample(CITY_TAGS, 3)
+            city = {
+                "id": f"city_{i}",
+                "type": "City",
+                "name": name,
+                "region": self.rng.choice(REGIONS),
+                "description": (f"{name} is located in a region known for its {', '.join(tags)} experiences. "
+                                "Travelers visit for local culture, food and scenic excursions."),
+                "best_time_to_visit": f"{self.rng.choice(MONTHS)} to {self.rng.choice(MONTHS)}",
+                "tags": tags,
+                "semantic_text": (f"{name} offers a mix of {', '.join(tags)} attractions and is a must-visit "
+                                  "for those seeking immersive travel experiences in Vietnam."),
+                "connections": []
+            }
+            targets = set()
+            while i and len(targets) < min(CITY_EDGES, i):
+                j = self.rng.choice(degree_pool) if degree_pool else self.rng.randrange(i)
+                targets.add(j)
+            for j in sorted(targets):
+                city["connections"].append({"relation": "Connected_To", "target": f"city_{j}"})
+                degree_pool.extend((i, j))
+            if not targets:
+                degree_pool.append(i)
+            cities.append(city)
+        return cities
+
+    def _pick(self, cum_weights) -> int:
+        return bisect.bisect_left(cum_weights, self.rng.random() * cum_weights[-1])
+
+    def _poi(self, n: int) -> dict:
+        city = self.cities[self._pick(self.city_cum_weights)]
+        node_type = TYPE_MIX[self._pick(self.type_cum_weights)][0]
+        # Tags lean towards the city's own profile
+        pool = [t for t in city["tags"] if t in POI_TAGS] * 3 + POI_TAGS
+        tags = sorted(set(self.rng.choices(pool, k=self.rng.randint(1, 2))))
+        name = f"{city['name']} {node_type} {n}"
+        if node_type == "Hotel":
+            tags = ["stay"] + tags
+            description = (f"A {self.rng.choice(('cozy', 'boutique', 'family', 'luxury'))} stay option in "
+                           f"{city['name']} offering comfort and local charm.")
+            semantic_text = f"{name} provides {self.rng.choice(('modern', 'traditional', 'quiet'))} amenities and local hospitality."
+            relation = "Located_In"
+        elif node_type == "Activity":
+            tags = ["experience"] + tags
+            kind = self.rng.choice(ACTIVITY_KINDS)
+            description = f"A unique experience in {city['name']} where visitors can enjoy {kind}."
+            semantic_text = f"Participate in {kind} in {city['name']} to explore authentic local experiences."
+            relation = "Available_In"
+        else:
+            description = (f"A popular attraction in {city['name']} known for its {tags[0]} and scenic beauty.")
+            semantic_text = (f"Explore this famous attraction in {city['name']}, a destination loved for its "
+                             f"{' and '.join(tags)} vibe and authentic experiences.")
+            relation = "Located_In"
+        return {
+            "id": f"{node_type.lower()}_{n}",
+            "type": node_type,
+            "name": name,
+            "city": city["name"],
+            "description": description,
+            "tags": tags,
+            "semantic_text": semantic_text,
+            "connections": [{"relation": relation, "target": city["id"]}]
+        }
+
+    def __iter__(self) -> Iterator[dict]:
+        yield from self.cities
+        for n in range(max(0, self.total_nodes - self.num_cities)):
+            yield self._poi(n)
+
+def write_dataset(nodes, path: str) -> int:
+    """Stream nodes to .jsonl (one per line) or a .json array; returns the count."""
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            for node in nodes:
+                f.write(json.dumps(node, ensure_ascii=False) + "\n")
+                count += 1
+        else:
+            f.write("[\n")
+            for node in nodes:
+                f.write((",\n" if count else "") + json.dumps(node, ensure_ascii=False))
+                count += 1
+            f.write("\n]\n")
+    return count
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate a synthetic travel dataset")
+    parser.add_argument("--nodes", type=int, default=100000, help="Total number of nodes")
+    parser.add_argument("--cities", type=int, help="Number of cities (default: sqrt(nodes) / 3)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="synthetic_dataset.jsonl", help=".jsonl or .json")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    gen = DatasetGenerator(args.nodes, cities=args.cities, seed=args.seed)
+    print(f"Generating {args.nodes} nodes across {gen.num_cities} cities (seed {args.seed})...")
+    count = write_dataset(gen, args.output)
+    print(f"✅ Wrote {count} nodes to {args.output}")
@@ -0,0 +1,228 @@
+# graph_cache.py
+# Per-node neighborhood cache in front of Neo4j. The travel graph only changes when
+# load_to_neo4j.py runs, so neighbor facts are served from memory (an in-process LRU,
+# plus an optional tier shared by several workers on tiered_cache.py's sharded
+# Redis-protocol store) until the loader says otherwise:
+# a full load bumps the graph version stored on a :GraphMeta node, which changes
+# every cache key, and an incremental load publishes the ids it touched so serving
+# nodes drop exactly those neighborhoods.
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional
+
+from tiered_cache import ShardedStore, dumps, loads
+
+# -----------------------------
+# Config
+# -----------------------------
+MAX_ENTRIES = 20000        # neighborhoods kept in process
+VERSION_POLL_S = 2.0       # how often serving nodes look for a new version / changes
+CHANGELOG_SIZE = 100       # recent change sets kept on the :GraphMeta node
+SHARED_TTL_S = 6 * 3600    # backstop for shared entries a missed change left stale
+SHARED_URLS = [u.strip() for u in os.environ.get("GRAPH_CACHE_REDIS_URL", "").split(",") if u.strip()]
+
+# Version / change feed the loaders write and serving nodes poll
+META_QUERY = ("MATCH (g:GraphMeta {key: 'graph'}) "
+              "RETURN g.version AS version, g.change_seq AS change_seq, g.changes AS changes")
+BUMP_VERSION = ("MERGE (g:GraphMeta {key: 'graph'}) "
+                "WITH g, coalesce(g.change_seq, 0) + 1 AS seq "
+                "SET g.version = coalesce(g.version, 0) + 1, g.change_seq = seq, g.changes = []")
+PUBLISH_CHANGES = ("MERGE (g:GraphMeta {key: 'graph'}) "
+                   "WITH g, coalesce(g.change_seq, 0) + 1 AS seq "
+                   "SET g.change_seq = seq, "
+                   f"g.changes = (coalesce(g.changes, []) + [toString(seq) + '|' + $changed])[-{CHANGELOG_SIZE}..]")
+# Neighborhoods that embed a changed node (its name / description shows up in theirs)
+AFFECTED_QUERY = "MATCH (n:Entity)-[]-(m:Entity) WHERE n.id IN $ids RETURN DISTINCT m.id AS id"
+
+def bump_graph_version(tx):
+    tx.run(BUMP_VERSION)
+
+def publish_changes(tx, node_ids: Iterable[str]):
+    """Announce changed nodes; their neighbors' cached neighborhoods are dropped too."""
+    ids = sorted(set(node_ids))
+    ids += [r["id"] for r in tx.run(AFFECTED_QUERY, ids=ids) if r["id"] not in ids]
+    tx.run(PUBLISH_CHANGES, changed=",".join(ids))
+
+class SharedTier:
+    """Neighborhoods in a ShardedStore (the result cache's L2 or its own shards),
+    encoded the way tiered_cache.py stores results."""
+
+    def __init__(self, store: ShardedStore, ttl_s=SHARED_TTL_S):
+        self.store = store
+        self.ttl_s = ttl_s
+
+    def get_many(self, keys: List[str]) -> Dict[str, list]:
+        return {k: loads(blob) for k, blob in self.store.get_many(keys).items()}
+
+    def set_many(self, items: Dict[str, list]):
+        self.store.set_many({k: dumps(rows) for k, rows in items.items()}, self.ttl_s)
+
+    def delete(self, keys: List[str]):
+        self.store.delete(keys)
+
+def shared_tier_from_env(store: Optional[ShardedStore] = None):
+    """Shards from GRAPH_CACHE_REDIS_URL (comma-separated), else the given store
+    (app.py passes the result cache's L2, so one set of shards serves both)."""
+    if SHARED_URLS:
+        store = ShardedStore(SHARED_URLS)
+        up = sum(store.ping().values())
+        print(f"✅ Shared graph cache: {up}/{len(SHARED_URLS)} shards reachable" if up
+              else "⚠️ Shared graph cache unreachable; misses fall through until the shards come up")
+    return SharedTier(store) if store is not None else None
+
+class NeighborhoodCache:
+    """node id -> neighbor rows for the current graph version, invalidated by the loaders."""
+
+    def __init__(self, read_meta: Optional[Callable[[], Optional[dict]]] = None, shared=None,
+                 max_entries=MAX_ENTRIES, poll_s=VERSION_POLL_S):
+        self.read_meta = read_meta
+        self.shared = shared
+        self.max_entries = max_entries
+        self.poll_s = poll_s
+        self.entries: "OrderedDict[str, list]" = OrderedDict()
+        self.listeners: List[Callable[[Optional[set]], None]] = []
+        self.version = 0
+        self.change_seq = 0
+        self.last_poll = 0.0
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "shared_hits": 0, "misses": 0, "invalidated": 0,
+                      "version_changes": 0, "full_clears": 0, "stale_puts": 0}
+
+    def key(self, nid: str) -> str:
+        return f"nb:{self.version}:{nid}"
+
+    def snapshot(self) -> tuple:
+        """Taken before a graph read; put_many drops rows read across an invalidation."""
+        with self.lock:
+            return self.version, self.change_seq
+
+    # -----------------------------
+    # Invalidation
+    # -----------------------------
+    def refresh(self, force=False):
+        """Poll the loaders' version / change feed (at most every poll_s seconds)."""
+        if self.read_meta is None:
+            return
+        with self.lock:
+            now = time.monotonic()
+            if not force and now - self.last_poll < self.poll_s:
+                return
+            self.last_poll = now
+        try:
+            meta = self.read_meta()
+        except Exception as e:
+            print(f"⚠️ Graph version check failed: {e}")
+            return
+        if meta:
+            self.apply(meta)
+
+    def add_listener(self, fn: Callable[[Optional[set]], None]):
+        """Call fn(changed ids) after each change set, or fn(None) when anything may have
+        changed (new version, or the changelog moved past this node)."""
+        self.listeners.append(fn)
+
+    def _notify(self, changed: Optional[set]):
+        for fn in self.listeners:
+            try:
+                fn(changed)
+            except Exception as e:
+                print(f"⚠️ Graph change listener failed: {e}")
+
+    def apply(self, meta: dict):
+        version, seq = meta.get("version") or 0, meta.get("change_seq") or 0
+        with self.lock:
+            changed = None
+            if version != self.version:
+                # every key changes with the version; old shared entries just expire
+                self.entries.clear()
+                self.version, self.change_seq = version, seq
+                self.stats["version_changes"] += 1
+            elif seq <= self.change_seq:
+                return
+            else:
+                changes = {}
+                for entry in meta.get("changes") or []:
+                    entry_seq, _, ids = entry.partition("|")
+                    changes[int(entry_seq)] = [i for i in ids.split(",") if i]
+                new_seqs = range(self.change_seq + 1, seq + 1)
+                self.change_seq = seq
+                if any(s not in changes for s in new_seqs):
+                    # fell behind the changelog: drop everything local
+                    self.entries.clear()
+                    self.stats["full_clears"] += 1
+                else:
+                    changed = {i for s in new_seqs for i in changes[s]}
+        if changed is not None:
+            self.invalidate(changed)
+        self._notify(changed)
+
+    def invalidate(self, node_ids: Iterable[str]):
+        node_ids = set(node_ids)
+        with self.lock:
+            dropped = [nid for nid in node_ids if self.entries.pop(nid, None) is not None]
+            self.stats["invalidated"] += len(dropped)
+            keys = [self.key(nid) for nid in node_ids]
+        if self.shared is not None and keys:
+            try:
+                self.shared.delete(keys)
+            except Exception as e:
+                print(f"⚠️ Shared graph cache delete failed: {e}")
+
+    # -----------------------------
+    # Lookups
+    # -----------------------------
+    def get_many(self, node_ids: Iterable[str]) -> Dict[str, list]:
+        node_ids = list(dict.fromkeys(node_ids))
+        found = {}
+        with self.lock:
+            for nid in node_ids:
+                rows = self.entries.get(nid)
+                if rows is not None:
+                    self.entries.move_to_end(nid)
+                    found[nid] = rows
+            self.stats["hits"] += len(found)
+            missing = [nid for nid in node_ids if nid not in found]
+            keys = {self.key(nid): nid for nid in missing}
+        if self.shared is not None and keys:
+            try:
+                shared = {keys[k]: rows for k, rows in self.shared.get_many(list(keys)).items()}
+            except Exception as e:
+                print(f"⚠️ Shared graph cache read failed: {e}")
+                shared = {}
+            self._store(shared)
+            found.update(shared)
+            with self.lock:
+                self.stats["shared_hits"] += len(shared)
+        with self.lock:
+            self.stats["misses"] += len(node_ids) - len(found)
+        return found
+
+    def put_many(self, rows_by_id: Dict[str, list], snapshot: Optional[tuple] = None):
+        if snapshot is not None and snapshot != self.snapshot():
+            with self.lock:
+                self.stats["stale_puts"] += 1
+            return
+        self._store(rows_by_id)
+        if self.shared is not None and rows_by_id:
+            try:
+                self.shared.set_many({self.key(nid): rows for nid, rows in rows_by_id.items()})
+            except Exception as e:
+                print(f"⚠️ Shared graph cache write failed: {e}")
+
+    def _store(self, rows_by_id: Dict[str, list]):
+        with self.lock:
+            for nid, rows in rows_by_id.items():
+                self.entries[nid] = rows
+                self.entries.move_to_end(nid)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def report(self) -> dict:
+        with self.lock:
+            stats = dict(self.stats)
+            stats.update(entries=len(self.entries), version=self.version, change_seq=self.change_seq)
+        lookups = stats["hits"] + stats["shared_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + stats["shared_hits"]) / lookups, 4) if lookups else 0.0
+        return stats
@@ -0,0 +1,144 @@
+# graph_loader.py
+# Dataloader-style batching of Neo4j neighbor lookups. Lookups from all concurrent
+# requests are collected for a short tick and sent as one UNWIND query, so popular
+# nodes requested by many requests at once cost one lookup and connection use grows
+# with ticks rather than with requests. A request scope memoizes per-id results for
+# the rest of that request.
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeout
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from graph_priors import NEIGHBOR_ORDER
+
+# -----------------------------
+# Config
+# -----------------------------
+TICK_MS = 2.0             # how long the first lookup of a batch waits for company
+MAX_BATCH = 100           # ids per batched query; a full batch is sent at once
+NEIGHBOR_LIMIT = 10       # neighbors fetched per node; callers slice smaller limits
+DISPATCH_WORKERS = 4      # batches in flight at once, kept under the Neo4j pool size (5)
+
+# One round trip for a whole batch: neighbors per id, ordered by centrality like the
+# single-node queries (ids without neighbors are simply absent)
+BATCH_QUERY = (
+    "UNWIND $ids AS nid "
+    "MATCH (n:Entity {id:nid})-[r]-(m:Entity) "
+    f"WITH nid, r, m {NEIGHBOR_ORDER}"
+    "WITH nid, collect({rel: type(r), relationship: type(r), labels: labels(m), id: m.id, "
+    "name: m.name, type: m.type, description: m.description})[..$limit] AS rows "
+    "RETURN nid, rows"
+)
+# Health check and node count issued by app.py
+PING_QUERY = "RETURN 1 as test"
+COUNT_QUERY = "MATCH (n:Entity) RETURN count(n) as count"
+
+class NeighborLoader:
+    """Process-wide batcher: coalesces concurrent neighbor lookups into ticked batch queries."""
+
+    def __init__(self, run_query: Callable[[str, dict], list], tick_ms=TICK_MS,
+                 max_batch=MAX_BATCH, limit=NEIGHBOR_LIMIT, workers=DISPATCH_WORKERS):
+        self.run_query = run_query
+        self.tick_ms = tick_ms
+        self.max_batch = max_batch
+        self.limit = limit
+        self.lock = threading.Lock()
+        # Batches run off the caller's thread so each caller can stop waiting at its deadline
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="graph-batch")
+        self.pending: Dict[str, Future] = {}     # waiting for the next batch
+        self.in_flight: Dict[str, Future] = {}   # in a batch that has been sent
+        self.flush_scheduled = False
+        self.stats = {"lookups": 0, "coalesced": 0, "batches": 0, "ids_queried": 0}
+
+    def _submit(self, nid: str):
+        """(future, leads, full): the caller that opens a batch flushes it after one tick;
+        whoever fills it up flushes it at once."""
+        with self.lock:
+            self.stats["lookups"] += 1
+            future = self.pending.get(nid) or self.in_flight.get(nid)
+            if future is not None:
+                self.stats["coalesced"] += 1
+                return future, False, False
+            future = self.pending[nid] = Future()
+            leads = not self.flush_scheduled
+            self.flush_scheduled = True
+            return future, leads, len(self.pending) >= self.max_batch
+
+    def _dispatch(self):
+        with self.lock:
+            batch, self.pending = self.pending, {}
+            self.flush_scheduled = False
+            if not batch:
+                return
+            self.in_flight.update(batch)
+            self.stats["batches"] += 1
+            self.stats["ids_queried"] += len(batch)
+        try:
+            records = self.run_query(BATCH_QUERY, {"ids": list(batch), "limit": self.limit})
+            rows = {r["nid"]: list(r["rows"]) for r in records}
+            for nid, future in batch.items():
+                future.set_result(rows.get(nid, []))
+        except Exception as e:
+            print(f"⚠️ Batched neighbor lookup failed: {e}")
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            with self.lock:
+                for nid in batch:
+                    self.in_flight.pop(nid, None)
+
+    def load_iter(self, node_ids: Iterable[str], timeout: Optional[float] = None) -> Iterator[Tuple[str, List[dict]]]:
+        """(node id, neighbor rows) as each lookup completes; stops after `timeout` seconds."""
+        futures, lead = {}, False
+        for nid in dict.fromkeys(node_ids):
+            future, leads, full = self._submit(nid)
+            futures[future] = nid
+            lead = lead or leads
+            if full:
+                self.executor.submit(self._dispatch)
+        if lead:
+            time.sleep(self.tick_ms / 1000)
+            self.executor.submit(self._dispatch)
+        try:
+            for future in as_completed(futures, timeout=timeout):
+                if future.exception() is None:
+                    yield futures[future], future.result()
+        except FuturesTimeout:
+            return
+
+    def load_many(self, node_ids: Iterable[str], timeout: Optional[float] = None) -> Dict[str, List[dict]]:
+        """node id -> neighbor rows; ids still unanswered after `timeout` seconds are left out."""
+        return dict(self.load_iter(node_ids, timeout))
+
+    def scope(self) -> "LoaderScope":
+        return LoaderScope(self)
+
+    def report(self) -> dict:
+        with self.lock:
+            stats = dict(self.stats)
+        stats["avg_batch"] = round(stats["ids_queried"] / stats["batches"], 2) if stats["batches"] else 0.0
+        stats["coalesced_rate"] = round(stats["coalesced"] / stats["lookups"], 4) if stats["lookups"] else 0.0
+        return stats
+
+class LoaderScope:
+    """Request-scoped view of a NeighborLoader that memoizes each id's neighbors."""
+
+    def __init__(self, loader: NeighborLoader):
+        self.loader = loader
+        self.memo: Dict[str, List[dict]] = {}
+
+    def load_iter(self, node_ids: Iterable[str], timeout: Optional[float] = None) -> Iterator[Tuple[str, List[dict]]]:
+        node_ids = list(dict.fromkeys(node_ids))
+        missing = [nid for nid in node_ids if nid not in self.memo]
+        for nid in node_ids:
+            if nid in self.memo:
+                yield nid, self.memo[nid]
+        if missing:
+            for nid, rows in self.loader.load_iter(missing, timeout):
+                self.memo[nid] = rows
+                yield nid, rows
+
+    def load_many(self, node_ids: Iterable[str], timeout: Optional[float] = None) -> Dict[str, List[dict]]:
+        return dict(self.load_iter(node_ids, timeout))
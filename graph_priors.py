@@ -0,0 +1,131 @@
+# graph_priors.py
+# Query-independent importance scores for every node, computed once at load time
+# over the Located_In / Available_In / Connected_To graph: degree, PageRank and
+# PageRank personalized towards each node type. load_to_neo4j.py stores them as
+# node properties (so neighbor queries can ORDER BY them) and in graph_priors.npz
+# (so result ranking can read them from an array).
+import os
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+
+from dataset_io import iter_nodes
+
+# -----------------------------
+# Config
+# -----------------------------
+PRIORS_FILE = "graph_priors.npz"
+DATA_FILE = "vietnam_travel_dataset.json"
+DAMPING = 0.85
+TOLERANCE = 1e-10
+MAX_ITER = 200
+PRIOR_WEIGHT = 0.05      # how far the prior can move a result's relevance score
+NODE_TYPES = ("City", "Attraction", "Hotel", "Activity")
+
+# Cypher fragment for neighbor lookups; nodes loaded before priors existed sort last
+NEIGHBOR_ORDER = "ORDER BY coalesce(m.pagerank, 0) DESC "
+
+def build_adjacency(nodes: Iterable[dict]) -> Tuple[List[str], List[str], sp.csr_matrix]:
+    """(ids, types, symmetric adjacency). Edges to unknown targets are dropped."""
+    ids, types, edges = [], [], []
+    for node in nodes:
+        ids.append(node["id"])
+        types.append(node.get("type", "Unknown"))
+        edges.extend((node["id"], rel.get("target")) for rel in node.get("connections", []))
+    positions = {node_id: i for i, node_id in enumerate(ids)}
+    pairs = np.array([(positions[a], positions[b]) for a, b in edges if b in positions and a != b],
+                     dtype=np.int64).reshape(-1, 2)
+    rows = np.concatenate([pairs[:, 0], pairs[:, 1]])
+    cols = np.concatenate([pairs[:, 1], pairs[:, 0]])
+    adj = sp.csr_matrix((np.ones(len(rows), dtype=np.float64), (rows, cols)), shape=(len(ids), len(ids)))
+    adj.data[:] = 1.0  # duplicate edges collapse to one
+    return ids, types, adj
+
+def pagerank(adj: sp.csr_matrix, damping=DAMPING, personalization=None,
+             tol=TOLERANCE, max_iter=MAX_ITER) -> np.ndarray:
+    """Power iteration on the sparse transition matrix; dangling mass follows the teleport vector."""
+    n = adj.shape[0]
+    if n == 0:
+        return np.zeros(0)
+    out_degree = np.asarray(adj.sum(axis=1)).ravel()
+    dangling = out_degree == 0
+    inv = np.divide(1.0, out_degree, out=np.zeros(n), where=~dangling)
+    transition_t = (sp.diags(inv) @ adj).T.tocsr()
+    teleport = np.full(n, 1.0 / n) if personalization is None else personalization / personalization.sum()
+    rank = teleport.copy()
+    for _ in range(max_iter):
+        new = damping * (transition_t @ rank + rank[dangling].sum() * teleport) + (1 - damping) * teleport
+        if np.abs(new - rank).sum() < tol:
+            return new
+        rank = new
+    return rank
+
+class GraphPriors:
+    """Named per-node score arrays aligned with `ids`."""
+
+    def __init__(self, ids: List[str], arrays: Dict[str, np.ndarray]):
+        self.ids = list(ids)
+        self.positions = {node_id: i for i, node_id in enumerate(self.ids)}
+        self.arrays = arrays
+
+    @classmethod
+    def compute(cls, nodes: Iterable[dict], damping=DAMPING):
+        ids, types, adj = build_adjacency(nodes)
+        types = np.array(types)
+        arrays = {"degree": np.asarray(adj.sum(axis=1)).ravel(), "pagerank": pagerank(adj, damping)}
+        for node_type in NODE_TYPES:
+            seeds = (types == node_type).astype(np.float64)
+            if seeds.any():
+                arrays[f"ppr_{node_type.lower()}"] = pagerank(adj, damping, personalization=seeds)
+        # 0..1 on a log scale so hubs do not dwarf everything else
+        log_rank = np.log1p(arrays["pagerank"] * len(ids))
+        arrays["prior"] = log_rank / log_rank.max() if len(ids) and log_rank.max() > 0 else log_rank
+        return cls(ids, arrays)
+
+    def get(self, node_id: str, name="prior", default=0.0) -> float:
+        pos = self.positions.get(node_id)
+        return float(self.arrays[name][pos]) if pos is not None and name in self.arrays else default
+
+    def node_properties(self) -> Iterable[dict]:
+        """{"id", "pagerank", "degree", "ppr_city", ...} rows for writing to Neo4j."""
+        names = sorted(self.arrays)
+        for i, node_id in enumerate(self.ids):
+            row = {name: float(self.arrays[name][i]) for name in names}
+            row["degree"] = int(row["degree"])
+            yield {"id": node_id, **row}
+
+    def save(self, path=PRIORS_FILE):
+        np.savez(path, ids=np.array(self.ids), **self.arrays)
+
+    @classmethod
+    def load(cls, path=PRIORS_FILE):
+        data = np.load(path)
+        return cls(data["ids"].tolist(), {k: data[k] for k in data.files if k != "ids"})
+
+def load_priors(path=PRIORS_FILE, data_file=DATA_FILE) -> GraphPriors:
+    """Load precomputed priors, computing them from the dataset if the file is missing."""
+    if os.path.exists(path):
+        return GraphPriors.load(path)
+    return GraphPriors.compute(iter_nodes(data_file))
+
+def apply_priors(matches: list, priors: GraphPriors, weight=PRIOR_WEIGHT) -> list:
+    """Re-order matches by relevance + weight * prior. Relevance is the rerank score
+    when present, else the vector score; each returned match carries its prior."""
+    if not weight or priors is None:
+        return list(matches)
+    boosted = []
+    for match in matches:
+        prior = priors.get(match["id"])
+        relevance = match.get("rerank_score")
+        relevance = match.get("score", 0) if relevance is None else relevance
+        boosted.append((relevance + weight * prior, {
+            "id": match["id"],
+            "score": match.get("score", 0),
+            "metadata": match.get("metadata", {}),
+            "values": match.get("values"),
+            "rerank_score": match.get("rerank_score"),
+            "prior": round(prior, 4)
+        }))
+    boosted.sort(key=lambda item: -item[0])
+    return [m for _, m in boosted]
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# hedging.py
+# Hedged vector queries: when a Pinecone query hasn't answered by the recently
+# observed p95 latency, send the same query again and take whichever returns first.
+# Only the slowest few percent of queries get a duplicate, and a token bucket caps
+# the extra load. HedgedIndex wraps an index and keeps the Index.query call shape,
+# so filtered_query and friends use it unchanged.
+#
+# python hedging.py compares plain and hedged queries on the local stand-in with an
+# injected long-tail latency distribution.
+import argparse
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, wait, FIRST_COMPLETED
+from typing import Optional
+
+# -----------------------------
+# Config
+# -----------------------------
+HEDGE_PERCENTILE = 95
+WINDOW = 500               # recent query latencies the percentile is taken over
+MIN_SAMPLES = 20           # no hedging until the percentile means something
+REFRESH_EVERY = 10         # samples between percentile recomputations
+MIN_HEDGE_DELAY_MS = 5.0
+MAX_EXTRA_LOAD = 0.10      # at most this fraction of queries gets a duplicate
+HEDGE_BURST = 5            # hedges that may be spent back to back
+HEDGE_WORKERS = 32         # primaries run here too, so size it above request concurrency
+
+class HedgedIndex:
+    """Index wrapper that duplicates slow queries after a dynamic p95 delay."""
+
+    def __init__(self, index, percentile=HEDGE_PERCENTILE, max_extra_load=MAX_EXTRA_LOAD,
+                 burst=HEDGE_BURST, window=WINDOW, min_samples=MIN_SAMPLES, workers=HEDGE_WORKERS):
+        self.index = index
+        self.percentile = percentile
+        self.max_extra_load = max_extra_load
+        self.burst = burst
+        self.min_samples = min_samples
+        self.samples = deque(maxlen=window)
+        self.delay_ms: Optional[float] = None
+        self.tokens = float(burst)
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hedge")
+        self.stats = {"queries": 0, "hedged": 0, "hedge_wins": 0, "capped": 0, "errors": 0}
+
+    def __getattr__(self, name):
+        # fetch / upsert / describe_index_stats go straight to the wrapped index
+        return getattr(self.index, name)
+
+    # -----------------------------
+    # Latency tracking
+    # -----------------------------
+    def _observe(self, ms: float):
+        with self.lock:
+            self.samples.append(ms)
+            if len(self.samples) >= self.min_samples and (
+                    self.delay_ms is None or len(self.samples) % REFRESH_EVERY == 0):
+                ordered = sorted(self.samples)
+                rank = max(1, -(-self.percentile * len(ordered) // 100))
+                self.delay_ms = max(ordered[int(rank) - 1], MIN_HEDGE_DELAY_MS)
+
+    def _timed_query(self, kwargs):
+        start = time.perf_counter()
+        result = self.index.query(**kwargs)
+        self._observe((time.perf_counter() - start) * 1000)
+        return result
+
+    def _take_token(self) -> bool:
+        with self.lock:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                self.stats["hedged"] += 1
+                return True
+            self.stats["capped"] += 1
+            return False
+
+    # -----------------------------
+    # Queries
+    # -----------------------------
+    def query(self, **kwargs):
+        with self.lock:
+            self.stats["queries"] += 1
+            self.tokens = min(self.burst, self.tokens + self.max_extra_load)
+            delay_ms = self.delay_ms
+        primary = self.executor.submit(self._timed_query, kwargs)
+        if delay_ms is None:
+            return primary.result()
+        try:
+            return primary.result(timeout=delay_ms / 1000)
+        except TimeoutError:
+            pass
+        if not self._take_token():
+            return primary.result()
+
+        hedge = self.executor.submit(self._timed_query, kwargs)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        with self.lock:
+                            self.stats["hedge_wins"] += 1
+                    return future.result()
+                error = future.exception()
+        with self.lock:
+            self.stats["errors"] += 1
+        raise error
+
+    def report(self) -> dict:
+        with self.lock:
+            stats = dict(self.stats)
+            delay_ms = self.delay_ms
+        stats["hedge_rate"] = round(stats["hedged"] / stats["queries"], 4) if stats["queries"] else 0.0
+        stats["win_rate"] = round(stats["hedge_wins"] / stats["hedged"], 4) if stats["hedged"] else 0.0
+        stats["hedge_delay_ms"] = round(delay_ms, 2) if delay_ms is not None else None
+        return stats
+
+# -----------------------------
+# Local comparison
+# -----------------------------
+def compare(queries=400, base_ms=4.0, jitter_ms=2.0, tail_prob=0.03, tail_ms=80.0, seed=0) -> dict:
+    """Latency percentiles of plain vs hedged queries against the local stand-in."""
+    import numpy as np
+    from benchmark import summarize_latencies
+    from local_backends import LatencyModel, LocalVectorIndex
+
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((200, 32)).astype(np.float32)
+    results = {}
+    for name in ("plain", "hedged"):
+        index = LocalVectorIndex(dim=32, latency=LatencyModel(base_ms, jitter_ms, tail_prob, tail_ms, seed=seed))
+        index.upsert([{"id": f"n{i}", "values": v} for i, v in enumerate(vectors)])
+        target = HedgedIndex(index) if name == "hedged" else index
+        latencies = []
+        for q in rng.standard_normal((queries, 32)):
+            start = time.perf_counter()
+            target.query(vector=q.tolist(), top_k=5)
+            latencies.append((time.perf_counter() - start) * 1000)
+        results[name] = summarize_latencies(latencies)
+        if name == "hedged":
+            results["hedging"] = target.report()
+    return results
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare plain and hedged vector queries on the local stand-in")
+    parser.add_argument("--queries", type=int, default=400)
+    parser.add_argument("--base-ms", type=float, default=4.0)
+    parser.add_argument("--jitter-ms", type=float, default=2.0)
+    parser.add_argument("--tail-prob", type=float, default=0.03,
+                        help="Share of slow queries (hedging at p95 only helps while this stays below 5%%)")
+    parser.add_argument("--tail-ms", type=float, default=80.0)
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    results = compare(args.queries, args.base_ms, args.jitter_ms, args.tail_prob, args.tail_ms)
+    for name in ("plain", "hedged"):
+        print(f"📊 {name:7s} " + "  ".join(f"{k}={v}" for k, v in results[name].items()))
+    print(f"🔁 Hedging: {results['hedging']}")
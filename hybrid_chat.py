@@ -1,10 +1,26 @@
 # hybrid_chat.py
+import argparse
 import json
+import time
 from typing import List
 from openai import OpenAI
 from sentence_transformers import SentenceTransformer
 from pinecone import Pinecone, ServerlessSpec
 from neo4j import GraphDatabase
+from attribute_index import AttributeIndex, filtered_query
+from aggregates import load_aggregates
+from intent_router import IntentRouter
+from reranker import CrossEncoderReranker, load_candidate_texts, RERANK_FETCH_K
+from mmr import diversify, mmr_enabled, MMR_LAMBDA, MMR_FETCH_K, MAX_PER_CITY
+from prompts import build_prompt, build_session_prompt
+from sessions import ConversationSession
+from graph_priors import load_priors, apply_priors, PRIOR_WEIGHT
+from graph_loader import NeighborLoader
+from graph_cache import NeighborhoodCache, META_QUERY, shared_tier_from_env
+from route_index import RouteIndex, CITY_LINKS_QUERY
+import batch_qa
+from deadlines import Deadline, StageCosts, timed
+from hedging import HedgedIndex
 import config
 
 # -----------------------------
@@ -15,6 +31,7 @@ CHAT_MODEL = "gpt-4o-mini"
 TOP_K = 5
 
 INDEX_NAME = config.PINECONE_INDEX_NAME
+DATA_FILE = "vietnam_travel_dataset.json"
 
 # -----------------------------
 # Initialize clients
@@ -32,13 +49,39 @@ if INDEX_NAME not in pc.list_indexes().names():
         spec=ServerlessSpec(cloud="aws", region="us-east-1")
     )
 
-index = pc.Index(INDEX_NAME)
+index = HedgedIndex(pc.Index(INDEX_NAME))  # duplicates queries slower than the recent p95
+attr_index = AttributeIndex.from_file(DATA_FILE)
+aggregates = load_aggregates()
+router = IntentRouter(aggregates, encode=EMBED_MODEL.encode)
+routes = RouteIndex.from_aggregates(aggregates)
+reranker = None  # enabled with --rerank
+priors = load_priors(data_file=DATA_FILE)
+stage_costs = StageCosts()  # typical stage durations for --budget-ms
 
 # Connect to Neo4j
 driver = GraphDatabase.driver(
     config.NEO4J_URI, auth=(config.NEO4J_USER, config.NEO4J_PASSWORD)
 )
 
+def run_graph_query(query, params):
+    with driver.session() as session:
+        return list(session.run(query, params))
+
+def read_graph_meta():
+    records = run_graph_query(META_QUERY, {})
+    return dict(records[0]) if records else None
+
+graph_loader = NeighborLoader(run_graph_query)
+graph_cache = NeighborhoodCache(read_graph_meta, shared=shared_tier_from_env())
+
+def sync_routes(changed):
+    """Patch the route index's edges for cities the loaders' change feed names"""
+    city_ids = list(routes.positions) if changed is None else [c for c in changed if c in routes.positions]
+    if city_ids:
+        routes.sync_links({r["cid"]: r["links"] for r in run_graph_query(CITY_LINKS_QUERY, {"ids": city_ids})})
+
+graph_cache.add_listener(sync_routes)
+
 # -----------------------------
 # Helper functions
 # -----------------------------
@@ -46,104 +89,194 @@ def embed_text(text: str) -> List[float]:
     """Get embedding for a text string using Hugging Face."""
     return EMBED_MODEL.encode([text])[0].tolist()
 
-def pinecone_query(query_text: str, top_k=TOP_K):
-    """Query Pinecone index using embedding."""
-    vec = embed_text(query_text)
-    res = index.query(
-        vector=vec,
-        top_k=top_k,
-        include_metadata=True,
-        include_values=False
-    )
-    print("DEBUG: Pinecone top 5 results:")
-    print(len(res["matches"]))
-    return res["matches"]
+def pinecone_query(query_text: str, top_k=TOP_K, filters=None, vector=None,
+                   mmr_lambda=MMR_LAMBDA, max_per_city=MAX_PER_CITY):
+    """Query Pinecone index using embedding, optionally filtered on type/city/tags."""
+    vec = list(map(float, vector)) if vector is not None else embed_text(query_text)
+    use_mmr = mmr_enabled(mmr_lambda, max_per_city)
+    pool_k = max(top_k, MMR_FETCH_K) if use_mmr else top_k
+    fetch_k = max(pool_k, RERANK_FETCH_K) if reranker else pool_k
+    matches, plan = filtered_query(index, vec, fetch_k, filters, attr_index,
+                                   include_values=use_mmr)
+    if reranker:
+        matches, status = reranker.rerank(query_text, matches, pool_k)
+        print(f"DEBUG: Rerank {status}")
+    if use_mmr:
+        matches = diversify(vec, matches, top_k, mmr_lambda, max_per_city)
+    matches = apply_priors(matches[:top_k], priors, PRIOR_WEIGHT)
+    print(f"DEBUG: Pinecone top {top_k} results ({plan} filter):")
+    print(len(matches))
+    return matches
 
-def fetch_graph_context(node_ids: List[str], neighborhood_depth=1):
-    """Fetch neighboring nodes from Neo4j."""
+def fetch_graph_context(node_ids: List[str], neighborhood_depth=1, deadline=None):
+    """Fetch neighboring nodes from Neo4j in one batched query (batch mode coalesces
+    concurrent questions); skipped or cut short once the deadline is too close."""
     facts = []
-    with driver.session() as session:
-        for nid in node_ids:
-            q = (
-                "MATCH (n:Entity {id:$nid})-[r]-(m:Entity) "
-                "RETURN type(r) AS rel, labels(m) AS labels, m.id AS id, "
-                "m.name AS name, m.type AS type, m.description AS description "
-                "LIMIT 10"
-            )
-            recs = session.run(q, nid=nid)
-            for r in recs:
-                facts.append({
-                    "source": nid,
-                    "rel": r["rel"],
-                    "target_id": r["id"],
-                    "target_name": r["name"],
-                    "target_desc": (r["description"] or "")[:400],
-                    "labels": r["labels"]
-                })
+    graph_cache.refresh()
+    neighbors = graph_cache.get_many(node_ids)
+    missing = [nid for nid in dict.fromkeys(node_ids) if nid not in neighbors]
+    timeout = None
+    if missing and deadline is not None:
+        reserve_ms = stage_costs.estimate("llm")
+        if not deadline.allows("graph", reserve_ms):
+            deadline.degrade("graph", "skipped" if not neighbors else "partial")
+            missing = []
+        timeout = max(deadline.remaining_ms() - reserve_ms, 0) / 1000
+    if missing:
+        snapshot = graph_cache.snapshot()
+        fetched = graph_loader.load_many(missing, timeout)
+        graph_cache.put_many(fetched, snapshot)
+        neighbors.update(fetched)
+    if deadline is not None and len(neighbors) < len(set(node_ids)):
+        deadline.degrade("graph", "partial")
+    for nid in node_ids:
+        for r in neighbors.get(nid, []):
+            facts.append({
+                "source": nid,
+                "rel": r["rel"],
+                "target_id": r["id"],
+                "target_name": r["name"],
+                "target_desc": (r["description"] or "")[:400],
+                "labels": r["labels"]
+            })
     print("DEBUG: Graph facts:")
     print(len(facts))
     return facts
 
-def build_prompt(user_query, pinecone_matches, graph_facts):
-    """Build a chat prompt combining vector DB matches and graph facts."""
-    system = (
-        "You are a helpful travel assistant. Use the provided semantic search results "
-        "and graph facts to answer the user's query briefly and concisely. "
-        "Cite node ids when referencing specific places or attractions."
-    )
-
-    vec_context = []
-    for m in pinecone_matches:
-        meta = m["metadata"]
-        score = m.get("score", None)
-        snippet = f"- id: {m['id']}, name: {meta.get('name','')}, type: {meta.get('type','')}, score: {score}"
-        if meta.get("city"):
-            snippet += f", city: {meta.get('city')}"
-        vec_context.append(snippet)
-
-    graph_context = [
-        f"- ({f['source']}) -[{f['rel']}]-> ({f['target_id']}) {f['target_name']}: {f['target_desc']}"
-        for f in graph_facts
-    ]
-
-    prompt = [
-        {"role": "system", "content": system},
-        {"role": "user", "content":
-         f"User query: {user_query}\n\n"
-         "Top semantic matches (from vector DB):\n" + "\n".join(vec_context[:10]) + "\n\n"
-         "Graph facts (neighboring relations):\n" + "\n".join(graph_context[:20]) + "\n\n"
-         "Based on the above, answer the user's question. If helpful, suggest 2–3 concrete itinerary steps or tips and mention node ids for references."}
-    ]
-    return prompt
-
-def call_chat(prompt_messages):
-    """Call OpenAI ChatCompletion."""
+def call_chat(prompt_messages, deadline=None):
+    """Call OpenAI ChatCompletion (bounded by the deadline, if any)."""
+    options = {"timeout": deadline.remaining_s()} if deadline is not None else {}
     resp = client.chat.completions.create(
         model=CHAT_MODEL,
         messages=prompt_messages,
         max_tokens=600,
-        temperature=0.2
+        temperature=0.2,
+        **options
     )
     return resp.choices[0].message.content
 
+def answer_within(prompt_messages, matches, deadline=None):
+    """LLM answer, or the top matches when the deadline can't cover the call."""
+    fallback = "Top matches: " + ", ".join(f"{m['metadata'].get('name', m['id'])} [{m['id']}]" for m in matches)
+    if deadline is not None and not deadline.allows("llm"):
+        deadline.degrade("llm", "skipped")
+        return fallback
+    start = time.perf_counter()
+    try:
+        answer = call_chat(prompt_messages, deadline)
+    except Exception as e:
+        if deadline is None or not deadline.expired():
+            raise
+        print(f"⚠️ LLM call cut off by the deadline: {e}")
+        deadline.degrade("llm", "timeout")
+        return fallback
+    stage_costs.observe({"llm": (time.perf_counter() - start) * 1000})
+    return answer
+
 # -----------------------------
 # Interactive chat
 # -----------------------------
-def interactive_chat():
+def interactive_chat(filters=None, mmr_lambda=MMR_LAMBDA, max_per_city=MAX_PER_CITY, budget_ms=None):
     print("Hybrid travel assistant. Type 'exit' to quit.")
+    if filters:
+        print(f"Filtering results on: {filters}")
+    # One conversation per run: follow-ups reuse fetched neighborhoods and earlier turns
+    session = ConversationSession("cli")
     while True:
         query = input("\nEnter your travel question: ").strip()
         if not query or query.lower() in ("exit","quit"):
             break
 
-        matches = pinecone_query(query, top_k=TOP_K)
+        deadline = Deadline(budget_ms, stage_costs) if budget_ms else None
+        city_id = router.extract_slots(query)["city"]
+        retrieval_query = session.contextualize(query, aggregates["cities"].get(city_id or "", {}).get("name"))
+
+        # Structural lookups are answered from aggregates without Pinecone, Neo4j or the LLM
+        route = None if filters else router.classify(retrieval_query)
+        structural = router.answer(route) if route else None
+        if structural:
+            session.record_turn(query, query, structural["answer"], [])
+            print(f"\n=== Answer ({structural['intent']}) ===\n")
+            print(structural["answer"])
+            print("\n=== End ===\n")
+            continue
+
+        matches = pinecone_query(retrieval_query, top_k=TOP_K, filters=filters,
+                                 vector=route["vector"] if route else None,
+                                 mmr_lambda=mmr_lambda, max_per_city=max_per_city)
         match_ids = [m["id"] for m in matches]
-        graph_facts = fetch_graph_context(match_ids)
-        prompt = build_prompt(query, matches, graph_facts)
-        answer = call_chat(prompt)
+        missing = session.missing_neighborhoods(match_ids)
+        graph_facts = fetch_graph_context(missing, deadline=deadline)
+        skipped = set(missing) - {f["source"] for f in graph_facts} if deadline and deadline.degraded else set()
+        session.add_context(matches, graph_facts, [nid for nid in match_ids if nid not in skipped])
+        new_matches, new_facts, known = session.split_context(match_ids)
+        itinerary = routes.route_for(retrieval_query, matches)
+        prompt = build_session_prompt(query, new_matches, new_facts, session.history(), session.summary,
+                                      known, routes.describe(itinerary) if itinerary else None)
+        answer = answer_within(prompt, matches, deadline)
+        session.record_turn(query, prompt[-1]["content"], answer,
+                            [m["id"] for m in new_matches if m["id"] not in skipped])
         print("\n=== Assistant Answer ===\n")
         print(answer)
+        if deadline is not None and deadline.degraded:
+            print(f"(degraded to stay within {budget_ms} ms: {deadline.degraded})")
         print("\n=== End ===\n")
 
+# -----------------------------
+# Batch mode
+# -----------------------------
+def batch_chat(input_path, output_path=batch_qa.OUTPUT_FILE, filters=None, mmr_lambda=MMR_LAMBDA,
+               max_per_city=MAX_PER_CITY, embed_batch=batch_qa.EMBED_BATCH, workers=batch_qa.WORKERS,
+               llm_workers=batch_qa.LLM_WORKERS):
+    """Answer a JSONL file of questions (see batch_qa.py); resumable via output_path."""
+    def retrieve(question, vector, timings):
+        query = question["query"]
+        question_filters = attr_index.normalize_filters(question.get("filters")) or filters
+        with timed(timings, "route"):
+            route = None if question_filters else router.classify(query, vector=vector)
+            structural = router.answer(route) if route else None
+        if structural:
+            return None, [item["id"] for item in structural["results"]], structural["answer"]
+        with timed(timings, "vector"):
+            matches = pinecone_query(query, top_k=TOP_K, filters=question_filters, vector=vector,
+                                     mmr_lambda=mmr_lambda, max_per_city=max_per_city)
+        with timed(timings, "graph"):
+            graph_facts = fetch_graph_context([m["id"] for m in matches])
+        itinerary = routes.route_for(query, matches)
+        prompt = build_prompt(query, matches, graph_facts, routes.describe(itinerary) if itinerary else None)
+        return prompt, [m["id"] for m in matches], None
+
+    return batch_qa.run_batch(batch_qa.read_questions(input_path),
+                              lambda texts: EMBED_MODEL.encode(texts, batch_size=embed_batch),
+                              retrieve, call_chat, output_path, embed_batch=embed_batch,
+                              workers=workers, llm_workers=llm_workers)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Hybrid travel assistant")
+    parser.add_argument("--type", action="append", help="Only match nodes of this type (repeatable)")
+    parser.add_argument("--city", action="append", help="Only match nodes in this city (repeatable)")
+    parser.add_argument("--tag", action="append", help="Only match nodes with this tag (repeatable)")
+    parser.add_argument("--rerank", action="store_true", help="Rerank over-fetched matches with a cross-encoder")
+    parser.add_argument("--mmr-lambda", type=float, default=MMR_LAMBDA,
+                        help="MMR relevance/diversity trade-off (1.0 disables diversification)")
+    parser.add_argument("--max-per-city", type=int, default=MAX_PER_CITY, help="Cap matches sharing a city")
+    parser.add_argument("--budget-ms", type=float, help="Per-question latency budget; graph expansion and "
+                        "the LLM call are skipped or cut short to stay within it")
+    parser.add_argument("--batch", metavar="JSONL", help="Answer questions from a JSONL file ('-' for stdin)")
+    parser.add_argument("--output", default=batch_qa.OUTPUT_FILE, help="Batch answers (JSONL, appended)")
+    parser.add_argument("--embed-batch", type=int, default=batch_qa.EMBED_BATCH, help="Questions per embedding call")
+    parser.add_argument("--workers", type=int, default=batch_qa.WORKERS, help="Concurrent retrievals")
+    parser.add_argument("--llm-workers", type=int, default=batch_qa.LLM_WORKERS, help="Concurrent LLM calls")
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    interactive_chat()
+    args = parse_args()
+    if args.rerank:
+        reranker = CrossEncoderReranker(load_candidate_texts(DATA_FILE))
+    filters = attr_index.normalize_filters({"type": args.type, "city": args.city, "tags": args.tag})
+    if args.batch:
+        batch_chat(args.batch, args.output, filters, mmr_lambda=args.mmr_lambda, max_per_city=args.max_per_city,
+                   embed_batch=args.embed_batch, workers=args.workers, llm_workers=args.llm_workers)
+    else:
+        interactive_chat(filters, mmr_lambda=args.mmr_lambda, max_per_city=args.max_per_city,
+                         budget_ms=args.budget_ms)
@@ -0,0 +1,235 @@
+# intent_router.py
+# Cheap query intent routing: structural questions are answered from precomputed
+# aggregates, open-ended ones go through the full hybrid pipeline.
+import re
+from typing import Callable, List, Optional
+
+import numpy as np
+
+# -----------------------------
+# Config
+# -----------------------------
+OPEN = "open"
+PLACES_IN_CITY = "places_in_city"
+COUNT_IN_CITY = "count_in_city"
+CITY_CONNECTIONS = "city_connections"
+
+# Example questions per intent; their mean embedding is the intent centroid
+INTENT_EXAMPLES = {
+    PLACES_IN_CITY: [
+        "What hotels are in Da Nang?",
+        "List the attractions in Hue",
+        "Which activities are available in Sapa?",
+        "Show me hotels in Hanoi",
+        "Things to do in Hoi An",
+    ],
+    COUNT_IN_CITY: [
+        "How many hotels are in Hanoi?",
+        "Number of attractions in Hue",
+        "How many activities does Sapa have?",
+    ],
+    CITY_CONNECTIONS: [
+        "Which cities are connected to Hanoi?",
+        "Where can I travel from Hue?",
+        "What cities link to Da Nang?",
+    ],
+    OPEN: [
+        "Plan a romantic four day trip in central Vietnam",
+        "What is the best season for a beach holiday?",
+        "Recommend somewhere relaxing with good street food",
+        "Compare the north and the south for culture lovers",
+        "I want an adventurous itinerary with trekking and caves",
+    ],
+}
+
+TYPE_KEYWORDS = {
+    "Hotel": ["hotel", "hotels", "accommodation", "accommodations", "where to stay", "places to stay"],
+    "Attraction": ["attraction", "attractions", "sights", "sightseeing"],
+    "Activity": ["activity", "activities", "things to do"],
+}
+
+COUNT_PATTERN = re.compile(r"\b(how many|number of|count of)\b")
+CONNECTION_PATTERN = re.compile(r"\b(connected to|connections? (from|to)|link(s|ed)? to|travel from|go from|get from)\b")
+# Explicit list cues; "what" / "which" count only when a place type follows directly
+# ("which hotels", "what beach hotels"), not in "what is the best hotel ..."
+LIST_PATTERN = re.compile(r"\b(list|show|are there|available)\b")
+WH_PATTERN = r"\b(what|which)\s+(?:(?:{tags})\s+)?(?:{types})\b"
+# Wording that asks for a judgement or comparison keeps a question open-ended
+OPEN_PATTERN = re.compile(r"\b(best|recommend\w*|suggest\w*|compare|versus|vs|good|better|near|nearby|"
+                          r"cheap\w*|top|worth|should|with a)\b")
+
+# When rules say "structural" but the centroid prefers "open", only defer to the
+# centroid if it wins by at least this cosine margin. The centroid never routes a
+# question on its own: structural answers need an explicit rule cue.
+OPEN_MARGIN = 0.1
+MAX_LISTED = 10
+
+class IntentRouter:
+    """Classify queries with keyword rules plus nearest embedding centroid."""
+
+    def __init__(self, aggregates: dict, encode: Optional[Callable] = None):
+        self.aggregates = aggregates
+        self.encode = encode
+        self.labels: List[str] = list(INTENT_EXAMPLES)
+        self.centroids = None
+        self.tags = sorted({t for agg in aggregates["types"].values() for t in agg["by_tag"]})
+        # Longest aliases first so "ho chi minh city" wins over "ho chi minh"
+        self.city_aliases = sorted(aggregates["city_lookup"], key=len, reverse=True)
+        type_words = sorted((w for words in TYPE_KEYWORDS.values() for w in words), key=len, reverse=True)
+        self.type_pattern = "|".join(re.escape(w) for w in type_words)
+        tag_pattern = "|".join(re.escape(t.replace("_", " ")) for t in self.tags) or "(?!)"
+        self.wh_pattern = re.compile(WH_PATTERN.format(tags=tag_pattern, types=self.type_pattern))
+        if encode is not None:
+            self._build_centroids()
+
+    def _build_centroids(self):
+        texts, owners = [], []
+        for label, examples in INTENT_EXAMPLES.items():
+            texts.extend(examples)
+            owners.extend([self.labels.index(label)] * len(examples))
+        vecs = _normalize(np.asarray(self.encode(texts), dtype=np.float32))
+        owners = np.asarray(owners)
+        centroids = np.stack([vecs[owners == i].mean(axis=0) for i in range(len(self.labels))])
+        self.centroids = _normalize(centroids)
+
+    # -----------------------------
+    # Slot extraction / rules
+    # -----------------------------
+    def extract_slots(self, query: str) -> dict:
+        """city (first named), cities (every named city), type, and tags that directly
+        qualify the type ("beach hotels"); other tag words are left to retrieval."""
+        text = query.lower()
+        slots = {"city": None, "cities": [], "type": None, "tags": []}
+        rest, found = text, {}
+        for alias in self.city_aliases:
+            pattern = r"\b" + re.escape(alias) + r"\b"
+            match = re.search(pattern, rest)
+            if match:
+                city_id = self.aggregates["city_lookup"][alias]
+                found[city_id] = min(found.get(city_id, match.start()), match.start())
+                # Blank the span so "ho chi minh city" does not also match "ho chi minh"
+                rest = re.sub(pattern, lambda m: " " * len(m.group()), rest)
+        slots["cities"] = sorted(found, key=found.get)
+        slots["city"] = slots["cities"][0] if found else None
+        for node_type, words in TYPE_KEYWORDS.items():
+            if any(re.search(r"\b" + re.escape(w) + r"\b", text) for w in words):
+                slots["type"] = node_type
+                break
+        slots["tags"] = [t for t in self.tags if re.search(
+            r"\b" + re.escape(t.replace("_", " ")) + r"\s+(?:" + self.type_pattern + r")\b", text)]
+        return slots
+
+    def implied_filters(self, slots: dict) -> Optional[dict]:
+        """Metadata filters a question implies by naming exactly one city and one type
+        ("hotels there in Hue"); None otherwise."""
+        if len(slots.get("cities", [])) != 1 or not slots["type"]:
+            return None
+        return {"city": [self.aggregates["cities"][slots["city"]]["name"]], "type": [slots["type"]]}
+
+    def rule_intent(self, query: str, slots: dict) -> Optional[str]:
+        """Structural intent from explicit cues; None (open) for judgement or comparison
+        questions and for questions naming more than one city."""
+        text = query.lower()
+        if len(slots.get("cities", [])) > 1 or OPEN_PATTERN.search(text):
+            return None
+        if slots["type"] and COUNT_PATTERN.search(text):
+            return COUNT_IN_CITY
+        if slots["city"] and not slots["type"] and CONNECTION_PATTERN.search(text):
+            return CITY_CONNECTIONS
+        if slots["city"] and slots["type"] and (LIST_PATTERN.search(text) or self.wh_pattern.search(text)
+                                                or text.startswith("things to do")):
+            return PLACES_IN_CITY
+        return None
+
+    # -----------------------------
+    # Classification
+    # -----------------------------
+    def classify(self, query: str, vector=None) -> dict:
+        """Return a route dict: intent, slots, centroid scores and the query vector if computed."""
+        slots = self.extract_slots(query)
+        route = {"intent": OPEN, "source": "rules", "slots": slots, "scores": {}, "vector": vector}
+
+        # Without a city or a countable type there is nothing structural to answer
+        if not slots["city"] and not slots["type"]:
+            return route
+
+        rule = self.rule_intent(query, slots)
+        if rule is None:
+            return route
+        if self.centroids is None:
+            route["intent"] = rule
+            return route
+
+        if vector is None:
+            vector = self.encode([query])[0]
+            route["vector"] = vector
+        q = _normalize(np.asarray(vector, dtype=np.float32))
+        sims = self.centroids @ q
+        route["scores"] = {label: round(float(s), 4) for label, s in zip(self.labels, sims)}
+        best = self.labels[int(np.argmax(sims))]
+
+        open_lead = sims[self.labels.index(OPEN)] - sims[self.labels.index(rule)]
+        route["intent"] = OPEN if best == OPEN and open_lead > OPEN_MARGIN else rule
+        route["source"] = "rules+centroid"
+        return route
+
+    # -----------------------------
+    # Structural answers
+    # -----------------------------
+    def answer(self, route: dict) -> Optional[dict]:
+        """Answer a structural route from the aggregates, or None for open questions."""
+        intent, slots = route["intent"], route["slots"]
+        cities = self.aggregates["cities"]
+        city = cities.get(slots["city"]) if slots["city"] else None
+
+        if intent == PLACES_IN_CITY and city:
+            members = self._members(city, slots["type"], slots["tags"])
+            label = _plural(slots["type"], len(members))
+            shown = ", ".join(f"{m['name']} ({m['id']})" for m in members[:MAX_LISTED])
+            text = f"{len(members)} {label} in {city['name']}"
+            text += f": {shown}" if members else "."
+            if len(members) > MAX_LISTED:
+                text += f", and {len(members) - MAX_LISTED} more."
+            return {"intent": intent, "city": slots["city"], "type": slots["type"],
+                    "results": members, "answer": text}
+
+        if intent == COUNT_IN_CITY and slots["type"]:
+            if city:
+                count = len(self._members(city, slots["type"], slots["tags"]))
+                text = f"{_there_are(count)} {count} {_plural(slots['type'], count)} in {city['name']}."
+            else:
+                count = self.aggregates["types"].get(slots["type"], {}).get("count", 0)
+                text = f"{_there_are(count)} {count} {_plural(slots['type'], count)} in the dataset."
+            return {"intent": intent, "city": slots["city"], "type": slots["type"],
+                    "results": [], "count": count, "answer": text}
+
+        if intent == CITY_CONNECTIONS and city:
+            linked = [{"id": cid, "name": cities[cid]["name"], "tags": cities[cid]["tags"]}
+                      for cid in city["connected_to"] if cid in cities]
+            names = ", ".join(f"{c['name']} ({c['id']})" for c in linked)
+            text = f"{city['name']} is connected to {names}." if linked else f"{city['name']} has no listed connections."
+            return {"intent": intent, "city": slots["city"], "type": "City",
+                    "results": linked, "answer": text}
+
+        return None
+
+    def _members(self, city: dict, node_type: str, tags: List[str]) -> List[dict]:
+        members = city["members"].get(node_type, [])
+        if tags:
+            members = [m for m in members if set(tags) & set(m["tags"])]
+        return members
+
+# -----------------------------
+# Helper functions
+# -----------------------------
+def _normalize(x):
+    norms = np.linalg.norm(x, axis=-1, keepdims=True)
+    return x / np.maximum(norms, 1e-12)
+
+def _plural(node_type: str, count: int = 2) -> str:
+    if count == 1:
+        return node_type.lower()
+    return {"Activity": "activities", "City": "cities"}.get(node_type, f"{node_type.lower()}s")
+
+def _there_are(count: int) -> str:
+    return "There is" if count == 1 else "There are"
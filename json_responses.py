@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# json_responses.py
+# Response layer shared by app.py and app_demo.py: jsonify through orjson when it is
+# installed, gzip / brotli negotiated from Accept-Encoding, ETag + If-None-Match on
+# GET responses, and a cache of pre-serialized (and pre-compressed) bodies for
+# payloads that only change with their parameters, such as /api/destinations pages.
+#
+# python json_responses.py   (serialization time and payload sizes on the dataset)
+import gzip
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional
+
+from flask import current_app, request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # stdlib encoder
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# -----------------------------
+# Config
+# -----------------------------
+MIN_COMPRESS_BYTES = 1024      # smaller bodies are sent as is
+GZIP_LEVEL = 6                 # per-response compression
+STATIC_GZIP_LEVEL = 9          # cached payloads are compressed once, so compress harder
+BROTLI_QUALITY = 5
+STATIC_BROTLI_QUALITY = 11
+PAYLOAD_ENTRIES = 256          # pre-serialized payloads kept
+COMPRESSIBLE = ("application/json", "text/html", "text/css", "application/javascript", "text/plain")
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+if orjson is not None:
+    # sorted keys and Flask's own fallbacks (dates as HTTP dates, Decimal, UUID, dataclasses)
+    ORJSON_OPTIONS = (orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+                      | orjson.OPT_PASSTHROUGH_DATETIME)
+
+def dumps(obj) -> bytes:
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=DefaultJSONProvider.default, option=ORJSON_OPTIONS)
+        except TypeError:
+            pass  # e.g. integers beyond 64 bits: let the stdlib encoder handle it
+    return json.dumps(obj, default=DefaultJSONProvider.default, sort_keys=True,
+                      separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+class FastJSONProvider(DefaultJSONProvider):
+    """jsonify() / request.get_json() provider that serializes through orjson."""
+
+    def dumps(self, obj, **kwargs) -> str:
+        if kwargs or orjson is None:
+            return super().dumps(obj, **kwargs)
+        return dumps(obj).decode("utf-8")
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj) + b"\n", mimetype=self.mimetype)
+
+# -----------------------------
+# Content negotiation
+# -----------------------------
+def choose_encoding(size: int) -> Optional[str]:
+    """Best encoding the client accepts (q-values respected), None for identity."""
+    if size < MIN_COMPRESS_BYTES:
+        return None
+    return request.accept_encodings.best_match(ENCODINGS)
+
+def encode(body: bytes, encoding: Optional[str], static=False) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=STATIC_BROTLI_QUALITY if static else BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=STATIC_GZIP_LEVEL if static else GZIP_LEVEL, mtime=0)
+    return body
+
+def finalize(response):
+    """after_request hook: ETag / 304 for GET, then compression when it pays off."""
+    if response.is_streamed or response.direct_passthrough or "Content-Encoding" in response.headers:
+        return response
+    if response.status_code != 200 or response.mimetype not in COMPRESSIBLE:
+        return response
+    if request.method in ("GET", "HEAD"):
+        if "ETag" not in response.headers:
+            response.add_etag(weak=True)  # weak: one tag for every encoding of the body
+        response.make_conditional(request)
+        if response.status_code == 304:
+            return response
+    body = response.get_data()
+    encoding = choose_encoding(len(body))
+    response.vary.add("Accept-Encoding")
+    if encoding:
+        response.set_data(encode(body, encoding))
+        response.headers["Content-Encoding"] = encoding
+    return response
+
+def install(app):
+    """Use orjson for jsonify and negotiate compression / conditional GETs on every response."""
+    app.json = FastJSONProvider(app)
+    app.after_request(finalize)
+
+# -----------------------------
+# Pre-serialized payloads
+# -----------------------------
+class PayloadCache:
+    """Serialized bodies (and each compressed variant) for payloads that only change with
+    their key; hits skip serialization and compression entirely."""
+
+    def __init__(self, max_entries=PAYLOAD_ENTRIES):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[Hashable, dict]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def _entry(self, key: Hashable, build: Callable[[], object]) -> dict:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry
+            self.stats["misses"] += 1
+        body = dumps(build()) + b"\n"
+        entry = {"body": body, "etag": hashlib.sha1(body).hexdigest(), "encoded": {}}
+        with self.lock:
+            self.entries[key] = entry
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return entry
+
+    def response(self, key: Hashable, build: Callable[[], object]):
+        """JSON response for `key`, built with build() on the first request only."""
+        entry = self._entry(key, build)
+        encoding = choose_encoding(len(entry["body"]))
+        data = entry["encoded"].get(encoding) if encoding else entry["body"]
+        if data is None:
+            data = entry["encoded"][encoding] = encode(entry["body"], encoding, static=True)
+        response = current_app.response_class(data, mimetype="application/json")
+        response.set_etag(entry["etag"], weak=True)
+        response.vary.add("Accept-Encoding")
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        return response.make_conditional(request)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def report(self) -> dict:
+        with self.lock:
+            return dict(self.stats, entries=len(self.entries))
+
+# -----------------------------
+# Comparison
+# -----------------------------
+def compare(data_file="vietnam_travel_dataset.json", rounds=50) -> Dict[str, dict]:
+    """Serialization time and wire size of the full dataset payload, per encoder / encoding."""
+    with open(data_file, "r", encoding="utf-8") as f:
+        payload = {"destinations": json.load(f)}
+    results = {}
+
+    def timed_ms(fn):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            out = fn()
+        return round((time.perf_counter() - start) * 1000 / rounds, 3), out
+
+    ms, body = timed_ms(lambda: json.dumps(payload, indent=None, sort_keys=True).encode("utf-8"))
+    results["stdlib json"] = {"ms": ms, "bytes": len(body)}
+    if orjson is not None:
+        ms, body = timed_ms(lambda: orjson.dumps(payload, option=ORJSON_OPTIONS))
+        results["orjson"] = {"ms": ms, "bytes": len(body)}
+    ms, gz = timed_ms(lambda: gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0))
+    results["+ gzip"] = {"ms": ms, "bytes": len(gz)}
+    if brotli is not None:
+        ms, br = timed_ms(lambda: brotli.compress(body, quality=BROTLI_QUALITY))
+        results["+ brotli"] = {"ms": ms, "bytes": len(br)}
+    page = {"destinations": [{"id": d["id"], "name": d["name"]} for d in payload["destinations"][:50]]}
+    results["page of 50, id+name"] = {"ms": timed_ms(lambda: dumps(page))[0], "bytes": len(dumps(page))}
+    return results
+
+if __name__ == "__main__":
+    print(f"📊 Serializing the destinations payload (orjson {'on' if orjson else 'off'}, "
+          f"brotli {'on' if brotli else 'off'})")
+    for name, r in compare().items():
+        print(f"   {name:22s} {r['ms']:8.3f} ms  {r['bytes']:8d} bytes")
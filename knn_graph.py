@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# knn_graph.py
+# Precomputed "more like this" neighbors: every node's top-k most similar nodes by
+# cosine similarity, computed offline with blocked matrix multiplication and served
+# by /api/similar/<id> as a row lookup. Changed, added or removed nodes are patched
+# in incrementally instead of rebuilding the whole graph.
+import argparse
+import os
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+# -----------------------------
+# Config
+# -----------------------------
+KNN_FILE = "knn_graph.npz"
+KNN_K = 10
+BLOCK_ROWS = 1024        # query rows per matrix multiplication block
+
+def _normalize(vectors) -> np.ndarray:
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+def _top_k_per_row(scores: np.ndarray, cols: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Best k (column, score) pairs per row, best first; short rows are padded with -1."""
+    n_rows, n_cols = scores.shape
+    kk = min(k, n_cols)
+    if kk == 0:
+        return np.full((n_rows, k), -1, dtype=np.int32), np.full((n_rows, k), -np.inf, dtype=np.float32)
+    part = np.argpartition(-scores, kk - 1, axis=1)[:, :kk]
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind="stable")
+    top = np.take_along_axis(part, order, axis=1)
+    top_scores = np.take_along_axis(part_scores, order, axis=1)
+    neighbors = np.where(np.isfinite(top_scores), cols[top], -1).astype(np.int32)
+    if kk < k:
+        neighbors = np.pad(neighbors, ((0, 0), (0, k - kk)), constant_values=-1)
+        top_scores = np.pad(top_scores, ((0, 0), (0, k - kk)), constant_values=-np.inf)
+    return neighbors, top_scores.astype(np.float32)
+
+class KNNGraph:
+    """Row i holds the k nearest live nodes to node i (itself excluded)."""
+
+    def __init__(self, ids: List[str], vectors: np.ndarray, neighbors: np.ndarray,
+                 scores: np.ndarray, alive: np.ndarray = None):
+        self.ids = list(ids)
+        self.positions: Dict[str, int] = {node_id: i for i, node_id in enumerate(self.ids)}
+        self.vectors = vectors
+        self.neighbors = neighbors
+        self.scores = scores
+        self.alive = np.ones(len(self.ids), dtype=bool) if alive is None else alive
+        self.k = neighbors.shape[1]
+
+    @classmethod
+    def build(cls, ids: List[str], vectors, k=KNN_K, block_rows=BLOCK_ROWS):
+        vectors = _normalize(vectors)
+        n = len(ids)
+        graph = cls(ids, vectors, np.full((n, k), -1, dtype=np.int32), np.full((n, k), -np.inf, dtype=np.float32))
+        graph._recompute(np.arange(n), block_rows)
+        return graph
+
+    def __len__(self):
+        return int(self.alive.sum())
+
+    def __contains__(self, node_id: str) -> bool:
+        pos = self.positions.get(node_id)
+        return pos is not None and bool(self.alive[pos])
+
+    def live_ids(self) -> List[str]:
+        return [node_id for node_id, alive in zip(self.ids, self.alive) if alive]
+
+    # -----------------------------
+    # Computation
+    # -----------------------------
+    def _recompute(self, rows: np.ndarray, block_rows=BLOCK_ROWS):
+        """Full neighbor lists for `rows`, one block of rows against all columns at a time."""
+        cols = np.arange(len(self.ids))
+        for start in range(0, len(rows), block_rows):
+            block = rows[start:start + block_rows]
+            sims = self.vectors[block] @ self.vectors.T
+            sims[:, ~self.alive] = -np.inf
+            sims[np.arange(len(block)), block] = -np.inf  # a node is not its own neighbor
+            self.neighbors[block], self.scores[block] = _top_k_per_row(sims, cols, self.k)
+
+    def _merge(self, new_cols: np.ndarray, block_rows=BLOCK_ROWS):
+        """Offer `new_cols` as candidates to every row, keeping each row's best k."""
+        for start in range(0, len(self.ids), block_rows):
+            block = np.arange(start, min(start + block_rows, len(self.ids)))
+            sims = self.vectors[block] @ self.vectors[new_cols].T
+            sims[block[:, None] == new_cols[None, :]] = -np.inf
+            sims[~self.alive[block]] = -np.inf
+            # drop stale entries for new_cols before merging their fresh scores back in
+            existing = np.where(np.isin(self.neighbors[block], new_cols), -np.inf, self.scores[block])
+            merged_scores = np.hstack([existing, sims])
+            merged_cols = np.hstack([self.neighbors[block], np.broadcast_to(new_cols, sims.shape)])
+            pick, _ = _top_k_per_row(merged_scores, np.arange(merged_scores.shape[1]), self.k)
+            valid = pick >= 0
+            safe = np.where(valid, pick, 0)
+            self.neighbors[block] = np.where(valid, np.take_along_axis(merged_cols, safe, axis=1), -1)
+            self.scores[block] = np.where(valid, np.take_along_axis(merged_scores, safe, axis=1), -np.inf)
+
+    # -----------------------------
+    # Incremental updates
+    # -----------------------------
+    def upsert(self, ids: Iterable[str], vectors, block_rows=BLOCK_ROWS) -> int:
+        """Add or re-embed nodes. Returns how many rows needed a full recompute."""
+        ids = list(ids)
+        vectors = _normalize(vectors)
+        changed, added = [], []
+        for node_id, vec in zip(ids, vectors):
+            pos = self.positions.get(node_id)
+            if pos is None:
+                pos = len(self.ids)
+                self.positions[node_id] = pos
+                self.ids.append(node_id)
+                added.append((pos, vec))
+            else:
+                self.vectors[pos] = vec
+                self.alive[pos] = True
+                changed.append(pos)
+        if added:
+            self.vectors = np.vstack([self.vectors, np.stack([v for _, v in added])])
+            self.alive = np.concatenate([self.alive, np.ones(len(added), dtype=bool)])
+            self.neighbors = np.vstack([self.neighbors, np.full((len(added), self.k), -1, dtype=np.int32)])
+            self.scores = np.vstack([self.scores, np.full((len(added), self.k), -np.inf, dtype=np.float32)])
+        touched = np.array(sorted(set(changed) | {pos for pos, _ in added}), dtype=np.int64)
+        if not len(touched):
+            return 0
+        # Rows that listed a changed node may have lost it as a neighbor; they need a
+        # full recompute. Every other row only has to consider the touched nodes.
+        stale = np.flatnonzero(np.isin(self.neighbors, changed).any(axis=1)) if changed else np.zeros(0, np.int64)
+        self._merge(touched, block_rows)
+        rows = np.union1d(touched, stale)
+        self._recompute(rows, block_rows)
+        return len(rows)
+
+    def remove(self, ids: Iterable[str], block_rows=BLOCK_ROWS) -> int:
+        """Drop nodes; rows that listed them are recomputed. Returns that row count."""
+        gone = [self.positions[i] for i in ids if i in self.positions and self.alive[self.positions[i]]]
+        if not gone:
+            return 0
+        self.alive[gone] = False
+        self.neighbors[gone] = -1
+        self.scores[gone] = -np.inf
+        stale = np.flatnonzero(np.isin(self.neighbors, gone).any(axis=1))
+        self._recompute(stale, block_rows)
+        return len(stale)
+
+    # -----------------------------
+    # Lookup
+    # -----------------------------
+    def similar(self, node_id: str, top_k=KNN_K) -> List[Tuple[str, float]]:
+        """[(id, score)] for a node, best first; empty when the id is unknown."""
+        pos = self.positions.get(node_id)
+        if pos is None or not self.alive[pos]:
+            return []
+        return [(self.ids[j], float(s)) for j, s in zip(self.neighbors[pos, :top_k], self.scores[pos, :top_k])
+                if j >= 0]
+
+    def save(self, path=KNN_FILE):
+        np.savez(path, ids=np.array(self.ids), vectors=self.vectors, neighbors=self.neighbors,
+                 scores=self.scores, alive=self.alive)
+
+    @classmethod
+    def load(cls, path=KNN_FILE):
+        data = np.load(path)
+        return cls(data["ids"].tolist(), data["vectors"], data["neighbors"], data["scores"], data["alive"])
+
+def load_knn_graph(path=KNN_FILE, data_file="vietnam_travel_dataset.json", encoder=None, k=KNN_K,
+                   save=True) -> KNNGraph:
+    """Load the precomputed graph, building it from the dataset (and saving it) if missing
+    or if its nodes no longer match the dataset's."""
+    from corpus_embeddings import load_corpus, load_or_embed
+    if os.path.exists(path):
+        graph = KNNGraph.load(path)
+        ids = load_corpus(data_file)[0]
+        if set(graph.live_ids()) == set(ids):
+            return graph
+        print(f"⚠️ {path} has {len(graph)} nodes that do not match the {len(ids)} in {data_file}, rebuilding")
+    ids, _, vectors = load_or_embed(data_file, encoder)
+    graph = KNNGraph.build(ids, vectors, k)
+    if save:
+        graph.save(path)
+    return graph
+
+# -----------------------------
+# Main
+# -----------------------------
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build or update the precomputed kNN graph")
+    parser.add_argument("--data", default="vietnam_travel_dataset.json", help="Dataset (.json array or .jsonl)")
+    parser.add_argument("--output", default=KNN_FILE)
+    parser.add_argument("--k", type=int, default=KNN_K)
+    parser.add_argument("--update", help="Dataset of added/changed nodes to patch into an existing graph")
+    parser.add_argument("--remove", nargs="*", default=[], help="Node ids to drop from an existing graph")
+    parser.add_argument("--local", action="store_true", help="Use the offline hashing embedder")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    import time
+    from corpus_embeddings import get_encoder, load_or_embed
+
+    args = parse_args()
+    encoder = get_encoder(local=args.local)
+    start = time.perf_counter()
+    if args.update or args.remove:
+        graph = KNNGraph.load(args.output)
+        recomputed = graph.remove(args.remove)
+        if args.update:
+            ids, _, vectors = load_or_embed(args.update, encoder)
+            recomputed += graph.upsert(ids, vectors)
+        print(f"🔄 Patched {args.output}: {recomputed} rows recomputed")
+    else:
+        ids, _, vectors = load_or_embed(args.data, encoder)
+        print(f"Computing top-{args.k} neighbors for {len(ids)} nodes...")
+        graph = KNNGraph.build(ids, vectors, args.k)
+    graph.save(args.output)
+    print(f"✅ Saved {len(graph)} nodes to {args.output} in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# kv_server.py
+# Tiny Redis-protocol (RESP) key-value server: the local stand-in for the shared L2
+# tier of tiered_cache.py (which graph_cache.py's shared tier also runs on). It speaks
+# enough of the protocol for that cache (PING, GET,
+# MGET, SET with EX/PX/NX, DEL, EXISTS, DBSIZE, FLUSHALL), so the same client runs
+# against a real Redis in production.
+#
+# python kv_server.py --port 6390   (start one per shard)
+import argparse
+import socketserver
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_PORT = 6390
+
+class KVStore:
+    """bytes -> bytes with optional expiry, safe across connection threads."""
+
+    def __init__(self):
+        self.data: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+        self.lock = threading.Lock()
+
+    def _live(self, key: bytes) -> Optional[bytes]:
+        item = self.data.get(key)
+        if item is None:
+            return None
+        value, expires = item
+        if expires is not None and expires <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    def get(self, key: bytes) -> Optional[bytes]:
+        with self.lock:
+            return self._live(key)
+
+    def set(self, key: bytes, value: bytes, ttl_s: Optional[float] = None, nx=False) -> bool:
+        with self.lock:
+            if nx and self._live(key) is not None:
+                return False
+            self.data[key] = (value, time.monotonic() + ttl_s if ttl_s else None)
+            return True
+
+    def delete(self, keys: List[bytes]) -> int:
+        with self.lock:
+            return sum(1 for k in keys if self._live(k) is not None and self.data.pop(k, None) is not None)
+
+def _bulk(value: Optional[bytes]) -> bytes:
+    return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+
+class RESPHandler(socketserver.StreamRequestHandler):
+    def read_command(self) -> Optional[List[bytes]]:
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            return line.split()  # inline command, e.g. "PING"
+        args = []
+        for _ in range(int(line[1:])):
+            size = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(size + 2)[:-2])
+        return args
+
+    def handle(self):
+        store = self.server.store
+        while True:
+            try:
+                args = self.read_command()
+            except (ConnectionError, ValueError):
+                return
+            if args is None:
+                return
+            if not args:
+                continue
+            self.wfile.write(self.execute(store, args))
+
+    def execute(self, store: KVStore, args: List[bytes]) -> bytes:
+        cmd, rest = args[0].upper(), args[1:]
+        try:
+            if cmd == b"PING":
+                return b"+PONG\r\n"
+            if cmd == b"GET":
+                return _bulk(store.get(rest[0]))
+            if cmd == b"MGET":
+                return b"*%d\r\n" % len(rest) + b"".join(_bulk(store.get(k)) for k in rest)
+            if cmd == b"SET":
+                ttl_s, nx, options = None, False, [o.upper() for o in rest[2:]]
+                for i, option in enumerate(options):
+                    if option == b"EX":
+                        ttl_s = float(rest[3 + i])
+                    elif option == b"PX":
+                        ttl_s = float(rest[3 + i]) / 1000
+                    elif option == b"NX":
+                        nx = True
+                return b"+OK\r\n" if store.set(rest[0], rest[1], ttl_s, nx) else b"$-1\r\n"
+            if cmd == b"DEL":
+                return b":%d\r\n" % store.delete(rest)
+            if cmd == b"EXISTS":
+                return b":%d\r\n" % sum(1 for k in rest if store.get(k) is not None)
+            if cmd == b"DBSIZE":
+                with store.lock:
+                    return b":%d\r\n" % len(store.data)
+            if cmd == b"FLUSHALL":
+                with store.lock:
+                    store.data.clear()
+                return b"+OK\r\n"
+        except (IndexError, ValueError):
+            return b"-ERR syntax error\r\n"
+        return b"-ERR unknown command '%s'\r\n" % cmd
+
+class KVServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host="127.0.0.1", port=DEFAULT_PORT):
+        super().__init__((host, port), RESPHandler)
+        self.store = KVStore()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"redis://{host}:{port}"
+
+def start_background(host="127.0.0.1", port=0) -> KVServer:
+    """Serve on a daemon thread (port 0 picks a free port); used by tests and benchmarks."""
+    server = KVServer(host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Redis-protocol key-value server (cache L2 stand-in)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+    server = KVServer(args.host, args.port)
+    print(f"🗄️  Serving {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -1,10 +1,16 @@
 # load_to_neo4j.py
-import json
+import argparse
+from itertools import islice
 from neo4j import GraphDatabase
 from tqdm import tqdm
+from aggregates import build_aggregates, save_aggregates, AGGREGATES_FILE
+from dataset_io import iter_nodes
+from graph_priors import GraphPriors, PRIORS_FILE
+from graph_cache import bump_graph_version, publish_changes
 import config
 
 DATA_FILE = "vietnam_travel_dataset.json"
+PRIOR_BATCH = 1000
 
 driver = GraphDatabase.driver(config.NEO4J_URI, auth=(config.NEO4J_USER, config.NEO4J_PASSWORD))
 
@@ -39,23 +45,82 @@ def create_relationship(tx, source_id, rel):
     )
     tx.run(cypher, source_id=source_id, target_id=target_id)
 
-def main():
-    with open(DATA_FILE, "r", encoding="utf-8") as f:
-        nodes = json.load(f)
+def write_city_counts(tx, city_id, counts):
+    # materialize per-type member counts on the city node, e.g. n.hotel_count
+    props = {f"{node_type.lower()}_count": n for node_type, n in counts.items()}
+    tx.run("MATCH (c:Entity {id: $id}) SET c += $props", id=city_id, props=props)
 
+def write_priors(tx, rows):
+    # centrality priors (pagerank, degree, ppr_*) as node properties, one batch per call
+    tx.run("UNWIND $rows AS row MATCH (n:Entity {id: row.id}) SET n += row", rows=rows)
+
+def load_changes(data_file):
+    # incremental load: upsert just these nodes / relationships, then tell serving
+    # nodes which cached neighborhoods to drop (aggregates and priors are left as-is)
+    changed = set()
+    with driver.session() as session:
+        for node in tqdm(iter_nodes(data_file), desc="Updating nodes"):
+            session.execute_write(upsert_node, node)
+            changed.add(node["id"])
+        for node in tqdm(iter_nodes(data_file), desc="Updating relationships"):
+            for rel in node.get("connections", []):
+                session.execute_write(create_relationship, node["id"], rel)
+                if rel.get("target"):
+                    changed.add(rel["target"])
+        session.execute_write(publish_changes, changed)
+    print(f"Published {len(changed)} changed nodes to graph caches")
+
+def batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+def main(data_file=DATA_FILE):
+    # node records are streamed from disk on each pass and never held all at once; the
+    # aggregate and prior stages keep only compact per-node state (member entries, ids
+    # and edges, score arrays), which still grows with the dataset
     with driver.session() as session:
         session.execute_write(create_constraints)
         # Upsert all nodes
-        for node in tqdm(nodes, desc="Creating nodes"):
+        for node in tqdm(iter_nodes(data_file), desc="Creating nodes"):
             session.execute_write(upsert_node, node)
 
         # Create relationships
-        for node in tqdm(nodes, desc="Creating relationships"):
+        for node in tqdm(iter_nodes(data_file), desc="Creating relationships"):
             conns = node.get("connections", [])
             for rel in conns:
                 session.execute_write(create_relationship, node["id"], rel)
 
+        # Materialize per-city / per-type aggregates for the intent router
+        aggregates = build_aggregates(iter_nodes(data_file))
+        for city_id, city in aggregates["cities"].items():
+            session.execute_write(write_city_counts, city_id, city["counts"])
+
+        # Centrality priors used to order neighbors and nudge result ranking
+        priors = GraphPriors.compute(iter_nodes(data_file))
+        for rows in tqdm(batches(priors.node_properties(), PRIOR_BATCH), desc="Writing priors",
+                         total=-(-len(priors.ids) // PRIOR_BATCH)):
+            session.execute_write(write_priors, rows)
+
+        # New graph version: serving nodes drop every cached neighborhood
+        session.execute_write(bump_graph_version)
+    save_aggregates(aggregates)
+    print(f"Saved graph aggregates to {AGGREGATES_FILE}")
+    priors.save()
+    print(f"Saved graph priors to {PRIORS_FILE}")
+
     print("Done loading into Neo4j.")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Load a travel dataset into Neo4j")
+    parser.add_argument("--data", default=DATA_FILE, help="Dataset (.json array or .jsonl)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only upsert the nodes in --data and invalidate their cached neighborhoods")
+    args = parser.parse_args()
+    if args.incremental:
+        load_changes(args.data)
+    else:
+        main(args.data)
@@ -0,0 +1,378 @@
+# local_backends.py
+# Deterministic in-process stand-ins for the embedding model, Pinecone, Neo4j and
+# the chat model, with injectable latency. Used for offline benchmarks and tests
+# (app.py switches to them when BLUE_ENIGMA_BACKEND=local).
+import hashlib
+import os
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from attribute_index import node_metadata
+from dataset_io import load_nodes
+from graph_priors import GraphPriors
+from graph_cache import (CHANGELOG_SIZE, META_QUERY, BUMP_VERSION, PUBLISH_CHANGES,
+                         AFFECTED_QUERY)
+from graph_loader import BATCH_QUERY, PING_QUERY, COUNT_QUERY
+from route_index import CITY_LINKS_QUERY
+
+DATA_FILE = "vietnam_travel_dataset.json"
+VECTOR_DIM = 384
+
+# -----------------------------
+# Latency injection
+# -----------------------------
+class LatencyModel:
+    """base + uniform jitter, plus an occasional tail spike; seeded so runs repeat."""
+
+    def __init__(self, base_ms=0.0, jitter_ms=0.0, tail_prob=0.0, tail_ms=0.0, seed=0):
+        self.base_ms = base_ms
+        self.jitter_ms = jitter_ms
+        self.tail_prob = tail_prob
+        self.tail_ms = tail_ms
+        self.scale = 1.0
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def sample_ms(self) -> float:
+        with self.lock:
+            ms = self.base_ms + self.rng.uniform(0, self.jitter_ms)
+            if self.tail_prob and self.rng.random() < self.tail_prob:
+                ms += self.tail_ms
+        return ms * self.scale
+
+    def wait(self):
+        ms = self.sample_ms()
+        if ms > 0:
+            time.sleep(ms / 1000)
+
+def default_latency(scale: Optional[float] = None) -> Dict[str, LatencyModel]:
+    """Per-backend latency roughly shaped like the hosted services."""
+    if scale is None:
+        scale = float(os.environ.get("BLUE_ENIGMA_LATENCY_SCALE", "1.0"))
+    models = {
+        "embed": LatencyModel(4, 2, seed=1),
+        "vector": LatencyModel(20, 10, tail_prob=0.05, tail_ms=150, seed=2),
+        "graph": LatencyModel(6, 4, tail_prob=0.02, tail_ms=60, seed=3),
+        "llm": LatencyModel(500, 300, tail_prob=0.05, tail_ms=1500, seed=4),
+    }
+    for m in models.values():
+        m.scale = scale
+    return models
+
+# -----------------------------
+# Embedding model
+# -----------------------------
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+class LocalEmbedder:
+    """Signed feature hashing of words and bigrams; same call shape as SentenceTransformer.encode."""
+
+    def __init__(self, dim=VECTOR_DIM, latency: Optional[LatencyModel] = None):
+        self.dim = dim
+        self.latency = latency or LatencyModel()
+        self._token_cache: Dict[str, tuple] = {}
+
+    def _slot(self, token):
+        slot = self._token_cache.get(token)
+        if slot is None:
+            digest = hashlib.md5(token.encode("utf-8")).digest()
+            slot = (int.from_bytes(digest[:4], "little") % self.dim, 1.0 if digest[4] & 1 else -1.0)
+            self._token_cache[token] = slot
+        return slot
+
+    def encode(self, texts, batch_size=32, **kwargs):
+        if isinstance(texts, str):
+            texts = [texts]
+        self.latency.wait()
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = TOKEN_PATTERN.findall(text.lower())
+            for token in words + [f"{a}_{b}" for a, b in zip(words, words[1:])]:
+                pos, sign = self._slot(token)
+                out[row, pos] += sign
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.maximum(norms, 1e-12)
+
+# -----------------------------
+# Vector index (Pinecone)
+# -----------------------------
+def _matches_filter(meta: dict, flt: Optional[dict]) -> bool:
+    """Subset of Pinecone filter syntax: $and, $or, $eq, $ne, $in, $nin."""
+    if not flt:
+        return True
+    for key, cond in flt.items():
+        if key == "$and":
+            if not all(_matches_filter(meta, c) for c in cond):
+                return False
+            continue
+        if key == "$or":
+            if not any(_matches_filter(meta, c) for c in cond):
+                return False
+            continue
+        value = meta.get(key)
+        values = value if isinstance(value, list) else [value]
+        if not isinstance(cond, dict):
+            cond = {"$eq": cond}
+        for op, arg in cond.items():
+            if op == "$eq" and arg not in values:
+                return False
+            if op == "$ne" and arg in values:
+                return False
+            if op == "$in" and not set(values) & set(arg):
+                return False
+            if op == "$nin" and set(values) & set(arg):
+                return False
+    return True
+
+class LocalVectorIndex:
+    """Brute-force cosine index with the pinecone Index.query/upsert/fetch call shapes."""
+
+    def __init__(self, dim=VECTOR_DIM, latency: Optional[LatencyModel] = None):
+        self.dim = dim
+        self.latency = latency or LatencyModel()
+        self.ids: List[str] = []
+        self.positions: Dict[str, int] = {}
+        self.metadata: List[dict] = []
+        self.matrix = np.zeros((0, dim), dtype=np.float32)
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_nodes(cls, nodes, embedder, latency=None):
+        idx = cls(dim=embedder.dim, latency=latency)
+        items = []
+        for node in nodes:
+            text = node.get("semantic_text") or (node.get("description") or "")[:1000]
+            if text.strip():
+                items.append((node["id"], text, node_metadata(node)))
+        vecs = embedder.encode([t for _, t, _ in items])
+        idx.upsert([{"id": i, "values": v, "metadata": m} for (i, _, m), v in zip(items, vecs)])
+        return idx
+
+    def upsert(self, vectors):
+        vectors = list({v["id"]: v for v in vectors}.values())
+        with self.lock:
+            rows = []
+            for v in vectors:
+                vec = np.asarray(v["values"], dtype=np.float32)
+                vec = vec / max(float(np.linalg.norm(vec)), 1e-12)
+                if v["id"] in self.positions:
+                    pos = self.positions[v["id"]]
+                    self.matrix[pos] = vec
+                    self.metadata[pos] = v.get("metadata", {})
+                else:
+                    self.positions[v["id"]] = len(self.ids) + len(rows)
+                    rows.append((v["id"], vec, v.get("metadata", {})))
+            if rows:
+                self.ids.extend(r[0] for r in rows)
+                self.metadata.extend(r[2] for r in rows)
+                self.matrix = np.vstack([self.matrix, np.stack([r[1] for r in rows])])
+        return {"upserted_count": len(vectors)}
+
+    def fetch(self, ids):
+        self.latency.wait()
+        vectors = {}
+        for i in ids:
+            pos = self.positions.get(i)
+            if pos is not None:
+                vectors[i] = {"id": i, "values": self.matrix[pos].tolist(), "metadata": self.metadata[pos]}
+        return {"vectors": vectors}
+
+    def query(self, vector, top_k=10, include_metadata=True, include_values=False, filter=None, **kwargs):
+        self.latency.wait()
+        q = np.asarray(vector, dtype=np.float32)
+        q = q / max(float(np.linalg.norm(q)), 1e-12)
+        scores = self.matrix @ q
+        if filter:
+            mask = np.fromiter((_matches_filter(m, filter) for m in self.metadata), dtype=bool,
+                               count=len(self.metadata))
+            scores = np.where(mask, scores, -np.inf)
+        k = min(top_k, len(scores))
+        if k <= 0:
+            return {"matches": []}
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        matches = []
+        for pos in top:
+            if not np.isfinite(scores[pos]):
+                break
+            match = {"id": self.ids[pos], "score": float(scores[pos])}
+            if include_metadata:
+                match["metadata"] = self.metadata[pos]
+            if include_values:
+                match["values"] = self.matrix[pos].tolist()
+            matches.append(match)
+        return {"matches": matches}
+
+    def describe_index_stats(self):
+        return SimpleNamespace(total_vector_count=len(self.ids), dimension=self.dim)
+
+# -----------------------------
+# Graph database (Neo4j)
+# -----------------------------
+class LocalGraphDriver:
+    """Answers the app's Cypher queries from an in-memory adjacency list. Handlers are
+    registered per query constant, so a query nobody registered fails loudly instead
+    of being answered by a look-alike."""
+
+    def __init__(self, nodes, latency: Optional[LatencyModel] = None, priors=None):
+        self.latency = latency or LatencyModel()
+        self.nodes = {n["id"]: n for n in nodes}
+        self.adjacency: Dict[str, List[tuple]] = {nid: [] for nid in self.nodes}
+        for node in nodes:
+            for rel in node.get("connections", []):
+                target = rel.get("target")
+                if target in self.nodes:
+                    relation = rel.get("relation", "RELATED_TO")
+                    self.adjacency[node["id"]].append((relation, target))
+                    self.adjacency[target].append((relation, node["id"]))
+        if priors is not None:
+            # Pre-sorted, so NEIGHBOR_ORDER queries cost nothing extra here either
+            for adj in self.adjacency.values():
+                adj.sort(key=lambda edge: -priors.get(edge[1], "pagerank"))
+        self.queries_run = 0
+        self.meta = {"version": 0, "change_seq": 0, "changes": []}
+        self.handlers: Dict[str, Callable[[dict], list]] = {
+            BATCH_QUERY: self.batch_neighbors,
+            META_QUERY: self.read_meta,
+            BUMP_VERSION: self.bump_version,
+            PUBLISH_CHANGES: self.publish_changes,
+            AFFECTED_QUERY: self.affected,
+            PING_QUERY: lambda params: [{"test": 1}],
+            COUNT_QUERY: lambda params: [{"count": len(self.nodes)}],
+            CITY_LINKS_QUERY: self.city_links,
+        }
+
+    def register(self, query: str, handler: Callable[[dict], list]):
+        """Answer `query` (the exact text) with handler(params)."""
+        self.handlers[query] = handler
+
+    def session(self, **kwargs):
+        return LocalSession(self)
+
+    def verify_connectivity(self):
+        return True
+
+    def close(self):
+        pass
+
+    # graph_cache's version / change feed on the :GraphMeta node
+    def read_meta(self, params):
+        return [dict(self.meta)] if self.meta["change_seq"] else []
+
+    def bump_version(self, params):
+        self.meta["change_seq"] += 1
+        self.meta["version"] += 1
+        self.meta["changes"] = []
+        return []
+
+    def publish_changes(self, params):
+        self.meta["change_seq"] += 1
+        entry = f"{self.meta['change_seq']}|{params['changed']}"
+        self.meta["changes"] = (self.meta["changes"] + [entry])[-CHANGELOG_SIZE:]
+        return []
+
+    def affected(self, params):
+        """Nodes next to changed ones"""
+        return [{"id": other} for other in dict.fromkeys(
+            other for nid in params["ids"] for _, other in self.adjacency.get(nid, []))]
+
+    def city_links(self, params):
+        """route_index.CITY_LINKS_QUERY: Connected_To neighbors per city"""
+        return [{"cid": cid, "links": list(dict.fromkeys(
+            other for relation, other in self.adjacency[cid] if relation == "Connected_To"))}
+                for cid in params["ids"] if cid in self.nodes]
+
+    def batch_neighbors(self, params):
+        """graph_loader.BATCH_QUERY: one round trip for many nodes"""
+        return [{"nid": nid, "rows": self.neighbors(nid, params.get("limit"))}
+                for nid in dict.fromkeys(params["ids"]) if self.adjacency.get(nid)]
+
+    def neighbors(self, nid, limit=None):
+        out = []
+        for relation, other in self.adjacency.get(nid, [])[:limit]:
+            m = self.nodes[other]
+            out.append({
+                "rel": relation,
+                "relationship": relation,
+                "labels": [m.get("type", "Unknown"), "Entity"],
+                "id": other,
+                "name": m.get("name"),
+                "type": m.get("type"),
+                "description": m.get("description"),
+            })
+        return out
+
+class LocalSession:
+    def __init__(self, driver: LocalGraphDriver):
+        self.driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def close(self):
+        pass
+
+    def run(self, query, parameters=None, **kwargs):
+        params = dict(parameters or {}, **kwargs)
+        handler = self.driver.handlers.get(query)
+        if handler is None:
+            raise NotImplementedError(f"Local graph stand-in has no handler registered for: {query}")
+        self.driver.latency.wait()
+        self.driver.queries_run += 1
+        return handler(params)
+
+# -----------------------------
+# Chat model (OpenAI)
+# -----------------------------
+NODE_ID_PATTERN = re.compile(r"\b(?:city|attraction|hotel|activity)_[a-z0-9_]+\b")
+
+class LocalChatClient:
+    """Mimics client.chat.completions.create with a deterministic templated answer."""
+
+    def __init__(self, latency: Optional[LatencyModel] = None):
+        self.latency = latency or LatencyModel()
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model=None, messages=None, max_tokens=600, temperature=0.0, timeout=None, **kwargs):
+        ms = self.latency.sample_ms()
+        if timeout is not None and ms > timeout * 1000:
+            # like the client's request timeout: give up after `timeout` seconds
+            time.sleep(timeout)
+            raise TimeoutError(f"chat completion timed out after {timeout:.2f}s")
+        if ms > 0:
+            time.sleep(ms / 1000)
+        self.calls += 1
+        prompt = "\n".join(m.get("content", "") for m in messages or [])
+        ids = list(dict.fromkeys(NODE_ID_PATTERN.findall(prompt)))[:5]
+        content = "Suggested places: " + (", ".join(ids) if ids else "none found") + "."
+        usage = SimpleNamespace(prompt_tokens=len(prompt.split()), completion_tokens=len(content.split()))
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=usage)
+
+# -----------------------------
+# Wiring
+# -----------------------------
+def build_local_backends(path=DATA_FILE, latency: Optional[Dict[str, LatencyModel]] = None) -> dict:
+    """Embedder, vector index, graph driver and chat client over the same dataset."""
+    latency = latency or default_latency()
+    nodes = load_nodes(path)
+    embedder = LocalEmbedder()
+    index = LocalVectorIndex.from_nodes(nodes, embedder, latency=latency["vector"])
+    # Corpus embedding happens at startup; only query-time encodes pay latency
+    embedder.latency = latency["embed"]
+    return {
+        "model": embedder,
+        "index": index,
+        "driver": LocalGraphDriver(nodes, latency=latency["graph"], priors=GraphPriors.compute(nodes)),
+        "chat": LocalChatClient(latency=latency["llm"]),
+        "latency": latency,
+    }
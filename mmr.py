@@ -0,0 +1,85 @@
+# mmr.py
+# Maximal marginal relevance diversification of retrieval results
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+# -----------------------------
+# Config
+# -----------------------------
+MMR_LAMBDA = 0.7        # 1.0 = pure relevance, 0.0 = pure diversity
+MMR_FETCH_K = 20        # candidates fetched (with vectors) before selection
+MAX_PER_CITY = None     # optional cap on results sharing a city
+
+def mmr_select(query_vec, candidate_vecs, top_k: int, lambda_mult=MMR_LAMBDA,
+               groups: Optional[Sequence] = None, max_per_group: Optional[int] = None,
+               relevance: Optional[Sequence[float]] = None) -> List[int]:
+    """Greedy MMR over a candidate matrix; returns selected row indices in order.
+
+    The full candidate similarity matrix is computed once, then each step is a
+    vectorized argmax over lambda * relevance - (1 - lambda) * max similarity
+    to anything already selected. Relevance is cosine to the query unless given
+    (e.g. cross-encoder scores); given scores are min-max scaled to [0, 1].
+    """
+    vecs = np.asarray(candidate_vecs, dtype=np.float32)
+    n = len(vecs)
+    if n == 0 or top_k <= 0:
+        return []
+    vecs = vecs / np.maximum(np.linalg.norm(vecs, axis=1, keepdims=True), 1e-12)
+    q = np.asarray(query_vec, dtype=np.float32)
+    q = q / max(float(np.linalg.norm(q)), 1e-12)
+
+    if relevance is None:
+        relevance = vecs @ q
+    else:
+        relevance = np.asarray(relevance, dtype=np.float32)
+        spread = float(relevance.max() - relevance.min())
+        relevance = (relevance - relevance.min()) / spread if spread > 0 else np.ones(n, dtype=np.float32)
+    sim = vecs @ vecs.T
+    max_sim = np.zeros(n, dtype=np.float32)
+    available = np.ones(n, dtype=bool)
+    codes = None
+    if groups is not None and max_per_group:
+        labels = {}
+        codes = np.asarray([labels.setdefault(g, len(labels)) for g in groups])
+        group_counts = np.zeros(len(labels), dtype=int)
+    selected = []
+
+    while len(selected) < min(top_k, n) and available.any():
+        if selected:
+            scores = lambda_mult * relevance - (1 - lambda_mult) * max_sim
+        else:
+            scores = relevance.copy()
+        scores[~available] = -np.inf
+        idx = int(np.argmax(scores))
+        if not np.isfinite(scores[idx]):
+            break
+        selected.append(idx)
+        available[idx] = False
+        np.maximum(max_sim, sim[idx], out=max_sim)
+
+        if codes is not None:
+            g = codes[idx]
+            group_counts[g] += 1
+            if group_counts[g] >= max_per_group:
+                available &= codes != g
+    return selected
+
+def diversify(query_vec, matches: list, top_k: int, lambda_mult=MMR_LAMBDA,
+              max_per_city: Optional[int] = MAX_PER_CITY) -> list:
+    """Apply MMR to Pinecone matches fetched with include_values=True. Reranked matches
+    keep the cross-encoder's judgement: their rerank_score is the relevance term."""
+    usable = [m for m in matches if m.get("values")]
+    if len(usable) < len(matches):
+        # Without vectors there is nothing to compare; keep the relevance order
+        return list(matches[:top_k])
+    cities = [(m.get("metadata") or {}).get("city", "") for m in usable]
+    relevance = None
+    if usable and all(m.get("rerank_score") is not None for m in usable):
+        relevance = [m["rerank_score"] for m in usable]
+    order = mmr_select(query_vec, [m["values"] for m in usable], top_k, lambda_mult,
+                       groups=cities, max_per_group=max_per_city, relevance=relevance)
+    return [usable[i] for i in order]
+
+def mmr_enabled(lambda_mult, max_per_city) -> bool:
+    return lambda_mult < 1.0 or bool(max_per_city)
@@ -1,9 +1,12 @@
 # pinecone_upload.py
-import json
+import argparse
+import itertools
 import time
 from tqdm import tqdm
 from sentence_transformers import SentenceTransformer
 from pinecone import Pinecone, ServerlessSpec
+from attribute_index import node_metadata
+from dataset_io import iter_nodes
 import config
 
 # -----------------------------
@@ -50,33 +53,29 @@ def get_embeddings(texts):
     return model.encode(texts).tolist()
 
 def chunked(iterable, n):
-    for i in range(0, len(iterable), n):
-        yield iterable[i:i+n]
+    it = iter(iterable)
+    while True:
+        batch = list(itertools.islice(it, n))
+        if not batch:
+            return
+        yield batch
 
 # -----------------------------
 # Main upload
 # -----------------------------
-def main():
-    with open(DATA_FILE, "r", encoding="utf-8") as f:
-        nodes = json.load(f)
-
-    items = []
-    for node in nodes:
+def iter_items(data_file):
+    for node in iter_nodes(data_file):
         semantic_text = node.get("semantic_text") or (node.get("description") or "")[:1000]
         if not semantic_text.strip():
             continue
-        meta = {
-            "id": node.get("id"),
-            "type": node.get("type"),
-            "name": node.get("name"),
-            "city": node.get("city", node.get("region", "")),
-            "tags": node.get("tags", [])
-        }
-        items.append((node["id"], semantic_text, meta))
+        meta = node_metadata(node)
+        yield (node["id"], semantic_text, meta)
 
-    print(f"Preparing to upsert {len(items)} items to Pinecone...")
+def main(data_file=DATA_FILE):
+    # items are streamed in batches so large .jsonl datasets never sit in memory
+    print(f"Preparing to upsert items from {data_file} to Pinecone...")
 
-    for batch in tqdm(list(chunked(items, BATCH_SIZE)), desc="Uploading batches"):
+    for batch in tqdm(chunked(iter_items(data_file), BATCH_SIZE), desc="Uploading batches"):
         ids = [item[0] for item in batch]
         texts = [item[1] for item in batch]
         metas = [item[2] for item in batch]
@@ -95,4 +94,6 @@ def main():
 
 # -----------------------------
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Embed a travel dataset and upsert it to Pinecone")
+    parser.add_argument("--data", default=DATA_FILE, help="Dataset (.json array or .jsonl)")
+    main(parser.parse_args().data)
@@ -0,0 +1,185 @@
+# prefetch.py
+# Speculative prefetch while the LLM is generating: warm the graph neighborhoods and
+# vector candidate pools a follow-up question is most likely to need (2-hop
+# neighbors of the top matches, hotels / activities in their cities). Work runs on
+# a small bounded executor, queued jobs are cancelled when the conversation moves
+# on, and hit rates show whether the extra backend load pays off. Callers pass an
+# `accept` check to take() so values fetched before a data change are dropped.
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# -----------------------------
+# Config
+# -----------------------------
+PREFETCH_WORKERS = 2
+MAX_PENDING = 16          # queued + running jobs; further jobs are dropped, not queued
+MAX_ENTRIES = 2000        # prefetched results kept (LRU)
+TWO_HOP_NODES = 6         # neighbors of the top matches whose own neighborhoods are warmed
+CITY_MEMBERS = 3          # hotels / activities per city whose neighborhoods are warmed
+POOL_TYPES = ("Hotel", "Activity")
+POOL_K = 20               # vector candidates prefetched per (city, type)
+
+class Prefetcher:
+    """Bounded background warming of graph neighborhoods and vector candidate pools."""
+
+    def __init__(self, max_workers=PREFETCH_WORKERS, max_pending=MAX_PENDING, max_entries=MAX_ENTRIES):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self.max_pending = max_pending
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries: "OrderedDict[tuple, dict]" = OrderedDict()   # key -> {"value", "used"}
+        self.in_flight: Dict[tuple, object] = {}
+        self.owners: Dict[str, List[Tuple[tuple, object]]] = {}
+        self.stats = {"scheduled": 0, "completed": 0, "cancelled": 0, "dropped": 0, "errors": 0,
+                      "hits": 0, "misses": 0, "stale": 0, "unused_evicted": 0}
+
+    # -----------------------------
+    # Scheduling
+    # -----------------------------
+    def schedule(self, owner: str, key: tuple, fn: Callable[[], object]) -> bool:
+        """Run fn() in the background and keep its result under key. Skips keys that are
+        cached or already running; drops the job when the executor is saturated."""
+        with self.lock:
+            if key in self.entries or key in self.in_flight:
+                return False
+            if len(self.in_flight) >= self.max_pending:
+                self.stats["dropped"] += 1
+                return False
+            future = self.executor.submit(self._run, key, fn)
+            self.in_flight[key] = future
+            jobs = [job for job in self.owners.get(owner, []) if not job[1].done()]
+            self.owners[owner] = jobs + [(key, future)]
+            if len(self.owners) > self.max_entries:
+                self.owners = {o: j for o, j in self.owners.items() if any(not f.done() for _, f in j)}
+            self.stats["scheduled"] += 1
+            return True
+
+    def _run(self, key, fn):
+        try:
+            value = fn()
+        except Exception as e:
+            print(f"⚠️ Prefetch {key} failed: {e}")
+            with self.lock:
+                self.stats["errors"] += 1
+                self.in_flight.pop(key, None)
+            return
+        with self.lock:
+            self.in_flight.pop(key, None)
+            self.stats["completed"] += 1
+            self.entries[key] = {"value": value, "used": False}
+            while len(self.entries) > self.max_entries:
+                _, old = self.entries.popitem(last=False)
+                if not old["used"]:
+                    self.stats["unused_evicted"] += 1
+
+    def cancel(self, owner: str) -> int:
+        """Cancel an owner's jobs that have not started yet (running ones finish)."""
+        with self.lock:
+            jobs = self.owners.pop(owner, [])
+            cancelled = 0
+            for key, future in jobs:
+                if future.cancel():
+                    self.in_flight.pop(key, None)
+                    cancelled += 1
+            self.stats["cancelled"] += cancelled
+            return cancelled
+
+    # -----------------------------
+    # Lookups
+    # -----------------------------
+    def take(self, key: tuple, accept: Optional[Callable[[object], bool]] = None):
+        """Prefetched value for key, or None; counts a hit or a miss. A value that
+        `accept` rejects (e.g. read before a graph update) is discarded as stale."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and accept is not None and not accept(entry["value"]):
+                del self.entries[key]
+                self.stats["stale"] += 1
+                entry = None
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self.entries.move_to_end(key)
+            entry["used"] = True
+            self.stats["hits"] += 1
+            return entry["value"]
+
+    def report(self) -> dict:
+        with self.lock:
+            stats = dict(self.stats)
+            used = sum(1 for e in self.entries.values() if e["used"])
+            pending = len(self.in_flight)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        # share of finished prefetches that some request actually used
+        stats["useful_rate"] = round(used / stats["completed"], 4) if stats["completed"] else 0.0
+        stats["pending"] = pending
+        return stats
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+# -----------------------------
+# What to prefetch
+# -----------------------------
+def prefetch_plan(matches: list, facts: List[dict], aggregates: dict, priors=None,
+                  known=()) -> Tuple[List[str], List[Tuple[str, str]]]:
+    """(node ids whose neighborhoods to warm, (city id, type) vector pools to warm)."""
+    known = set(known) | {m["id"] for m in matches}
+    nodes = []
+    for f in facts:  # facts arrive ordered by centrality, so hubs come first
+        if f["target_id"] not in known and f["target_id"] not in nodes:
+            nodes.append(f["target_id"])
+    nodes = nodes[:TWO_HOP_NODES]
+
+    city_ids = []
+    lookup = aggregates.get("city_lookup", {})
+    for m in matches:
+        meta = m.get("metadata") or {}
+        city_id = m["id"] if meta.get("type") == "City" else lookup.get((meta.get("city") or "").lower())
+        if city_id in aggregates["cities"] and city_id not in city_ids:
+            city_ids.append(city_id)
+
+    pools = []
+    for city_id in city_ids:
+        city = aggregates["cities"][city_id]
+        for node_type in POOL_TYPES:
+            members = [item["id"] for item in city["members"].get(node_type, [])]
+            if priors is not None:
+                members.sort(key=lambda nid: -priors.get(nid))
+            nodes += [nid for nid in members[:CITY_MEMBERS] if nid not in known and nid not in nodes]
+            # Only pools small enough to hold every member, so ranking them is exact
+            if 0 < len(members) <= POOL_K:
+                pools.append((city_id, node_type))
+    return nodes, pools
+
+def pool_key(city_id: Optional[str], node_type: Optional[str]):
+    """Prefetch key of the vector pool holding every node of one type in one city."""
+    node_type = next((t for t in POOL_TYPES if t.lower() == (node_type or "").lower()), None)
+    return ("pool", city_id, node_type) if city_id and node_type else None
+
+def request_pool_key(filters: Optional[dict], city_lookup: dict):
+    """Pool that answers a request filtered to exactly one city and one type.
+
+    Unfiltered requests never use a pool: whether it was prefetched must not change
+    which candidates a question is ranked against."""
+    if not filters or set(filters) != {"city", "type"} or len(filters["city"]) != 1 or len(filters["type"]) != 1:
+        return None
+    return pool_key(city_lookup.get(filters["city"][0].lower()), filters["type"][0])
+
+def rank_pool(query_vec, pool: list, top_k: int) -> list:
+    """Score a prefetched candidate pool (fetched with include_values=True) against a new query."""
+    usable = [m for m in pool if m.get("values")]
+    if not usable:
+        return []
+    q = np.asarray(query_vec, dtype=np.float32)
+    q = q / max(float(np.linalg.norm(q)), 1e-12)
+    vecs = np.asarray([m["values"] for m in usable], dtype=np.float32)
+    scores = vecs @ q / np.maximum(np.linalg.norm(vecs, axis=1), 1e-12)
+    order = np.argsort(-scores, kind="stable")[:top_k]
+    return [{"id": usable[i]["id"], "score": float(scores[i]), "metadata": usable[i].get("metadata", {}),
+             "values": usable[i]["values"]} for i in order]
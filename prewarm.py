@@ -0,0 +1,145 @@
+# prewarm.py
+# Startup and scheduled prewarming. The suggestion-chip queries are the most common
+# ones, so after a deploy they are run through the full pipeline (router, embedding,
+# Pinecone, Neo4j, LLM) before real users arrive: that fills the result and answer
+# caches, opens the backend connections and warms the model with a few dummy encodes.
+# The instance reports not-ready until the first pass finishes, and later passes
+# refresh the list plus the currently trending searches.
+import json
+import os
+import threading
+import time
+from typing import Callable, List, Optional
+
+# -----------------------------
+# Config
+# -----------------------------
+# Chips in templates/index.html (search) and api/index.py (chat)
+DEFAULT_QUERIES = [
+    {"endpoint": "search", "query": "Best places to visit in Hanoi"},
+    {"endpoint": "search", "query": "Beach destinations in Vietnam"},
+    {"endpoint": "search", "query": "Cultural attractions in Ho Chi Minh City"},
+    {"endpoint": "search", "query": "Food experiences in Vietnam"},
+    {"endpoint": "chat", "query": "Best places to visit in Hanoi"},
+    {"endpoint": "chat", "query": "Beach destinations in Vietnam"},
+    {"endpoint": "chat", "query": "Cultural attractions"},
+    {"endpoint": "chat", "query": "Food experiences"},
+]
+PREWARM_FILE = os.environ.get("PREWARM_FILE")      # JSONL overriding DEFAULT_QUERIES
+INTERVAL_S = float(os.environ.get("PREWARM_INTERVAL_S", 600))
+TRENDING_N = 10          # trending searches added to scheduled passes
+DUMMY_ENCODES = (1, 8, 32)  # batch sizes encoded once each to warm the model
+DUMMY_TEXT = "Warm up the embedding model with a typical travel question about Vietnam"
+
+def load_queries(path: Optional[str] = PREWARM_FILE) -> List[dict]:
+    """{"endpoint": "search"|"chat", "query", optional "filters"} lines or bare strings (search)."""
+    if not path:
+        return list(DEFAULT_QUERIES)
+    queries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line) if line.startswith("{") else {"query": line}
+            queries.append({"endpoint": item.get("endpoint", "search"), "query": item["query"],
+                            "filters": item.get("filters") or {}})
+    return queries
+
+class Prewarmer:
+    """Runs the warmup list through the pipeline once at startup, then every interval_s."""
+
+    def __init__(self, search: Callable, chat: Callable, encode: Optional[Callable] = None,
+                 queries: Optional[List[dict]] = None, trending: Optional[Callable[[int], List[dict]]] = None,
+                 interval_s=INTERVAL_S):
+        self.search = search
+        self.chat = chat
+        self.encode = encode
+        self.queries = queries if queries is not None else load_queries()
+        self.trending = trending
+        self.interval_s = interval_s
+        self.ready = threading.Event()
+        self.state = "pending"
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        self.stats = {"passes": 0, "failures": 0, "last_pass_ms": None, "first_pass_ms": None}
+        self.last_run: List[dict] = []
+
+    def warm_model(self):
+        if self.encode is None:
+            return
+        for batch in DUMMY_ENCODES:
+            self.encode([DUMMY_TEXT] * batch)
+
+    def plan(self, include_trending: bool) -> List[dict]:
+        queries = [dict(q, filters=q.get("filters") or {}) for q in self.queries]
+        if include_trending and self.trending is not None:
+            try:
+                queries += [{"endpoint": "search", "query": t["query"], "filters": t.get("filters") or {}}
+                            for t in self.trending(TRENDING_N)]
+            except Exception as e:
+                print(f"⚠️ Trending queries unavailable for prewarm: {e}")
+        unique = {}
+        for q in queries:
+            unique.setdefault(json.dumps([q["endpoint"], q["query"], q["filters"]], sort_keys=True), q)
+        return list(unique.values())
+
+    def run_once(self, include_trending=False) -> List[dict]:
+        """One pass over the list; failures are reported, never raised."""
+        start = time.perf_counter()
+        try:
+            self.warm_model()
+        except Exception as e:
+            print(f"⚠️ Model warmup failed: {e}")
+        results = []
+        for q in self.plan(include_trending):
+            if self.stop_event.is_set():
+                break
+            run = self.chat if q["endpoint"] == "chat" else self.search
+            t0 = time.perf_counter()
+            try:
+                ok = bool(run(q["query"], q["filters"]).get("success"))
+                error = None
+            except Exception as e:
+                ok, error = False, str(e)
+            result = {"endpoint": q["endpoint"], "query": q["query"], "ok": ok,
+                      "ms": round((time.perf_counter() - t0) * 1000, 2)}
+            if error:
+                result["error"] = error
+            results.append(result)
+        elapsed = round((time.perf_counter() - start) * 1000, 2)
+        with self.lock:
+            self.stats["passes"] += 1
+            self.stats["failures"] += sum(1 for r in results if not r["ok"])
+            self.stats["last_pass_ms"] = elapsed
+            if self.stats["first_pass_ms"] is None:
+                self.stats["first_pass_ms"] = elapsed
+            self.last_run = results
+        return results
+
+    def _loop(self):
+        self.state = "warming"
+        results = self.run_once()
+        failed = sum(1 for r in results if not r["ok"])
+        print(f"🔥 Prewarm done: {len(results) - failed}/{len(results)} queries in {self.stats['first_pass_ms']} ms")
+        self.state = "ready"
+        self.ready.set()
+        while not self.stop_event.wait(self.interval_s):
+            self.run_once(include_trending=True)
+
+    def start(self):
+        """Warm in the background; readiness flips once the first pass is done."""
+        threading.Thread(target=self._loop, daemon=True, name="prewarm").start()
+
+    def skip(self):
+        """Prewarming disabled: ready at once."""
+        self.state = "disabled"
+        self.ready.set()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def report(self) -> dict:
+        with self.lock:
+            return dict(self.stats, state=self.state, ready=self.ready.is_set(),
+                        queries=len(self.queries), last_run=list(self.last_run))
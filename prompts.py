@@ -0,0 +1,77 @@
+# prompts.py
+# Prompt construction shared by hybrid_chat.py and the web API
+
+SYSTEM_PROMPT = (
+    "You are a helpful travel assistant. Use the provided semantic search results "
+    "and graph facts to answer the user's query briefly and concisely. "
+    "Cite node ids when referencing specific places or attractions."
+)
+
+def format_matches(pinecone_matches):
+    vec_context = []
+    for m in pinecone_matches:
+        meta = m["metadata"]
+        score = m.get("score", None)
+        snippet = f"- id: {m['id']}, name: {meta.get('name','')}, type: {meta.get('type','')}, score: {score}"
+        if meta.get("city"):
+            snippet += f", city: {meta.get('city')}"
+        vec_context.append(snippet)
+    return vec_context
+
+def format_facts(graph_facts):
+    return [
+        f"- ({f['source']}) -[{f['rel']}]-> ({f['target_id']}) {f['target_name']}: {f['target_desc']}"
+        for f in graph_facts
+    ]
+
+def _route_parts(route):
+    if route:
+        return ("Suggested route (shortest path over city connections, then alternatives per leg):\n"
+                + route + "\n\n",
+                "suggest 2–3 concrete itinerary steps that follow the suggested route, or tips")
+    return "", "suggest 2–3 concrete itinerary steps or tips"
+
+def build_prompt(user_query, pinecone_matches, graph_facts, route=None):
+    """Build a chat prompt combining vector DB matches, graph facts and an optional
+    precomputed city route (route_index.RouteIndex.describe)."""
+    vec_context = format_matches(pinecone_matches)
+    graph_context = format_facts(graph_facts)
+    route_context, itinerary_hint = _route_parts(route)
+
+    prompt = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content":
+         f"User query: {user_query}\n\n"
+         "Top semantic matches (from vector DB):\n" + "\n".join(vec_context[:10]) + "\n\n"
+         "Graph facts (neighboring relations):\n" + "\n".join(graph_context[:20]) + "\n\n"
+         + route_context +
+         f"Based on the above, answer the user's question. If helpful, {itinerary_hint} and mention node ids for references."}
+    ]
+    return prompt
+
+def build_session_prompt(user_query, new_matches, new_facts, history, summary="",
+                         known_ids=(), route=None):
+    """Follow-up prompt for a conversation session (sessions.py).
+
+    Earlier turns are replayed as sent (they already carry their context), older
+    ones survive only in `summary`, and the new user message adds just the matches
+    and graph facts the model has not seen yet.
+    """
+    prompt = [{"role": "system", "content": SYSTEM_PROMPT}]
+    if summary:
+        prompt.append({"role": "system", "content": "Conversation so far (summary):\n" + summary})
+    prompt.extend(history)
+
+    route_context, itinerary_hint = _route_parts(route)
+    sections = [f"User query: {user_query}\n\n"]
+    if new_matches:
+        sections.append("New semantic matches (from vector DB):\n" + "\n".join(format_matches(new_matches)[:10]) + "\n\n")
+    if new_facts:
+        sections.append("New graph facts (neighboring relations):\n" + "\n".join(format_facts(new_facts)[:20]) + "\n\n")
+    if known_ids:
+        sections.append("Also relevant, already described above: " + ", ".join(known_ids) + "\n\n")
+    sections.append(route_context)
+    sections.append(f"Based on the conversation and the above, answer the user's question. If helpful, "
+                    f"{itinerary_hint} and mention node ids for references.")
+    prompt.append({"role": "user", "content": "".join(sections)})
+    return prompt
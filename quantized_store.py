@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# quantized_store.py
+# Compact local vector storage for large POI sets: int8 scalar codes and 1-bit
+# binary codes are held in memory, full-precision float32 vectors stay on disk
+# (memory-mapped). A query scans the compressed codes for a candidate pool and
+# rescores only that pool exactly against the float32 rows.
+import argparse
+import json
+import os
+import time
+from typing import List, Tuple
+
+import numpy as np
+
+# -----------------------------
+# Config
+# -----------------------------
+STORE_DIR = "vector_store"
+RESCORE_FACTOR = 8       # candidates rescored = top_k * RESCORE_FACTOR
+SCAN_BLOCK = 8192         # rows per block when scanning int8 codes
+MODES = ("float32", "int8", "binary")
+
+# Number of set bits for every byte value, for Hamming distance over packed codes
+POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.uint16)
+
+def quantize_int8(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-dimension int8 codes and the scale that maps them back to floats."""
+    scale = np.abs(vectors).max(axis=0) / 127.0 if len(vectors) else np.ones(vectors.shape[1])
+    scale = np.maximum(scale, 1e-12).astype(np.float32)
+    codes = np.clip(np.rint(vectors / scale), -127, 127).astype(np.int8)
+    return codes, scale
+
+def quantize_binary(vectors: np.ndarray) -> np.ndarray:
+    """Sign bits packed 8 per byte (384 dims -> 48 bytes)."""
+    return np.packbits(vectors > 0, axis=1)
+
+def _as_words(codes: np.ndarray) -> np.ndarray:
+    """View packed codes as uint64 words when the width allows, so XOR touches 8x fewer items."""
+    if codes.shape[-1] % 8 == 0 and codes.flags.c_contiguous:
+        return codes.view(np.uint64)
+    return codes
+
+def hamming_distances(codes: np.ndarray, query_code: np.ndarray) -> np.ndarray:
+    xor = np.bitwise_xor(_as_words(codes), _as_words(query_code[None, :]))
+    if hasattr(np, "bitwise_count"):  # numpy >= 2.0
+        return np.bitwise_count(xor).sum(axis=1, dtype=np.uint16)
+    return POPCOUNT[xor.view(np.uint8)].sum(axis=1)
+
+def top_k_rows(scores: np.ndarray, k: int, largest=True) -> np.ndarray:
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    keyed = -scores if largest else scores
+    top = np.argpartition(keyed, k - 1)[:k]
+    return top[np.argsort(keyed[top], kind="stable")]
+
+class QuantizedVectorStore:
+    """int8 / binary codes in RAM plus float32 vectors memory-mapped from disk."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, "ids.json"), "r", encoding="utf-8") as f:
+            self.ids: List[str] = json.load(f)
+        self.full = np.load(os.path.join(directory, "vectors_f32.npy"), mmap_mode="r")
+        self.int8_codes = np.load(os.path.join(directory, "codes_int8.npy"))
+        self.int8_scale = np.load(os.path.join(directory, "scale_int8.npy"))
+        self.binary_codes = np.load(os.path.join(directory, "codes_binary.npy"))
+        self.dim = self.full.shape[1]
+
+    @classmethod
+    def build(cls, ids: List[str], vectors: np.ndarray, directory=STORE_DIR):
+        """Normalize, quantize and write everything under `directory`."""
+        os.makedirs(directory, exist_ok=True)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        codes, scale = quantize_int8(vectors)
+        np.save(os.path.join(directory, "vectors_f32.npy"), vectors)
+        np.save(os.path.join(directory, "codes_int8.npy"), codes)
+        np.save(os.path.join(directory, "scale_int8.npy"), scale)
+        np.save(os.path.join(directory, "codes_binary.npy"), quantize_binary(vectors))
+        with open(os.path.join(directory, "ids.json"), "w", encoding="utf-8") as f:
+            json.dump(list(ids), f)
+        return cls(directory)
+
+    def __len__(self):
+        return len(self.ids)
+
+    # -----------------------------
+    # Candidate generation
+    # -----------------------------
+    def _int8_candidates(self, q: np.ndarray, n: int) -> np.ndarray:
+        """Asymmetric int8 scan: float query against int8 codes, block by block."""
+        qs = (q * self.int8_scale).astype(np.float32)
+        best_idx = np.zeros(0, dtype=np.int64)
+        best_scores = np.zeros(0, dtype=np.float32)
+        for start in range(0, len(self.int8_codes), SCAN_BLOCK):
+            block = self.int8_codes[start:start + SCAN_BLOCK].astype(np.float32) @ qs
+            top = top_k_rows(block, n)
+            best_idx = np.concatenate([best_idx, top + start])
+            best_scores = np.concatenate([best_scores, block[top]])
+            keep = top_k_rows(best_scores, n)
+            best_idx, best_scores = best_idx[keep], best_scores[keep]
+        return best_idx
+
+    def _binary_candidates(self, q: np.ndarray, n: int) -> np.ndarray:
+        dist = hamming_distances(self.binary_codes, quantize_binary(q[None, :])[0])
+        return top_k_rows(dist, n, largest=False)
+
+    def _approximate_scores(self, q: np.ndarray, rows: np.ndarray, mode: str) -> np.ndarray:
+        """Scores from the codes alone: int8 dot product, or 1 - 2 * hamming / dims."""
+        if mode == "int8":
+            return self.int8_codes[rows].astype(np.float32) @ (q * self.int8_scale)
+        dist = hamming_distances(self.binary_codes[rows], quantize_binary(q[None, :])[0])
+        return 1.0 - 2.0 * dist.astype(np.float32) / self.dim
+
+    # -----------------------------
+    # Search
+    # -----------------------------
+    def search(self, query, top_k=5, mode="binary", rescore_factor=RESCORE_FACTOR) -> List[Tuple[int, float]]:
+        """[(row, score)] best first. rescore_factor=0 returns approximate scores only."""
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode '{mode}' (expected one of {', '.join(MODES)})")
+        q = np.asarray(query, dtype=np.float32)
+        q = q / max(float(np.linalg.norm(q)), 1e-12)
+        if mode == "float32":
+            scores = np.asarray(self.full) @ q
+            top = top_k_rows(scores, top_k)
+            return [(int(i), float(scores[i])) for i in top]
+
+        pool = top_k * max(rescore_factor, 1)
+        candidates = self._int8_candidates(q, pool) if mode == "int8" else self._binary_candidates(q, pool)
+        if not rescore_factor:
+            approx = self._approximate_scores(q, candidates, mode)
+            return [(int(candidates[i]), float(approx[i])) for i in top_k_rows(approx, top_k)]
+        rows = np.sort(candidates)  # sorted rows keep memory-mapped reads sequential
+        exact = self.full[rows] @ q
+        return [(int(rows[i]), float(exact[i])) for i in top_k_rows(exact, top_k)]
+
+    def query(self, vector, top_k=5, mode="binary", rescore_factor=RESCORE_FACTOR):
+        """Pinecone-shaped result: {"matches": [{"id", "score"}]}."""
+        hits = self.search(vector, top_k, mode, rescore_factor)
+        return {"matches": [{"id": self.ids[i], "score": s} for i, s in hits]}
+
+    def memory_report(self) -> dict:
+        """Bytes per vector for each representation, and what stays resident."""
+        n = max(len(self), 1)
+        return {
+            "vectors": len(self),
+            "dims": self.dim,
+            "float32_bytes_per_vector": self.dim * 4,
+            "int8_bytes_per_vector": self.int8_codes.nbytes / n,
+            "binary_bytes_per_vector": self.binary_codes.nbytes / n,
+            "resident_bytes": int(self.int8_codes.nbytes + self.binary_codes.nbytes + self.int8_scale.nbytes),
+            "float32_resident_bytes": len(self) * self.dim * 4,
+        }
+
+# -----------------------------
+# Main
+# -----------------------------
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build a quantized vector store and compare it to float32")
+    parser.add_argument("--data", default="vietnam_travel_dataset.json", help="Dataset (.json array or .jsonl)")
+    parser.add_argument("--output", default=STORE_DIR, help="Store directory")
+    parser.add_argument("--local", action="store_true", help="Use the offline hashing embedder")
+    parser.add_argument("--queries", type=int, default=100, help="Corpus vectors reused as timing queries")
+    parser.add_argument("--top-k", type=int, default=5)
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    from corpus_embeddings import get_encoder, load_or_embed
+
+    args = parse_args()
+    ids, _, vectors = load_or_embed(args.data, get_encoder(local=args.local))
+    print(f"Quantizing {len(ids)} vectors into {args.output}...")
+    store = QuantizedVectorStore.build(ids, vectors, args.output)
+    report = store.memory_report()
+    print(f"📦 float32 {report['float32_bytes_per_vector']} B/vector, int8 "
+          f"{report['int8_bytes_per_vector']:.0f} B/vector, binary {report['binary_bytes_per_vector']:.0f} B/vector")
+
+    sample = np.asarray(store.full[:args.queries])
+    for mode in MODES:
+        start = time.perf_counter()
+        for q in sample:
+            store.search(q, args.top_k, mode)
+        per_query = (time.perf_counter() - start) * 1000 / max(len(sample), 1)
+        print(f"⏱️ {mode:<8} {per_query:.3f} ms/query")
+    print("✅ Store ready; run eval_retrieval.py for recall against exact search")
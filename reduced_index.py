@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# reduced_index.py
+# Lower-dimensional index over the corpus embeddings. Vectors are projected onto
+# the top principal directions (or simply truncated to the first dims), queries
+# are projected the same way at search time, and the best candidates are rescored
+# against the full-dimension vectors memory-mapped from disk.
+import argparse
+import json
+import os
+import time
+from typing import List, Tuple
+
+import numpy as np
+
+from quantized_store import top_k_rows
+
+# -----------------------------
+# Config
+# -----------------------------
+INDEX_DIR = "reduced_index"
+REDUCED_DIMS = 128
+RESCORE_FACTOR = 4       # candidates rescored = top_k * RESCORE_FACTOR
+METHODS = ("pca", "truncate")
+
+def fit_projection(vectors: np.ndarray, dims: int, method="pca") -> np.ndarray:
+    """(full_dims, dims) projection matrix. PCA uses the uncentered second moment,
+    since dot products (not distances to the mean) are what gets ranked."""
+    if method not in METHODS:
+        raise ValueError(f"Unknown method '{method}' (expected one of {', '.join(METHODS)})")
+    full_dims = vectors.shape[1]
+    dims = min(dims, full_dims)
+    if method == "truncate":
+        return np.eye(full_dims, dims, dtype=np.float32)
+    moment = vectors.T.astype(np.float64) @ vectors / max(len(vectors), 1)
+    eigvals, eigvecs = np.linalg.eigh(moment)
+    order = np.argsort(eigvals)[::-1][:dims]
+    return eigvecs[:, order].astype(np.float32)
+
+class ReducedIndex:
+    """Reduced vectors in RAM, full-dimension vectors memory-mapped for rescoring."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, "index.json"), "r", encoding="utf-8") as f:
+            info = json.load(f)
+        self.ids: List[str] = info["ids"]
+        self.method = info["method"]
+        self.projection = np.load(os.path.join(directory, "projection.npy"))
+        self.reduced = np.load(os.path.join(directory, "reduced.npy"))
+        self.full = np.load(os.path.join(directory, "vectors_f32.npy"), mmap_mode="r")
+        self.dims = self.projection.shape[1]
+
+    @classmethod
+    def build(cls, ids: List[str], vectors: np.ndarray, dims=REDUCED_DIMS, method="pca", directory=INDEX_DIR):
+        os.makedirs(directory, exist_ok=True)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        projection = fit_projection(vectors, dims, method)
+        np.save(os.path.join(directory, "vectors_f32.npy"), vectors)
+        np.save(os.path.join(directory, "projection.npy"), projection)
+        np.save(os.path.join(directory, "reduced.npy"), vectors @ projection)
+        with open(os.path.join(directory, "index.json"), "w", encoding="utf-8") as f:
+            json.dump({"method": method, "dims": int(projection.shape[1]), "ids": list(ids)}, f)
+        return cls(directory)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def explained_energy(self) -> float:
+        """Share of the corpus' squared norm kept by the projection (1.0 = lossless)."""
+        return float((self.reduced ** 2).sum() / max(len(self), 1))
+
+    def search(self, query, top_k=5, rescore_factor=RESCORE_FACTOR) -> List[Tuple[int, float]]:
+        """[(row, score)] best first. rescore_factor=0 returns reduced-space scores only."""
+        q = np.asarray(query, dtype=np.float32)
+        q = q / max(float(np.linalg.norm(q)), 1e-12)
+        scores = self.reduced @ (q @ self.projection)
+        if not rescore_factor:
+            return [(int(i), float(scores[i])) for i in top_k_rows(scores, top_k)]
+        rows = np.sort(top_k_rows(scores, top_k * rescore_factor))
+        exact = self.full[rows] @ q
+        return [(int(rows[i]), float(exact[i])) for i in top_k_rows(exact, top_k)]
+
+    def query(self, vector, top_k=5, rescore_factor=RESCORE_FACTOR):
+        """Pinecone-shaped result: {"matches": [{"id", "score"}]}."""
+        hits = self.search(vector, top_k, rescore_factor)
+        return {"matches": [{"id": self.ids[i], "score": s} for i, s in hits]}
+
+    def memory_report(self) -> dict:
+        full_dims = self.projection.shape[0]
+        return {
+            "vectors": len(self),
+            "dims": self.dims,
+            "full_dims": full_dims,
+            "reduced_bytes_per_vector": self.dims * 4,
+            "float32_bytes_per_vector": full_dims * 4,
+            "explained_energy": round(self.explained_energy(), 4),
+        }
+
+# -----------------------------
+# Main
+# -----------------------------
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build a PCA / truncated reduced-dimension index")
+    parser.add_argument("--data", default="vietnam_travel_dataset.json", help="Dataset (.json array or .jsonl)")
+    parser.add_argument("--output", default=INDEX_DIR, help="Index directory")
+    parser.add_argument("--dims", type=int, default=REDUCED_DIMS)
+    parser.add_argument("--method", choices=METHODS, default="pca")
+    parser.add_argument("--local", action="store_true", help="Use the offline hashing embedder")
+    parser.add_argument("--queries", type=int, default=100, help="Corpus vectors reused as timing queries")
+    parser.add_argument("--top-k", type=int, default=5)
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    from corpus_embeddings import get_encoder, load_or_embed
+
+    args = parse_args()
+    ids, _, vectors = load_or_embed(args.data, get_encoder(local=args.local))
+    print(f"Fitting {args.method} projection {vectors.shape[1]} -> {args.dims} dims on {len(ids)} vectors...")
+    index = ReducedIndex.build(ids, vectors, args.dims, args.method, args.output)
+    report = index.memory_report()
+    print(f"📦 {report['reduced_bytes_per_vector']} B/vector (float32 {report['float32_bytes_per_vector']} B), "
+          f"energy kept {report['explained_energy']:.1%}")
+
+    sample = np.asarray(index.full[:args.queries])
+    for factor in (0, RESCORE_FACTOR):
+        start = time.perf_counter()
+        for q in sample:
+            index.search(q, args.top_k, factor)
+        per_query = (time.perf_counter() - start) * 1000 / max(len(sample), 1)
+        print(f"⏱️ rescore x{factor:<3} {per_query:.3f} ms/query")
+    print("✅ Index ready; run eval_retrieval.py for recall against full-dimension search")
@@ -0,0 +1,165 @@
+# reranker.py
+# Optional cross-encoder reranking between vector retrieval and graph expansion
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from typing import Dict, List, Tuple
+
+from dataset_io import iter_nodes
+
+# -----------------------------
+# Config
+# -----------------------------
+DATA_FILE = "vietnam_travel_dataset.json"
+RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+RERANK_FETCH_K = 50          # candidates over-fetched from Pinecone
+RERANK_BUDGET_MS = 150       # give up and keep vector order past this
+CACHE_SIZE = 20000           # (query, node id) pair scores kept in memory
+REPROBE_S = 30.0             # a cost estimate this old no longer skips batches on its own
+MAX_PENDING = 2              # scoring batches queued or running; more fall back at once
+
+def load_candidate_texts(path=DATA_FILE) -> Dict[str, str]:
+    """Text the cross-encoder sees for each node: name, type, city and description."""
+    texts = {}
+    for node in iter_nodes(path):
+        place = node.get("city") or node.get("region", "")
+        body = node.get("description") or node.get("semantic_text") or ""
+        tags = ", ".join(node.get("tags", []))
+        texts[node["id"]] = f"{node.get('name', '')} ({node.get('type', '')}, {place}). Tags: {tags}. {body}"
+    return texts
+
+class CrossEncoderReranker:
+    """Scores (query, candidate) pairs in one batched forward pass, with an LRU pair cache."""
+
+    def __init__(self, texts: Dict[str, str], model=None, model_name=RERANK_MODEL,
+                 budget_ms=RERANK_BUDGET_MS, cache_size=CACHE_SIZE):
+        if model is None:
+            from sentence_transformers import CrossEncoder
+            model = CrossEncoder(model_name)
+        self.model = model
+        self.texts = texts
+        self.budget_ms = budget_ms
+        self.cache_size = cache_size
+        self.cache: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self.lock = threading.Lock()
+        # Scoring runs on a worker so a slow batch can be abandoned (it still fills the cache);
+        # batches whose caller gave up before they started are dropped
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.pending = 0
+        self.ms_per_pair = None
+        self.estimated_at = 0.0
+        self.probing = False
+        self.stats = {"calls": 0, "pairs_scored": 0, "cache_hits": 0, "fallbacks": 0,
+                      "probes": 0, "dropped": 0}
+
+    def _cache_get(self, key):
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key]
+        return None
+
+    def _cache_put_many(self, items):
+        with self.lock:
+            for key, score in items:
+                self.cache[key] = score
+                self.cache.move_to_end(key)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+    def _score_batch(self, query: str, ids: List[str]) -> List[float]:
+        start = time.perf_counter()
+        pairs = [(query, self.texts.get(i, i)) for i in ids]
+        scores = [float(s) for s in self.model.predict(pairs, batch_size=len(pairs))]
+        self._cache_put_many(((query, i), s) for i, s in zip(ids, scores))
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        per_pair = elapsed_ms / max(len(ids), 1)
+        # Exponentially weighted cost estimate used to skip batches that can't fit the budget
+        # (a probe replaces a stale estimate outright)
+        with self.lock:
+            if self.ms_per_pair is None or self.probing:
+                self.ms_per_pair, self.probing = per_pair, False
+            else:
+                self.ms_per_pair = 0.8 * self.ms_per_pair + 0.2 * per_pair
+            self.estimated_at = time.monotonic()
+            self.stats["pairs_scored"] += len(ids)
+        return scores
+
+    def _run(self, query: str, ids: List[str], expires_at: float):
+        try:
+            if time.monotonic() > expires_at:
+                with self.lock:
+                    self.stats["dropped"] += 1
+                return None
+            return self._score_batch(query, ids)
+        finally:
+            with self.lock:
+                self.pending -= 1
+
+    def _over_budget(self, pairs: int, budget_ms: float) -> bool:
+        """Whether the cost estimate rules the batch out. A stale estimate (e.g. from one
+        slow cold-start batch) lets a batch through as a probe that refreshes it."""
+        with self.lock:
+            if self.ms_per_pair is None or self.ms_per_pair * pairs <= budget_ms:
+                return False
+            if time.monotonic() - self.estimated_at < REPROBE_S:
+                return True
+            self.estimated_at = time.monotonic()  # one probe per interval
+            self.probing = True
+            self.stats["probes"] += 1
+            return False
+
+    def rerank(self, query: str, matches: list, top_k: int, budget_ms=None) -> Tuple[list, str]:
+        """Reorder matches by cross-encoder score; returns (matches[:top_k], status).
+        budget_ms overrides the configured budget (e.g. what is left of a request deadline)."""
+        budget_ms = self.budget_ms if budget_ms is None else min(budget_ms, self.budget_ms)
+        with self.lock:
+            self.stats["calls"] += 1
+        if not matches:
+            return [], "empty"
+        key_query = query.strip().lower()
+        ids = [m["id"] for m in matches]
+        scores = {i: self._cache_get((key_query, i)) for i in ids}
+        missing = [i for i in ids if scores[i] is None]
+        with self.lock:
+            self.stats["cache_hits"] += len(ids) - len(missing)
+
+        status = "cached"
+        if missing:
+            if self._over_budget(len(missing), budget_ms):
+                return self._fallback(matches, top_k, "fallback_budget")
+            with self.lock:
+                busy = self.pending >= MAX_PENDING
+                if not busy:
+                    self.pending += 1
+            if busy:
+                return self._fallback(matches, top_k, "fallback_busy")
+            expires_at = time.monotonic() + max(budget_ms, 0) / 1000
+            future = self.executor.submit(self._run, key_query, missing, expires_at)
+            try:
+                fresh = future.result(timeout=max(budget_ms, 0) / 1000)
+            except TimeoutError:
+                return self._fallback(matches, top_k, "fallback_timeout")
+            except Exception as e:
+                print(f"Rerank error: {e}")
+                return self._fallback(matches, top_k, "fallback_error")
+            scores.update(zip(missing, fresh))
+            status = "reranked"
+
+        ranked = sorted(matches, key=lambda m: scores[m["id"]], reverse=True)[:top_k]
+        return [_with_score(m, scores[m["id"]]) for m in ranked], status
+
+    def _fallback(self, matches, top_k, status):
+        with self.lock:
+            self.stats["fallbacks"] += 1
+        return list(matches[:top_k]), status
+
+def _with_score(match, rerank_score):
+    return {
+        "id": match["id"],
+        "score": match.get("score", 0),
+        "metadata": match.get("metadata", {}),
+        "values": match.get("values"),
+        "rerank_score": round(rerank_score, 4)
+    }
@@ -0,0 +1,393 @@
+# route_index.py
+# Precomputed routing over the city Connected_To graph: all-pairs shortest paths
+# (distance + predecessor matrices), k-shortest alternatives per requested pair,
+# incremental edge updates and best visiting order through a set of cities. Built from the
+# aggregates load_to_neo4j.py materializes, so no variable-length Cypher at query time.
+import heapq
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import shortest_path
+
+# -----------------------------
+# Config
+# -----------------------------
+K_ALTERNATIVES = 3
+EXACT_TSP_LIMIT = 10         # Held-Karp DP up to this many stops, nearest neighbor + 2-opt above
+PLAN_CACHE_SIZE = 4096
+MAX_ROUTE_STOPS = 6          # cities taken from search results when the query names fewer than two
+
+# "plan a 5 day trip", "how do I get from ..." - asks for a route rather than places
+ITINERARY_PATTERN = re.compile(
+    r"\b(itinerary|itineraries|route|routes|trip|journey|road trip|plan|planning|"
+    r"get from|go from|travel from|travel between|\d+[- ]?days?)\b")
+
+UNREACHABLE = -9999          # scipy's predecessor sentinel
+
+# Current Connected_To links of the given cities, read when the change feed names them
+CITY_LINKS_QUERY = ("UNWIND $ids AS cid "
+                    "MATCH (c:Entity {id: cid}) "
+                    "OPTIONAL MATCH (c)-[:Connected_To]-(o:Entity) "
+                    "RETURN cid, collect(DISTINCT o.id) AS links")
+
+class RouteIndex:
+    """Shortest paths between every pair of cities, kept current as edges change."""
+
+    def __init__(self, city_ids: List[str], names: Dict[str, str], edges: Dict[Tuple[int, int], float],
+                 aliases: Optional[Dict[str, str]] = None):
+        self.city_ids = list(city_ids)
+        self.positions = {c: i for i, c in enumerate(self.city_ids)}
+        self.names = names
+        self.edges = dict(edges)  # (i, j) with i < j -> weight
+        self.alias_pattern = None
+        self.aliases = aliases or {}
+        if self.aliases:
+            alternation = "|".join(re.escape(a) for a in sorted(self.aliases, key=len, reverse=True))
+            self.alias_pattern = re.compile(r"\b(?:" + alternation + r")\b")
+        self.alternatives: Dict[Tuple[int, int], List[Tuple[float, List[int]]]] = {}  # filled per requested pair
+        self.plan_cache: "OrderedDict[tuple, dict]" = OrderedDict()
+        self._adj_lists = None
+        self.lock = threading.RLock()  # edge updates from the change feed vs. request reads
+        self._compute_all()
+
+    @classmethod
+    def from_aggregates(cls, aggregates: dict):
+        cities = aggregates["cities"]
+        city_ids = sorted(cities)
+        positions = {c: i for i, c in enumerate(city_ids)}
+        edges = {}
+        for city_id, city in cities.items():
+            for other in city.get("connected_to", []):
+                if other in positions and other != city_id:
+                    a, b = sorted((positions[city_id], positions[other]))
+                    edges[(a, b)] = 1.0
+        names = {c: cities[c]["name"] for c in city_ids}
+        return cls(city_ids, names, edges, aggregates.get("city_lookup"))
+
+    # -----------------------------
+    # All-pairs computation
+    # -----------------------------
+    def _adjacency(self) -> csr_matrix:
+        n = len(self.city_ids)
+        if not self.edges:
+            return csr_matrix((n, n))
+        (rows, cols), weights = zip(*self.edges.keys()), list(self.edges.values())
+        return csr_matrix((weights + weights, (rows + cols, cols + rows)), shape=(n, n))
+
+    def _compute_all(self):
+        self.dist, self.pred = shortest_path(self._adjacency(), method="D", directed=False,
+                                             return_predecessors=True)
+        self.alternatives.clear()
+        self.plan_cache.clear()
+
+    def _rows(self, rows: np.ndarray):
+        """Recompute the shortest-path trees rooted at `rows` only."""
+        if len(rows):
+            dist, pred = shortest_path(self._adjacency(), method="D", directed=False,
+                                       return_predecessors=True, indices=rows)
+            self.dist[rows], self.pred[rows] = dist, pred
+            # Trees rooted elsewhere did not use the edge, so their paths to `rows` still hold;
+            # distances are symmetric, so the columns take the new rows' values
+            self.dist[:, rows] = dist.T
+
+    # -----------------------------
+    # Incremental updates
+    # -----------------------------
+    def set_edge(self, a: str, b: str, weight=1.0):
+        """Add a connection or lower its weight in O(n^2); a higher weight recomputes affected trees."""
+        i, j = sorted((self.positions[a], self.positions[b]))
+        old = self.edges.get((i, j))
+        self.edges[(i, j)] = weight
+        if old is not None and weight > old:
+            self._repair(i, j)
+        else:
+            for u, v in ((i, j), (j, i)):
+                via = self.dist[:, u][:, None] + weight + self.dist[v, :][None, :]
+                better = via < self.dist - 1e-12
+                if better.any():
+                    self.dist = np.where(better, via, self.dist)
+                    hop = np.where(np.arange(len(self.city_ids)) == v, u, self.pred[v, :])
+                    self.pred = np.where(better, hop[None, :], self.pred)
+        self._invalidate()
+
+    def remove_edge(self, a: str, b: str):
+        i, j = sorted((self.positions[a], self.positions[b]))
+        if self.edges.pop((i, j), None) is not None:
+            self._repair(i, j)
+            self._invalidate()
+
+    def sync_links(self, links: Dict[str, List[str]]) -> int:
+        """Make each listed city's connections match `links` (city id -> connected city
+        ids), through set_edge / remove_edge. Cities outside the index are ignored.
+        Returns the number of edges added or removed."""
+        updates = 0
+        with self.lock:
+            for city, others in links.items():
+                if city not in self.positions:
+                    continue
+                i = self.positions[city]
+                wanted = {self.positions[o] for o in others if o in self.positions and o != city}
+                current = {b if a == i else a for a, b in self.edges if i in (a, b)}
+                for j in current - wanted:
+                    self.remove_edge(city, self.city_ids[j])
+                for j in wanted - current:
+                    self.set_edge(city, self.city_ids[j], 1.0)
+                updates += len(current ^ wanted)
+        return updates
+
+    def _repair(self, i: int, j: int):
+        """Only trees that used edge (i, j) can change when it gets longer or disappears;
+        a tree uses it exactly when one end is the other's predecessor in that row."""
+        uses = (self.pred[:, j] == i) | (self.pred[:, i] == j)
+        self._rows(np.flatnonzero(uses))
+
+    def _invalidate(self):
+        # Any pair's alternatives may change with one edge; they are recomputed on next use
+        self._adj_lists = None
+        self.alternatives.clear()
+        self.plan_cache.clear()
+
+    # -----------------------------
+    # Paths
+    # -----------------------------
+    def _walk(self, pred_row, source: int, target: int) -> List[int]:
+        path = [target]
+        while path[-1] != source:
+            prev = pred_row[path[-1]]
+            if prev == UNREACHABLE:
+                return []
+            path.append(int(prev))
+        return path[::-1]
+
+    def distance(self, a: str, b: str) -> float:
+        return float(self.dist[self.positions[a], self.positions[b]])
+
+    def path(self, a: str, b: str) -> List[str]:
+        """Shortest city sequence from a to b (empty when unreachable)."""
+        i, j = self.positions[a], self.positions[b]
+        return [self.city_ids[p] for p in self._walk(self.pred[i], i, j)]
+
+    def _neighbors(self, i: int):
+        if self._adj_lists is None:
+            self._adj_lists = {}
+            for (a, b), w in self.edges.items():
+                self._adj_lists.setdefault(a, []).append((b, w))
+                self._adj_lists.setdefault(b, []).append((a, w))
+        return self._adj_lists.get(i, [])
+
+    def _dijkstra(self, source: int, target: int, banned_nodes: set, banned_edges: set):
+        best = {source: 0.0}
+        heap = [(0.0, source, [source])]
+        while heap:
+            d, node, path = heapq.heappop(heap)
+            if node == target:
+                return d, path
+            if d > best.get(node, np.inf):
+                continue
+            for other, w in self._neighbors(node):
+                if other in banned_nodes or (node, other) in banned_edges:
+                    continue
+                nd = d + w
+                if nd < best.get(other, np.inf):
+                    best[other] = nd
+                    heapq.heappush(heap, (nd, other, path + [other]))
+        return None
+
+    def _yen(self, source: int, target: int, k: int) -> List[Tuple[float, List[int]]]:
+        """Yen's k loopless shortest paths."""
+        first = self._dijkstra(source, target, set(), set())
+        if first is None:
+            return []
+        found, candidates = [first], []
+        while len(found) < k:
+            last = found[-1][1]
+            for s in range(len(last) - 1):
+                root = last[:s + 1]
+                banned_edges = set()
+                for _, p in found:
+                    if p[:s + 1] == root and len(p) > s + 1:
+                        banned_edges |= {(p[s], p[s + 1]), (p[s + 1], p[s])}
+                spur = self._dijkstra(root[-1], target, set(root[:-1]), banned_edges)
+                if spur is None:
+                    continue
+                root_cost = sum(self.edges[tuple(sorted(e))] for e in zip(root, root[1:]))
+                candidate = (root_cost + spur[0], root[:-1] + spur[1])
+                if candidate not in candidates and all(candidate[1] != p for _, p in found):
+                    heapq.heappush(candidates, candidate)
+            if not candidates:
+                break
+            found.append(heapq.heappop(candidates))
+        return found
+
+    def alternatives_between(self, a: str, b: str, k=K_ALTERNATIVES) -> List[dict]:
+        """Up to k loopless routes from a to b, shortest first."""
+        with self.lock:
+            return self._alternatives(a, b, k)
+
+    def _alternatives(self, a: str, b: str, k: int) -> List[dict]:
+        i, j = self.positions[a], self.positions[b]
+        key = (min(i, j), max(i, j))
+        if key not in self.alternatives or len(self.alternatives[key]) < min(k, K_ALTERNATIVES):
+            self.alternatives[key] = self._yen(key[0], key[1], max(k, K_ALTERNATIVES))
+        routes = []
+        for cost, path in self.alternatives[key][:k]:
+            path = path if key[0] == i else path[::-1]
+            routes.append({"distance": cost, "cities": [self.city_ids[p] for p in path]})
+        return routes
+
+    # -----------------------------
+    # Multi-city plans
+    # -----------------------------
+    def plan(self, cities: Sequence[str], start: Optional[str] = None, round_trip=False) -> Optional[dict]:
+        """Best order to visit `cities` (shortest total path), expanded through connecting cities."""
+        stops = list(dict.fromkeys(c for c in cities if c in self.positions))
+        if start in self.positions and start not in stops:
+            stops.insert(0, start)
+        if len(stops) < 2:
+            return None
+        key = (frozenset(stops), start, round_trip)
+        cached = self.plan_cache.get(key)
+        if cached is not None:
+            self.plan_cache.move_to_end(key)
+            return cached
+
+        idx = [self.positions[c] for c in stops]
+        dist = self.dist[np.ix_(idx, idx)]
+        first = stops.index(start) if start in self.positions else None
+        if len(stops) <= EXACT_TSP_LIMIT:
+            order, total = _held_karp(dist, first, round_trip)
+        else:
+            order, total = _nearest_neighbor_2opt(dist, first, round_trip)
+        if not np.isfinite(total):
+            return None
+
+        ordered = [stops[i] for i in order]
+        legs = list(zip(ordered, ordered[1:] + ([ordered[0]] if round_trip else [])))
+        expanded = [ordered[0]]
+        for a, b in legs:
+            expanded += self.path(a, b)[1:]
+        result = {"stops": ordered, "cities": expanded, "distance": float(total)}
+        self.plan_cache[key] = result
+        if len(self.plan_cache) > PLAN_CACHE_SIZE:
+            self.plan_cache.popitem(last=False)
+        return result
+
+    def cities_in(self, text: str) -> List[str]:
+        """City ids mentioned in free text, in order of mention."""
+        if not self.alias_pattern:
+            return []
+        found = [self.aliases[m.group(0)] for m in self.alias_pattern.finditer(text.lower())]
+        return list(dict.fromkeys(found))
+
+    def route_for(self, query: str, matches: list = ()) -> Optional[dict]:
+        """Route for a query asking for an itinerary: through the cities it names, or with
+        fewer than two, through the cities of the top matches. Other queries get none,
+        even when they name several cities ("Is Hanoi or Hue better for food?")."""
+        if not ITINERARY_PATTERN.search(query.lower()):
+            return None
+        with self.lock:
+            return self._route_for(query, matches)
+
+    def _route_for(self, query: str, matches) -> Optional[dict]:
+        cities = self.cities_in(query)
+        if len(cities) < 2:
+            lookup = {name.lower(): c for c, name in self.names.items()}
+            from_matches = []
+            for m in matches:
+                meta = m.get("metadata") or {}
+                city_id = m["id"] if meta.get("type") == "City" else lookup.get((meta.get("city") or "").lower())
+                if city_id:
+                    from_matches.append(city_id)
+            cities = list(dict.fromkeys(cities + from_matches))[:MAX_ROUTE_STOPS]
+        start = cities[0] if cities else None
+        route = self.plan(cities, start=start)
+        if route is None:
+            return None
+        # Other ways to cover each leg, for travellers who want to stop somewhere else
+        legs = []
+        for a, b in zip(route["stops"], route["stops"][1:]):
+            chosen = self.path(a, b)
+            others = [r for r in self.alternatives_between(a, b) if r["cities"] != chosen][:K_ALTERNATIVES - 1]
+            if others:
+                legs.append({"from": a, "to": b, "routes": others})
+        return dict(route, alternatives=legs)
+
+    def describe(self, route: dict) -> str:
+        lines = [" -> ".join(f"{self.names.get(c, c)} ({c})" for c in route["cities"])]
+        for leg in route.get("alternatives", []):
+            for alt in leg["routes"]:
+                lines.append(f"Alternative {self.names.get(leg['from'], leg['from'])} to "
+                             f"{self.names.get(leg['to'], leg['to'])}: "
+                             + " -> ".join(self.names.get(c, c) for c in alt["cities"])
+                             + f" (distance {alt['distance']:g})")
+        return "\n".join(lines)
+
+def _held_karp(dist: np.ndarray, first: Optional[int], round_trip: bool) -> Tuple[List[int], float]:
+    """Exact shortest visiting order by DP over subsets, O(2^n * n^2)."""
+    n = len(dist)
+    if first is None:
+        if round_trip:
+            first = 0
+        else:
+            # Free start: a zero-cost dummy stop in front picks the best first city
+            padded = np.zeros((n + 1, n + 1))
+            padded[1:, 1:] = dist
+            order, total = _held_karp(padded, 0, False)
+            return [i - 1 for i in order[1:]], total
+    full = (1 << n) - 1
+    cost = np.full((1 << n, n), np.inf)
+    parent = np.full((1 << n, n), -1, dtype=np.int64)
+    cost[1 << first, first] = 0.0
+    bits = 1 << np.arange(n)
+    for mask in range(1 << n):
+        if not mask & (1 << first):
+            continue
+        for last in np.flatnonzero(np.isfinite(cost[mask])):
+            open_ = (mask & bits) == 0
+            if not open_.any():
+                continue
+            nxt = np.flatnonzero(open_)
+            new_masks = mask | bits[nxt]
+            new_cost = cost[mask, last] + dist[last, nxt]
+            better = new_cost < cost[new_masks, nxt]
+            cost[new_masks[better], nxt[better]] = new_cost[better]
+            parent[new_masks[better], nxt[better]] = last
+    finals = cost[full] + (dist[:, first] if round_trip else 0.0)
+    last = int(np.argmin(finals))
+    if not np.isfinite(finals[last]):
+        return list(range(n)), np.inf
+    order, mask = [last], full
+    while parent[mask, order[-1]] >= 0:
+        prev = int(parent[mask, order[-1]])
+        mask &= ~(1 << order[-1])
+        order.append(prev)
+    return order[::-1], float(finals[last])
+
+def _tour_length(dist, order, round_trip):
+    total = sum(dist[a, b] for a, b in zip(order, order[1:]))
+    return total + (dist[order[-1], order[0]] if round_trip else 0.0)
+
+def _nearest_neighbor_2opt(dist: np.ndarray, first: Optional[int], round_trip: bool) -> Tuple[List[int], float]:
+    """Greedy tour improved by 2-opt segment reversals; the start stays fixed."""
+    n = len(dist)
+    order = [first if first is not None else 0]
+    remaining = set(range(n)) - set(order)
+    while remaining:
+        nxt = min(remaining, key=lambda j: dist[order[-1], j])
+        order.append(nxt)
+        remaining.remove(nxt)
+    best = _tour_length(dist, order, round_trip)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, n - 1):
+            for j in range(i + 1, n):
+                candidate = order[:i] + order[i:j + 1][::-1] + order[j + 1:]
+                length = _tour_length(dist, candidate, round_trip)
+                if length < best - 1e-12:
+                    order, best, improved = candidate, length, True
+    return order, best
@@ -0,0 +1,148 @@
+# sessions.py
+# Conversation state for multi-turn chat: which nodes and graph facts the model has
+# already been shown, the last few turns verbatim and a rolling summary of older
+# ones. Follow-ups fetch only the neighborhoods that are missing and send only the
+# new context. Every session is bounded, and the store evicts least recently used
+# sessions.
+import re
+import threading
+import uuid
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional
+
+# -----------------------------
+# Config
+# -----------------------------
+MAX_SESSIONS = 1000
+MAX_TURNS = 4            # turns replayed verbatim; older ones are folded into the summary
+MAX_NODES = 100          # cached matches / neighborhoods per session
+SUMMARY_CHARS = 1500
+ANSWER_SNIPPET = 200     # characters of each folded answer kept in the summary
+
+# "what about hotels there?" - refers back to the place being discussed
+FOLLOWUP_PATTERN = re.compile(r"\b(there|that city|this city|same city|nearby|around it|over there)\b")
+
+class ConversationSession:
+    """Per-conversation cache of retrieved context, bounded in turns, nodes and summary size."""
+
+    def __init__(self, session_id: str):
+        self.id = session_id
+        self.turns = deque()                      # (turn_no, query, user_message, answer)
+        self.summary = ""
+        self.turn_no = 0
+        self.nodes: "OrderedDict[str, dict]" = OrderedDict()       # node id -> match
+        self.facts: "OrderedDict[str, List[dict]]" = OrderedDict()  # node id -> graph facts
+        self.sent_in: Dict[str, int] = {}          # node id -> turn its context was sent in
+        self.last_city: Optional[str] = None
+        self.city_from_matches = True
+        self.lock = threading.Lock()
+
+    # -----------------------------
+    # Retrieval helpers
+    # -----------------------------
+    def contextualize(self, query: str, city: Optional[str] = None) -> str:
+        """Make a follow-up retrievable on its own: "hotels there" -> "hotels there in Hue".
+        `city` is the name of a city the query itself mentions, if any."""
+        # Only a fresh, city-less topic lets the top match decide what "there" means next
+        self.city_from_matches = False
+        if city:
+            self.last_city = city
+            return query
+        if self.last_city and FOLLOWUP_PATTERN.search(query.lower()):
+            return f"{query} in {self.last_city}"
+        self.city_from_matches = True
+        return query
+
+    def missing_neighborhoods(self, node_ids: List[str]) -> List[str]:
+        return [nid for nid in node_ids if nid not in self.facts]
+
+    def add_context(self, matches: list, facts: List[dict], fetched: Optional[List[str]] = None):
+        """Cache matches and group freshly fetched facts by their source node. `fetched`
+        lists the matches whose neighborhoods were looked up (default: all of them)."""
+        for m in matches:
+            self.nodes[m["id"]] = {"id": m["id"], "score": m.get("score", 0),
+                                   "metadata": m.get("metadata") or {}}
+            self.nodes.move_to_end(m["id"])
+        fetched = {m["id"] for m in matches} if fetched is None else set(fetched)
+        for f in facts:
+            self.facts.setdefault(f["source"], []).append(f)
+        for nid in fetched:
+            self.facts.setdefault(nid, [])
+            self.facts.move_to_end(nid)
+        for cache in (self.nodes, self.facts):
+            while len(cache) > MAX_NODES:
+                evicted, _ = cache.popitem(last=False)
+                self.sent_in.pop(evicted, None)
+        for m in matches[:1] if self.city_from_matches else []:
+            meta = m.get("metadata") or {}
+            self.last_city = meta.get("name") if meta.get("type") == "City" else meta.get("city") or self.last_city
+
+    def split_context(self, node_ids: List[str]):
+        """(new matches, new facts, known ids): context still visible in the replayed
+        turns is referenced by id instead of being sent again."""
+        oldest_visible = self.turns[0][0] if self.turns else self.turn_no + 1
+        new_matches, new_facts, known = [], [], []
+        for nid in node_ids:
+            if self.sent_in.get(nid, -1) >= oldest_visible:
+                known.append(nid)
+            else:
+                if nid in self.nodes:
+                    new_matches.append(self.nodes[nid])
+                new_facts.extend(self.facts.get(nid, []))
+        return new_matches, new_facts, known
+
+    # -----------------------------
+    # Turns
+    # -----------------------------
+    def history(self) -> List[dict]:
+        messages = []
+        for _, _, user_message, answer in self.turns:
+            messages.append({"role": "user", "content": user_message})
+            messages.append({"role": "assistant", "content": answer})
+        return messages
+
+    def record_turn(self, query: str, user_message: str, answer: str, node_ids: List[str]):
+        """Remember what was sent; fold turns beyond MAX_TURNS into the summary.
+        `node_ids` are the nodes whose match and graph facts this turn's prompt carried."""
+        self.turn_no += 1
+        self.turns.append((self.turn_no, query, user_message, answer))
+        for nid in node_ids:
+            self.sent_in[nid] = self.turn_no
+        while len(self.turns) > MAX_TURNS:
+            _, old_query, _, old_answer = self.turns.popleft()
+            snippet = " ".join(old_answer.split())[:ANSWER_SNIPPET]
+            self.summary = f"{self.summary}\n- Q: {old_query} A: {snippet}".strip()
+            if len(self.summary) > SUMMARY_CHARS:
+                self.summary = "..." + self.summary[-(SUMMARY_CHARS - 3):]
+
+class SessionStore:
+    """LRU-bounded map of session id -> ConversationSession."""
+
+    def __init__(self, max_sessions=MAX_SESSIONS):
+        self.max_sessions = max_sessions
+        self.sessions: "OrderedDict[str, ConversationSession]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {"created": 0, "resumed": 0, "evicted": 0}
+
+    def get(self, session_id: Optional[str] = None) -> ConversationSession:
+        """Resume a session, or start a new one (unknown or evicted ids start fresh)."""
+        with self.lock:
+            session = self.sessions.get(session_id) if session_id else None
+            if session is not None:
+                self.sessions.move_to_end(session_id)
+                self.stats["resumed"] += 1
+                return session
+            session = ConversationSession(session_id or uuid.uuid4().hex)
+            self.sessions[session.id] = session
+            self.stats["created"] += 1
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+                self.stats["evicted"] += 1
+            return session
+
+    def end(self, session_id: str) -> bool:
+        with self.lock:
+            return self.sessions.pop(session_id, None) is not None
+
+    def __len__(self):
+        return len(self.sessions)
@@ -77,9 +77,13 @@ class VietnamTravelApp {
         }
 
         this.showLoading();
+        const started = performance.now();
+        this.firstResultMs = null;
         
         try {
-            const response = await fetch(`${this.API_BASE}/search`, {
+            // Streamed search: place cards render as soon as they arrive, graph
+            // connections are appended as each node's lookup completes
+            const response = await fetch(`${this.API_BASE}/search/stream`, {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
@@ -87,19 +91,83 @@ class VietnamTravelApp {
                 body: JSON.stringify({ query })
             });
 
-            const data = await response.json();
+            // Servers without the streaming route (app_fixed.py) get the plain search
+            const streaming = (response.headers.get('Content-Type') || '').includes('ndjson');
+            if (response.status === 404 || (response.ok && (!streaming || !response.body))) {
+                await this.searchOnce(query);
+                return;
+            }
 
-            if (data.success) {
-                this.displayResults(data);
-            } else {
+            if (!response.ok) {
+                const data = await response.json();
                 this.showError(data.error || 'Search failed');
+                return;
             }
+
+            await this.readEvents(response, (event) => this.handleSearchEvent(event, started));
         } catch (error) {
             this.showError('Network error. Please try again.');
             console.error('Search error:', error);
         }
     }
 
+    async searchOnce(query) {
+        const response = await fetch(`${this.API_BASE}/search`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ query })
+        });
+
+        const data = await response.json();
+
+        if (data.success) {
+            this.displayResults(data);
+        } else {
+            this.showError(data.error || 'Search failed');
+        }
+    }
+
+    async readEvents(response, onEvent) {
+        // Newline-delimited JSON: one event per line
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            const lines = buffer.split('\n');
+            buffer = lines.pop();
+            lines.filter(line => line.trim()).forEach(line => onEvent(JSON.parse(line)));
+        }
+        if (buffer.trim()) onEvent(JSON.parse(buffer));
+    }
+
+    handleSearchEvent(event, started) {
+        switch (event.event) {
+            case 'results':
+                this.firstResultMs = performance.now() - started;
+                this.displayResults(event);
+                break;
+            case 'connections':
+                this.appendConnections(event.connections);
+                break;
+            case 'done': {
+                // Time to first result is tracked separately from total latency
+                const totalMs = Math.round(performance.now() - started);
+                const first = this.firstResultMs === null ? '' : `first results in ${Math.round(this.firstResultMs)} ms, `;
+                this.resultsStats.textContent += ` · ${first}complete in ${totalMs} ms`;
+                break;
+            }
+            case 'error':
+                this.showError(event.error || 'Search failed');
+                break;
+        }
+    }
+
     showLoading() {
         this.loadingSection.style.display = 'block';
         this.resultsSection.style.display = 'none';
@@ -114,7 +182,7 @@ class VietnamTravelApp {
         this.searchBtn.innerHTML = '<i class="fas fa-paper-plane"></i>';
 
         // Update results header
-        this.resultsTitle.textContent = `Results for "${data.query}"`;
+        this.resultsTitle.textContent = data.title || `Results for "${data.query}"`;
         this.resultsStats.textContent = `${data.total_found} places found`;
 
         // Clear previous results
@@ -128,20 +196,22 @@ class VietnamTravelApp {
         });
 
         // Display connections
-        if (data.connections && data.connections.length > 0) {
-            this.connectionsSection.style.display = 'block';
-            data.connections.forEach(connection => {
-                const connectionCard = this.createConnectionCard(connection);
-                this.connectionsGrid.appendChild(connectionCard);
-            });
-        } else {
-            this.connectionsSection.style.display = 'none';
-        }
+        this.connectionsSection.style.display = 'none';
+        this.appendConnections(data.connections || []);
 
         // Scroll to results
         this.resultsSection.scrollIntoView({ behavior: 'smooth', block: 'start' });
     }
 
+    appendConnections(connections) {
+        if (connections.length === 0) return;
+        this.connectionsSection.style.display = 'block';
+        connections.forEach(connection => {
+            const connectionCard = this.createConnectionCard(connection);
+            this.connectionsGrid.appendChild(connectionCard);
+        });
+    }
+
     createPlaceCard(place, index) {
         const card = document.createElement('div');
         card.className = 'result-card';
@@ -186,11 +256,44 @@ class VietnamTravelApp {
                     ${place.tags.map(tag => `<span class="tag">${this.escapeHtml(tag)}</span>`).join('')}
                 </div>
             ` : ''}
+            
+            ${place.id ? `
+                <button class="similar-btn">
+                    <i class="fas fa-clone"></i> More like this
+                </button>
+            ` : ''}
         `;
 
+        const similarBtn = card.querySelector('.similar-btn');
+        if (similarBtn) {
+            similarBtn.addEventListener('click', () => this.showSimilar(place));
+        }
+
         return card;
     }
 
+    async showSimilar(place) {
+        this.showLoading();
+
+        try {
+            const response = await fetch(`${this.API_BASE}/similar/${encodeURIComponent(place.id)}`);
+            const data = await response.json();
+
+            if (data.success) {
+                this.displayResults({
+                    ...data,
+                    title: `Places similar to "${place.name}"`,
+                    connections: []
+                });
+            } else {
+                this.showError(data.error || 'Could not load similar places');
+            }
+        } catch (error) {
+            this.showError('Network error. Please try again.');
+            console.error('Similar places error:', error);
+        }
+    }
+
     createConnectionCard(connection) {
         const card = document.createElement('div');
         card.className = 'connection-card';
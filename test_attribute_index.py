@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# Checks for the attribute bitmaps and the pre- / post-filter plan choice
+import numpy as np
+from attribute_index import AttributeIndex, filtered_query
+from local_backends import LocalVectorIndex
+
+DIM = 8
+
+def build(n=100):
+    """n nodes: 2 "Rare" (pre-filter), 10 "Far" pointing away from the query, the rest "Common"."""
+    nodes, vectors = [], []
+    query = np.eye(DIM)[0]
+    for i in range(n):
+        node_type = "Rare" if i < 2 else "Far" if i >= n - 10 else "Common"
+        node = {"id": f"n{i}", "type": node_type, "city": "Hanoi" if i % 2 else "Hue",
+                "tags": ["beach"] if i % 3 == 0 else []}
+        vec = -query + 0.01 * i * np.eye(DIM)[1] if node_type == "Far" else query + 0.01 * i * np.eye(DIM)[1]
+        nodes.append(node)
+        vectors.append({"id": node["id"], "values": vec.tolist(), "metadata": dict(node)})
+    index = LocalVectorIndex(dim=DIM)
+    index.upsert(vectors)
+    return AttributeIndex.from_nodes(nodes), index, query.tolist()
+
+def test_bitmaps():
+    attr, _, _ = build()
+    bits = attr.match({"type": "common", "city": ["Hanoi"], "tags": "Beach"})
+    ids = attr.ids_for(bits)
+    assert ids and all(int(i[1:]) % 6 == 3 for i in ids) and attr.count(bits) == len(ids)
+    assert attr.contains(bits, ids[0]) and not attr.contains(bits, "n0") and not attr.contains(bits, "missing")
+    assert attr.count(attr.match({"type": "Nowhere"})) == 0 and attr.count(attr.match({})) == attr.size
+    attr.add({"id": "late", "type": "Rare"})
+    assert attr.ids_for(attr.match({"type": "Rare"})) == ["n0", "n1", "late"]
+
+def test_plan_selection():
+    attr, index, query = build()
+    matches, plan = filtered_query(index, query, 2, {"type": "Rare"}, attr)
+    assert plan == "prefilter" and [m["id"] for m in matches] == ["n0", "n1"]
+    matches, plan = filtered_query(index, query, 5, {"type": "Common"}, attr)
+    assert plan == "postfilter" and len(matches) == 5 and all(m["metadata"]["type"] == "Common" for m in matches)
+    assert filtered_query(index, query, 5, {"type": "Nowhere"}, attr) == ([], "empty")
+    assert filtered_query(index, query, 5, {}, attr)[1] == "none"
+
+def test_short_postfilter_falls_back():
+    attr, index, query = build()
+    # "Far" is broad enough to post-filter, but none of its nodes are near the query
+    matches, plan = filtered_query(index, query, 2, {"type": "Far"}, attr)
+    assert plan == "prefilter" and len(matches) == 2 and all(m["metadata"]["type"] == "Far" for m in matches)
+
+if __name__ == "__main__":
+    print("🧪 Testing attribute index...")
+    test_bitmaps()
+    test_plan_selection()
+    test_short_postfilter_falls_back()
+    print("✅ Attribute index test passed!")
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# Checks for batch question answering: batching, LLM limits and retries, resume
+import json
+import os
+import tempfile
+import threading
+import time
+from batch_qa import read_questions, run_batch
+
+def write_lines(path, lines):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+def test_batch_resumes_and_limits_llm():
+    tmp = tempfile.mkdtemp()
+    questions_path, output_path = os.path.join(tmp, "q.jsonl"), os.path.join(tmp, "a.jsonl")
+    write_lines(questions_path, ['"hotels in Hue"', '{"id": "x", "query": "beaches"}', "",
+                                 '{"query": "count hotels"}', '"food in Hanoi"', '"flaky"'])
+    questions = read_questions(questions_path)
+    assert [q["id"] for q in questions] == ["q1", "x", "q4", "q5", "q6"]
+    # an earlier run answered q1 and was killed mid-write
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write('{"id": "q1", "answer": "old"}\n{"id": "x", "ans')
+
+    batches, active, peak, failures = [], [0], [0], {"flaky": 1}
+    lock = threading.Lock()
+
+    def embed(texts):
+        batches.append(len(texts))
+        return [[float(len(t))] for t in texts]
+
+    def retrieve(question, vector, timings):
+        if question["query"] == "count hotels":
+            return None, ["agg"], "structural"
+        return question["query"], ["n1"], None
+
+    def generate(prompt):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+            if failures.get(prompt):
+                failures[prompt] -= 1
+                raise RuntimeError("rate limited")
+        return prompt.upper()
+
+    stats = run_batch(questions, embed, retrieve, generate, output_path, embed_batch=2,
+                      workers=4, llm_workers=2, retry_delay=0.01)
+    assert batches == [2, 2] and peak[0] <= 2
+    assert stats == dict(stats, answered=4, failed=0, skipped=1, llm_retries=1)
+
+    records = {}
+    with open(output_path, encoding="utf-8") as f:
+        for line in f.readlines()[2:]:
+            record = json.loads(line)
+            records[record["id"]] = record
+    assert set(records) == {"x", "q4", "q5", "q6"}
+    assert records["q4"]["answer"] == "structural" and "llm" not in records["q4"]["timings"]
+    assert records["q6"]["answer"] == "FLAKY" and records["q6"]["attempts"] == 2
+    assert {"embed", "llm", "total"} <= set(records["x"]["timings"])
+
+    # nothing left on a rerun
+    assert run_batch(questions, embed, retrieve, generate, output_path)["answered"] == 0
+
+if __name__ == "__main__":
+    print("🧪 Testing batch question answering...")
+    test_batch_resumes_and_limits_llm()
+    print("✅ Batch question answering test passed!")
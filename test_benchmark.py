@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# Smoke test for the benchmark harness against the local backend stand-ins
+import os
+
+import benchmark
+
+def test_percentiles():
+    values = list(range(1, 101))
+    assert benchmark.percentile(values, 50) == 50
+    assert benchmark.percentile(values, 99) == 99
+    assert benchmark.percentile([], 95) == 0.0
+
+def test_in_process_run():
+    send = benchmark.in_process_sender(latency_scale=0)
+    runs = benchmark.run_benchmark(send, ["search", "chat"], "closed", [2],
+                                   benchmark.DEFAULT_QUERIES, requests_per_worker=3)
+    assert len(runs) == 2
+    for run in runs:
+        assert run["errors"] == 0
+        assert run["requests"] == 6
+        assert {"end_to_end", "total", "route"} <= set(run["latency_ms"])
+    assert "llm" in runs[1]["latency_ms"]
+
+def test_streaming_reports_first_result():
+    send = benchmark.in_process_sender(latency_scale=0)
+    runs = benchmark.run_benchmark(send, ["search/stream"], "closed", [2],
+                                   benchmark.DEFAULT_QUERIES, requests_per_worker=3, extra_body={"cache": False})
+    latency = runs[0]["latency_ms"]
+    assert runs[0]["errors"] == 0 and {"first_result", "graph", "total"} <= set(latency)
+    assert latency["first_result"]["p50"] <= latency["end_to_end"]["p50"]
+
+def test_projections_prune_graph_stage():
+    send = benchmark.in_process_sender(latency_scale=0)
+    runs = benchmark.run_benchmark(send, ["search"], "closed", [2], benchmark.DEFAULT_QUERIES,
+                                   requests_per_worker=3, projections=["full", "ids"])
+    assert [run["projection"] for run in runs] == ["full", "ids"]
+    assert all(run["errors"] == 0 for run in runs)
+    assert "graph" in runs[0]["latency_ms"] and "graph" not in runs[1]["latency_ms"]
+    assert len(benchmark.projection_savings(runs)) == 1
+
+def test_structural_stream_reports_plan():
+    os.environ["BLUE_ENIGMA_BACKEND"] = "local"
+    os.environ["BLUE_ENIGMA_LATENCY_SCALE"] = "0"
+    import app
+    events = list(app.stream_search("What hotels are in Hanoi?", include=[]))
+    assert events[0]["route"] != "filtered" and events[0]["plan"]["source"] == "aggregates"
+    assert events[0]["plan"]["graph"] == "skipped" and "connections" not in events[0]
+
+if __name__ == "__main__":
+    print("🧪 Testing benchmark harness...")
+    test_percentiles()
+    test_in_process_run()
+    test_streaming_reports_first_result()
+    test_projections_prune_graph_stage()
+    test_structural_stream_reports_plan()
+    print("✅ Benchmark harness test passed!")
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# Checks for request deadlines: stage cost tracking and degraded stages in app.py
+import os
+import time
+from deadlines import Deadline, StageCosts, timed
+
+def test_deadline_allows_and_costs():
+    costs = StageCosts({"llm": 100.0})
+    deadline = Deadline(150, costs)
+    assert deadline.allows("llm") and not deadline.allows("llm", reserve_ms=100)
+    costs.observe({"llm": 300.0, "graph": 10.0, "total": 999.0}, skip={"graph": "partial"})
+    assert costs.estimate("llm") == 140.0 and costs.estimate("graph") == 0.0
+    time.sleep(0.16)
+    assert deadline.expired() and deadline.remaining_s() == 0.0
+    assert Deadline.from_request("1", 500).budget_ms == 50  # clamped to MIN_BUDGET_MS
+
+def test_timed_stages_add_up():
+    timings = {}
+    for _ in range(2):
+        with timed(timings, "llm"):
+            time.sleep(0.02)
+    assert timings["llm"] >= 40
+
+def test_app_degrades_optional_stages():
+    os.environ["BLUE_ENIGMA_BACKEND"] = "local"
+    os.environ["BLUE_ENIGMA_LATENCY_SCALE"] = "0"
+    import app
+    client = app.app.test_client()
+    llm = app.local["latency"]["llm"]
+    llm.scale, llm.base_ms = 1.0, 400
+    try:
+        # the LLM starts (estimate is below the budget) but is cut off at the deadline
+        app.stage_costs.costs["llm"] = 50.0
+        data = client.post('/api/chat', json={"query": "Romantic riverside stay in Hoi An",
+                                              "budget_ms": 200}).get_json()
+        assert data["success"] and data["deadline"]["degraded"] == {"llm": "timeout"}
+        assert data["response"].startswith("Top matches") and data["timings"]["total"] < 400
+        # by now the learned LLM cost exceeds the budget, so the call is skipped outright
+        app.stage_costs.costs["llm"] = 1000.0
+        data = client.post('/api/chat', json={"query": "Romantic riverside stay in Hoi An",
+                                              "budget_ms": 200}).get_json()
+        assert data["deadline"]["degraded"]["llm"] == "skipped" and "llm" not in data["timings"]
+        # graph expansion is skipped when the budget can't cover it
+        app.stage_costs.costs["graph"] = 10000.0
+        app.graph_cache.entries.clear()
+        data = client.post('/api/search', json={"query": "Trekking in Sapa", "budget_ms": 100}).get_json()
+        assert data["results"] and data["connections"] == []
+        assert data["deadline"]["degraded"] == {"graph": "skipped"}
+        assert client.post('/api/search', json={"query": "x", "budget_ms": "soon"}).status_code == 400
+    finally:
+        llm.scale, llm.base_ms = 0.0, 500
+        app.stage_costs.costs.update(graph=30.0, llm=1500.0)
+
+if __name__ == "__main__":
+    print("🧪 Testing request deadlines...")
+    test_deadline_allows_and_costs()
+    test_timed_stages_add_up()
+    test_app_degrades_optional_stages()
+    print("✅ Request deadline test passed!")
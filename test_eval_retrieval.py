@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# Checks for the recall / nDCG metrics and the regression gate
+import numpy as np
+
+import eval_retrieval as ev
+
+def test_metrics():
+    assert ev.recall_at_k([1, 2, 3], {1, 2, 4}, 3) == 2 / 3
+    assert ev.ndcg_at_k([1, 2, 3], {1, 2, 3}, 3) == 1.0
+    assert ev.ndcg_at_k([9, 1, 2], {1, 2, 3}, 3) < ev.ndcg_at_k([1, 2, 9], {1, 2, 3}, 3)
+
+def test_ties_count_as_hits():
+    vectors = np.array([[1.0, 0.0], [1.0, 0.0], [1.0, 0.0], [0.0, 1.0]], dtype=np.float32)
+    truth = ev.ground_truth(vectors, vectors[:1], 2)
+    assert truth == [{0, 1, 2}]
+    assert ev.recall_at_k([2, 1], truth[0], 2) == 1.0
+
+def test_pareto_and_gate():
+    results = [
+        {"name": "exact", "gated": True, "recall@5": 1.0, "latency_ms": {"p50": 2.0}},
+        {"name": "fast", "gated": True, "recall@5": 0.9, "latency_ms": {"p50": 0.5}},
+        {"name": "slow_bad", "gated": True, "recall@5": 0.8, "latency_ms": {"p50": 3.0}},
+    ]
+    assert ev.pareto_front(results, 5) == ["fast", "exact"]
+    baseline = {"results": [{"name": "fast", "recall@5": 0.95}]}
+    failures = ev.check_regressions(results, 5, min_recall=0.85, baseline=baseline)
+    assert len(failures) == 2 and any("fast" in f for f in failures)
+
+class FakeReranker:
+    """Reverses the candidate order, like a cross-encoder that disagrees with cosine."""
+
+    def rerank(self, text, matches, k):
+        return list(reversed(matches))[:k], "reranked"
+
+def test_filtered_pipeline():
+    rng = np.random.default_rng(0)
+    ids = [f"n{i}" for i in range(40)]
+    metas = [{"id": node_id, "type": "Hotel" if i % 2 else "Attraction", "city": "Hue" if i < 4 else "Hanoi"}
+             for i, node_id in enumerate(ids)]
+    vectors = rng.normal(size=(40, 8)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    attr_index = ev.AttributeIndex()
+    for meta in metas:
+        attr_index.add(meta)
+    index = ev.local_index(vectors, ids, metas)
+    filters = [{"type": ["Hotel"]}, {"city": ["Hue"]}, {"type": ["Hotel"], "city": ["Hue"]}]
+    queries = vectors[[5, 6, 7]]
+    truth = ev.ground_truth(vectors, queries, 3, ev.filter_masks(attr_index, ids, filters))
+    assert all(all(metas[row]["city"] == "Hue" for row in t) for t in truth[1:])
+    contexts = [{"text": "q", "filters": f} for f in filters]
+    configs = ev.pipeline_configs(index, attr_index, ids, FakeReranker(), "filtered_", True)
+    plain = configs[0]["retriever"]
+    assert ev.evaluate(plain, queries, truth, 3, contexts)["recall@3"] == 1.0
+    assert set(plain.report()["plans"]) == {"postfilter", "prefilter"}
+    reranked = configs[1]["retriever"]
+    ev.evaluate(reranked, queries, truth, 3, contexts)
+    assert reranked.report()["rerank"] == {"reranked": 3} and not configs[1]["gated"]
+    sets = ev.filter_sets(attr_index, 6)
+    assert [sorted(f) for f in sets[:3]] == [["type"], ["city"], ["city", "type"]]
+
+if __name__ == "__main__":
+    print("🧪 Testing retrieval evaluation...")
+    test_metrics()
+    test_ties_count_as_hits()
+    test_pareto_and_gate()
+    test_filtered_pipeline()
+    print("✅ Retrieval evaluation test passed!")
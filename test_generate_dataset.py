@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# Checks that synthetic datasets are deterministic and shaped like the real one
+import json
+import os
+import tempfile
+from aggregates import build_aggregates
+from dataset_io import iter_nodes
+from generate_dataset import DatasetGenerator, write_dataset
+
+RELATIONS = {"City": {"Connected_To"}, "Attraction": {"Located_In"}, "Hotel": {"Located_In"},
+             "Activity": {"Available_In"}}
+
+def real_schema():
+    with open("vietnam_travel_dataset.json", "r", encoding="utf-8") as f:
+        return {node["type"]: set(node) for node in json.load(f)}
+
+def test_same_seed_same_nodes():
+    assert list(DatasetGenerator(500, seed=7)) == list(DatasetGenerator(500, seed=7))
+    assert list(DatasetGenerator(500, seed=7)) != list(DatasetGenerator(500, seed=8))
+
+def test_schema_matches_real_dataset():
+    schema = real_schema()
+    nodes = list(DatasetGenerator(2000, seed=3))
+    ids = {node["id"] for node in nodes}
+    assert len(nodes) == 2000 and len(ids) == len(nodes)
+    cities = {node["id"] for node in nodes if node["type"] == "City"}
+    for node in nodes:
+        assert set(node) == schema[node["type"]], node["id"]
+        assert all(rel["target"] in ids for rel in node["connections"])
+        assert {rel["relation"] for rel in node["connections"]} <= RELATIONS[node["type"]]
+        if node["type"] != "City":
+            assert [rel["target"] in cities for rel in node["connections"]] == [True]
+    aggregates = build_aggregates(nodes)
+    assert len(aggregates["cities"]) == len(cities)
+    assert sum(agg["count"] for agg in aggregates["types"].values()) == len(nodes)
+
+def test_jsonl_and_json_round_trip():
+    nodes = list(DatasetGenerator(300, seed=5))
+    folder = tempfile.mkdtemp()
+    for name in ("nodes.jsonl", "nodes.json"):
+        path = os.path.join(folder, name)
+        assert write_dataset(iter(nodes), path) == len(nodes)
+        assert list(iter_nodes(path)) == nodes
+
+if __name__ == "__main__":
+    print("🧪 Testing synthetic dataset generator...")
+    test_same_seed_same_nodes()
+    test_schema_matches_real_dataset()
+    test_jsonl_and_json_round_trip()
+    print("✅ Synthetic dataset generator test passed!")
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# Checks for the neighborhood cache: hit rates, loader-driven invalidation, shared tier
+from graph_cache import NeighborhoodCache, SharedTier, META_QUERY, bump_graph_version, publish_changes
+from kv_server import start_background
+from local_backends import LocalGraphDriver
+from tiered_cache import ShardedStore
+
+NODES = [
+    {"id": "city_hue", "type": "City", "name": "Hue", "connections": []},
+    {"id": "hotel_1", "type": "Hotel", "name": "H1", "connections": [{"relation": "Located_In", "target": "city_hue"}]},
+    {"id": "hotel_2", "type": "Hotel", "name": "H2", "connections": [{"relation": "Located_In", "target": "city_hue"}]},
+    {"id": "hotel_3", "type": "Hotel", "name": "H3", "connections": []},
+]
+
+class DictTier:
+    def __init__(self):
+        self.data = {}
+
+    def get_many(self, keys):
+        return {k: self.data[k] for k in keys if k in self.data}
+
+    def set_many(self, items):
+        self.data.update(items)
+
+    def delete(self, keys):
+        for k in keys:
+            self.data.pop(k, None)
+
+def make_cache(driver, shared=None):
+    def read_meta():
+        records = driver.session().run(META_QUERY)
+        return dict(records[0]) if records else None
+    return NeighborhoodCache(read_meta, shared=shared, poll_s=0)
+
+def test_loader_changes_invalidate_precisely():
+    driver = LocalGraphDriver(NODES)
+    session = driver.session()
+    bump_graph_version(session)
+    cache = make_cache(driver)
+    seen = []
+    cache.add_listener(seen.append)
+    cache.refresh()
+    cache.put_many({nid: driver.neighbors(nid) for nid in ("city_hue", "hotel_1", "hotel_3")})
+    assert set(cache.get_many(["city_hue", "hotel_1", "hotel_2"])) == {"city_hue", "hotel_1"}
+
+    publish_changes(session, ["hotel_1"])  # hotel_1 and the neighborhoods that embed it
+    cache.refresh()
+    assert set(cache.get_many(["city_hue", "hotel_1", "hotel_3"])) == {"hotel_3"}
+    assert seen == [None, {"hotel_1", "city_hue"}]  # first version, then the change set
+
+    snapshot = cache.snapshot()
+    bump_graph_version(session)
+    cache.refresh()
+    cache.put_many({"hotel_3": []}, snapshot)  # read before the new version: not cached
+    report = cache.report()
+    assert report["entries"] == 0 and report["version"] == 2 and report["stale_puts"] == 1
+    assert report["hits"] == 3 and report["misses"] == 3 and report["hit_rate"] == 0.5
+
+def test_shared_tier_and_missed_changes():
+    driver = LocalGraphDriver(NODES)
+    shared = DictTier()
+    writer, reader = make_cache(driver, shared), make_cache(driver, shared)
+    writer.put_many({"hotel_2": driver.neighbors("hotel_2")})
+    assert reader.get_many(["hotel_2"])["hotel_2"][0]["id"] == "city_hue"
+    assert reader.report()["shared_hits"] == 1
+
+    reader.apply({"version": 0, "change_seq": 5, "changes": ["5|hotel_3"]})  # 1-4 were missed
+    assert reader.report()["full_clears"] == 1 and not reader.entries
+
+def test_shared_tier_on_sharded_store():
+    driver = LocalGraphDriver(NODES)
+    urls = [start_background().url for _ in range(2)]
+    writer = make_cache(driver, SharedTier(ShardedStore(urls)))
+    reader = make_cache(driver, SharedTier(ShardedStore(urls)))
+    rows = {nid: driver.neighbors(nid) for nid in ("city_hue", "hotel_1", "hotel_2")}
+    writer.put_many(rows)
+    assert reader.get_many(list(rows)) == rows and reader.report()["shared_hits"] == 3
+    writer.shared.delete([writer.key(nid) for nid in rows])
+    assert writer.shared.get_many([writer.key(nid) for nid in rows]) == {}
+    # a shard that is down reads as misses
+    assert SharedTier(ShardedStore(["redis://127.0.0.1:1"])).get_many(["nb:0:hotel_1"]) == {}
+
+if __name__ == "__main__":
+    print("🧪 Testing graph neighborhood cache...")
+    test_loader_changes_invalidate_precisely()
+    test_shared_tier_and_missed_changes()
+    test_shared_tier_on_sharded_store()
+    print("✅ Graph neighborhood cache test passed!")
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# Checks for batched graph lookups: coalescing, memoization and the local batch query
+import threading
+import time
+from graph_loader import NeighborLoader
+from local_backends import LocalGraphDriver
+
+NODES = [
+    {"id": "city_hanoi", "type": "City", "name": "Hanoi", "connections": []},
+    {"id": "hotel_1", "type": "Hotel", "name": "H1", "connections": [{"relation": "Located_In", "target": "city_hanoi"}]},
+    {"id": "hotel_2", "type": "Hotel", "name": "H2", "connections": [{"relation": "Located_In", "target": "city_hanoi"}]},
+    {"id": "lonely", "type": "Activity", "name": "Solo", "connections": []},
+]
+
+def test_concurrent_lookups_share_batches():
+    driver = LocalGraphDriver(NODES)
+    calls = []
+
+    def run_query(query, params):
+        calls.append(list(params["ids"]))
+        time.sleep(0.01)
+        with driver.session() as session:
+            return session.run(query, params)
+
+    loader = NeighborLoader(run_query, tick_ms=20)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(loader.load_many(["city_hanoi", "hotel_1", "lonely"])))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1 and sorted(calls[0]) == ["city_hanoi", "hotel_1", "lonely"]
+    for r in results:
+        assert [row["id"] for row in r["city_hanoi"]] == ["hotel_1", "hotel_2"]
+        assert r["hotel_1"][0]["relationship"] == "Located_In" and r["lonely"] == []
+    assert loader.report()["coalesced"] == 21
+
+    scope = loader.scope()
+    scope.load_many(["hotel_2"])
+    scope.load_many(["hotel_2", "hotel_1"])
+    assert calls[1:] == [["hotel_2"], ["hotel_1"]]  # memoized within the scope
+
+def test_timeout_returns_partial():
+    loader = NeighborLoader(lambda query, params: time.sleep(0.2) or [], tick_ms=1)
+    start = time.perf_counter()
+    assert loader.load_many(["a"], timeout=0.02) == {}
+    assert time.perf_counter() - start < 0.15
+
+if __name__ == "__main__":
+    print("🧪 Testing batched graph lookups...")
+    test_concurrent_lookups_share_batches()
+    test_timeout_returns_partial()
+    print("✅ Batched graph lookup test passed!")
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+# Checks for the PageRank / degree priors and how they order results
+from graph_priors import GraphPriors, apply_priors
+
+NODES = [
+    {"id": "city_a", "type": "City", "connections": [{"relation": "Connected_To", "target": "city_b"}]},
+    {"id": "city_b", "type": "City", "connections": []},
+    {"id": "hotel_1", "type": "Hotel", "connections": [{"relation": "Located_In", "target": "city_a"}]},
+    {"id": "hotel_2", "type": "Hotel", "connections": [{"relation": "Located_In", "target": "city_a"}]},
+    {"id": "activity_1", "type": "Activity", "connections": [{"relation": "Available_In", "target": "city_b"}]},
+]
+
+def test_hub_ranks_highest():
+    priors = GraphPriors.compute(NODES)
+    assert abs(priors.arrays["pagerank"].sum() - 1.0) < 1e-9
+    assert priors.get("city_a", "degree") == 3
+    assert max(priors.ids, key=lambda i: priors.get(i, "pagerank")) == "city_a"
+    assert priors.get("city_a") == 1.0
+    # seeding on hotels pulls mass towards the city the hotels sit in
+    assert priors.get("city_a", "ppr_hotel") > priors.get("city_b", "ppr_hotel")
+
+def test_priors_break_ties():
+    priors = GraphPriors.compute(NODES)
+    matches = [{"id": "activity_1", "score": 0.5, "metadata": {}}, {"id": "city_a", "score": 0.5, "metadata": {}}]
+    assert [m["id"] for m in apply_priors(matches, priors)] == ["city_a", "activity_1"]
+    assert [m["id"] for m in apply_priors(matches, priors, weight=0)] == ["activity_1", "city_a"]
+
+if __name__ == "__main__":
+    print("🧪 Testing graph priors...")
+    test_hub_ranks_highest()
+    test_priors_break_ties()
+    print("✅ Graph priors test passed!")
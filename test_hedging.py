@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# Checks for hedged vector queries against the local stand-in with injected latency
+import time
+import hedging
+from hedging import HedgedIndex
+
+class SlowFirstIndex:
+    """The first query stalls, later ones answer at once; fails on request."""
+
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+
+    def query(self, **kwargs):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("backend down")
+        if self.calls == 1:
+            time.sleep(0.3)
+        return {"matches": [], "call": self.calls}
+
+    def describe_index_stats(self):
+        return "stats"
+
+def test_hedging_cuts_the_tail():
+    results = hedging.compare(queries=300, base_ms=2.0, jitter_ms=1.0, tail_prob=0.03, tail_ms=60.0)
+    report = results["hedging"]
+    assert results["hedged"]["p99"] < results["plain"]["p99"] / 2
+    assert 0 < report["hedge_rate"] <= hedging.MAX_EXTRA_LOAD and report["hedge_wins"] > 0
+    assert report["hedge_delay_ms"] < 60
+
+def test_hedge_wins_and_load_cap():
+    backend = SlowFirstIndex()
+    index = HedgedIndex(backend, burst=1, max_extra_load=0.0)
+    index.delay_ms = 10.0
+    assert index.query(vector=[1.0], top_k=1)["call"] == 2  # the hedge answered first
+    assert index.stats["hedged"] == 1 and index.stats["hedge_wins"] == 1
+
+    backend.calls = 0
+    start = time.perf_counter()
+    assert index.query(vector=[1.0], top_k=1)["call"] == 1  # no tokens left: wait for the primary
+    assert time.perf_counter() - start >= 0.3 and index.stats["capped"] == 1
+
+    backend.fail = True
+    try:
+        index.query(vector=[1.0], top_k=1)
+        assert False, "backend errors propagate"
+    except RuntimeError:
+        pass
+    assert index.describe_index_stats() == "stats"
+
+if __name__ == "__main__":
+    print("🧪 Testing hedged vector queries...")
+    test_hedging_cuts_the_tail()
+    test_hedge_wins_and_load_cap()
+    print("✅ Hedged vector query test passed!")
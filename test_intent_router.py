@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# Checks that only explicit structural questions are answered from the aggregates
+from aggregates import build_aggregates
+from intent_router import IntentRouter, OPEN, PLACES_IN_CITY, COUNT_IN_CITY, CITY_CONNECTIONS
+
+def small_router():
+    nodes = [
+        {"id": "city_hanoi", "type": "City", "name": "Hanoi", "tags": ["culture"],
+         "connections": [{"relation": "Connected_To", "target": "city_hue"}]},
+        {"id": "city_hue", "type": "City", "name": "Hue", "tags": ["heritage"]},
+        {"id": "city_hcm", "type": "City", "name": "Ho Chi Minh City", "tags": ["urban"]},
+        {"id": "hotel_1", "type": "Hotel", "name": "Lake Hotel", "tags": ["romantic"],
+         "connections": [{"relation": "Located_In", "target": "city_hanoi"}]},
+        {"id": "hotel_2", "type": "Hotel", "name": "Old Quarter Inn", "tags": ["food"],
+         "connections": [{"relation": "Located_In", "target": "city_hanoi"}]},
+        {"id": "hotel_3", "type": "Hotel", "name": "River Hotel", "tags": ["beach"],
+         "connections": [{"relation": "Located_In", "target": "city_hue"}]},
+        {"id": "activity_1", "type": "Activity", "name": "Food Tour", "tags": ["food"],
+         "connections": [{"relation": "Available_In", "target": "city_hue"}]},
+    ]
+    return IntentRouter(build_aggregates(nodes))
+
+def route(router, query):
+    r = router.classify(query)
+    return r["intent"], router.answer(r)
+
+def test_explicit_questions_are_structural():
+    router = small_router()
+    intent, answer = route(router, "What hotels are in Hanoi?")
+    assert intent == PLACES_IN_CITY and answer["answer"].startswith("2 hotels in Hanoi")
+    assert route(router, "Show me hotels in Hanoi")[0] == PLACES_IN_CITY
+    assert route(router, "Which cities are connected to Hanoi?")[0] == CITY_CONNECTIONS
+    intent, answer = route(router, "How many hotels are in Hue?")
+    assert intent == COUNT_IN_CITY and answer["answer"] == "There is 1 hotel in Hue."
+    intent, answer = route(router, "List the activities in Hue")
+    assert answer["answer"].startswith("1 activity in Hue: Food Tour")
+
+def test_open_questions_fall_through():
+    router = small_router()
+    for query in ("Recommend a romantic hotel in Hanoi with a view",
+                  "Is the food good near hotels in Hue?",
+                  "Compare hotels in Hanoi and Hue",
+                  "What is the best hotel in Hanoi?",
+                  "Hotels in Hanoi"):
+        assert route(router, query) == (OPEN, None), query
+
+def test_slots():
+    router = small_router()
+    slots = router.extract_slots("Is the food good near hotels in Ho Chi Minh City or Hue?")
+    assert slots["cities"] == ["city_hcm", "city_hue"] and slots["city"] == "city_hcm"
+    assert slots["type"] == "Hotel" and slots["tags"] == []
+    assert router.extract_slots("which beach hotels are in hue")["tags"] == ["beach"]
+    intent, answer = route(router, "Which beach hotels are in Hue?")
+    assert intent == PLACES_IN_CITY and [m["id"] for m in answer["results"]] == ["hotel_3"]
+
+if __name__ == "__main__":
+    print("🧪 Testing intent routing...")
+    test_explicit_questions_are_structural()
+    test_open_questions_fall_through()
+    test_slots()
+    print("✅ Intent routing test passed!")
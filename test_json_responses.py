@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# Checks for the response layer: compression, ETags, cached payloads and destination paging
+import gzip
+import app_demo
+
+def test_full_dump_is_cached_compressed_and_conditional():
+    client = app_demo.app.test_client()
+    plain = client.get("/api/destinations")
+    assert plain.status_code == 200 and plain.get_json()["total_count"] == len(app_demo.travel_data)
+    zipped = client.get("/api/destinations", headers={"Accept-Encoding": "br;q=0, gzip"})
+    assert zipped.headers["Content-Encoding"] == "gzip" and "Accept-Encoding" in zipped.headers["Vary"]
+    assert gzip.decompress(zipped.data) == plain.data and len(zipped.data) < len(plain.data) / 5
+    assert zipped.headers["ETag"] == plain.headers["ETag"]
+    cached = client.get("/api/destinations", headers={"If-None-Match": plain.headers["ETag"]})
+    assert cached.status_code == 304 and not cached.data
+    assert app_demo.payloads.report()["hits"] >= 2
+
+def test_cursor_pages_and_fields():
+    client = app_demo.app.test_client()
+    ids, cursor = [], None
+    while True:
+        args = {"limit": 100, "fields": "id,name"}
+        if cursor:
+            args["cursor"] = cursor
+        page = client.get("/api/destinations", query_string=args).get_json()
+        assert all(set(item) == {"id", "name"} for item in page["destinations"])
+        ids += [item["id"] for item in page["destinations"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert ids == [item["id"] for item in app_demo.travel_data]
+    for bad in ("fields=bogus", "cursor=nope", "limit=0", "limit=x"):
+        assert client.get(f"/api/destinations?{bad}").status_code == 400
+
+def test_small_and_post_responses_are_not_etagged():
+    client = app_demo.app.test_client()
+    health = client.get("/api/health", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in health.headers  # below the compression threshold
+    assert client.post("/api/chat", json={}).headers.get("ETag") is None
+
+if __name__ == "__main__":
+    print("🧪 Testing JSON response layer...")
+    test_full_dump_is_cached_compressed_and_conditional()
+    test_cursor_pages_and_fields()
+    test_small_and_post_responses_are_not_etagged()
+    print("✅ JSON response layer test passed!")
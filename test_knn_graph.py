@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# Checks that incremental kNN graph updates match a full rebuild
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from knn_graph import KNNGraph, load_knn_graph
+
+def neighbor_sets(graph):
+    return {node_id: {n for n, _ in graph.similar(node_id)} for node_id in graph.ids
+            if graph.alive[graph.positions[node_id]]}
+
+def test_build_excludes_self():
+    rng = np.random.default_rng(0)
+    graph = KNNGraph.build([f"n{i}" for i in range(50)], rng.standard_normal((50, 16)), k=5, block_rows=7)
+    for node_id in graph.ids:
+        hits = graph.similar(node_id)
+        assert len(hits) == 5 and node_id not in {n for n, _ in hits}
+        assert [s for _, s in hits] == sorted((s for _, s in hits), reverse=True)
+
+def test_incremental_matches_rebuild():
+    rng = np.random.default_rng(1)
+    ids = [f"n{i}" for i in range(80)]
+    vectors = rng.standard_normal((80, 16)).astype(np.float32)
+    graph = KNNGraph.build(ids, vectors, k=5, block_rows=16)
+
+    vectors[3] = rng.standard_normal(16)
+    extra = rng.standard_normal((4, 16)).astype(np.float32)
+    graph.upsert(["n3"] + [f"x{i}" for i in range(4)], np.vstack([vectors[3:4], extra]))
+    graph.remove(["n10", "n11"])
+
+    keep = [i for i in range(80) if i not in (10, 11)]
+    fresh = KNNGraph.build([ids[i] for i in keep] + [f"x{i}" for i in range(4)],
+                           np.vstack([vectors[keep], extra]), k=5)
+    assert neighbor_sets(graph) == neighbor_sets(fresh)
+    assert graph.similar("n10") == [] and len(graph) == 82
+    assert "n10" not in graph and "x0" in graph and "missing" not in graph
+
+class HashEncoder:
+    def encode(self, texts, **kwargs):
+        return np.stack([np.random.default_rng(len(t)).standard_normal(8) for t in texts]).astype(np.float32)
+
+def test_stale_file_is_rebuilt():
+    folder = tempfile.mkdtemp()
+    data, path = os.path.join(folder, "nodes.json"), os.path.join(folder, "knn.npz")
+    nodes = [{"id": f"n{i}", "type": "Hotel", "description": "x" * (i + 1)} for i in range(6)]
+    with open(data, "w", encoding="utf-8") as f:
+        json.dump(nodes, f)
+    load_knn_graph(path, data, HashEncoder(), k=2)
+    with open(data, "w", encoding="utf-8") as f:
+        json.dump(nodes + [{"id": "n6", "type": "Hotel", "description": "new"}], f)
+    assert "n6" in load_knn_graph(path, data, HashEncoder(), k=2)
+    assert "n6" in KNNGraph.load(path)
+
+def test_removed_node_is_not_found():
+    os.environ["BLUE_ENIGMA_BACKEND"] = "local"
+    os.environ["BLUE_ENIGMA_LATENCY_SCALE"] = "0"
+    import app
+    node_id = app.knn_graph.live_ids()[0]
+    client = app.app.test_client()
+    assert client.get(f"/api/similar/{node_id}").status_code == 200
+    vector = app.knn_graph.vectors[app.knn_graph.positions[node_id]].copy()
+    app.knn_graph.remove([node_id])
+    try:
+        assert client.get(f"/api/similar/{node_id}").status_code == 404
+    finally:
+        app.knn_graph.upsert([node_id], vector[None, :])
+
+if __name__ == "__main__":
+    print("🧪 Testing kNN graph...")
+    test_build_excludes_self()
+    test_incremental_matches_rebuild()
+    test_stale_file_is_rebuilt()
+    test_removed_node_is_not_found()
+    print("✅ kNN graph test passed!")
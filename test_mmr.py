@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# Checks for MMR selection, the city cap and rerank-aware relevance
+import numpy as np
+from mmr import mmr_select, diversify, mmr_enabled
+
+Q = [1.0, 0.0, 0.0]
+
+def match(mid, vec, city="Hanoi", rerank_score=None):
+    m = {"id": mid, "score": float(np.dot(vec, Q)), "values": vec, "metadata": {"city": city}}
+    if rerank_score is not None:
+        m["rerank_score"] = rerank_score
+    return m
+
+def test_diversity_and_pure_relevance():
+    vecs = [[1.0, 0.1, 0.0], [1.0, 0.11, 0.0], [0.7, 0.0, 0.7]]
+    assert mmr_select(Q, vecs, 2, lambda_mult=1.0) == [0, 1]
+    assert mmr_select(Q, vecs, 2, lambda_mult=0.5) == [0, 2]  # the near-duplicate loses
+    assert mmr_select(Q, [], 3) == [] and mmr_select(Q, vecs, 0) == []
+
+def test_city_cap():
+    matches = [match("a", [1.0, 0.0, 0.0]), match("b", [0.9, 0.1, 0.0]), match("c", [0.5, 0.5, 0.0], "Hue")]
+    assert [m["id"] for m in diversify(Q, matches, 3, lambda_mult=1.0, max_per_city=1)] == ["a", "c"]
+    assert mmr_enabled(1.0, 2) and not mmr_enabled(1.0, None)
+
+def test_rerank_scores_drive_relevance():
+    # vector order says a, b, c; the cross-encoder prefers c, then b
+    matches = [match("c", [0.6, 0.0, 0.8], rerank_score=7.5),
+               match("b", [0.8, 0.6, 0.0], rerank_score=2.0),
+               match("a", [1.0, 0.0, 0.0], rerank_score=-4.0)]
+    assert [m["id"] for m in diversify(Q, matches, 3, lambda_mult=1.0)] == ["c", "b", "a"]
+    assert diversify(Q, matches, 1, lambda_mult=0.7)[0]["id"] == "c"
+    # without rerank scores relevance is cosine to the query
+    plain = [dict(m, rerank_score=None) for m in matches]
+    assert diversify(Q, plain, 1, lambda_mult=1.0)[0]["id"] == "a"
+
+def test_missing_vectors_keep_order():
+    matches = [{"id": "x", "score": 0.9}, match("a", [1.0, 0.0, 0.0])]
+    assert [m["id"] for m in diversify(Q, matches, 1)] == ["x"]
+
+def test_search_validates_lambda():
+    import os
+    os.environ["BLUE_ENIGMA_BACKEND"] = "local"
+    import app
+    client = app.app.test_client()
+    for bad in (1.5, -0.1, "nan"):
+        assert client.post('/api/search', json={"query": "Hanoi", "mmr_lambda": bad}).status_code == 400
+    assert client.post('/api/search', json={"query": "Hanoi", "mmr_lambda": 0.5}).status_code == 200
+
+if __name__ == "__main__":
+    print("🧪 Testing MMR...")
+    test_diversity_and_pure_relevance()
+    test_city_cap()
+    test_rerank_scores_drive_relevance()
+    test_missing_vectors_keep_order()
+    test_search_validates_lambda()
+    print("✅ MMR test passed!")
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# Checks for speculative prefetch: dedup, cancellation, hit rates and pool ranking
+import os
+import threading
+from graph_cache import bump_graph_version
+from prefetch import Prefetcher, prefetch_plan, pool_key, request_pool_key, rank_pool, POOL_K
+
+def test_schedule_take_and_stats():
+    prefetcher = Prefetcher(max_workers=1)
+    assert prefetcher.schedule("s", ("graph", "a"), lambda: [1])
+    prefetcher.executor.shutdown(wait=True)
+    assert not prefetcher.schedule("s", ("graph", "a"), lambda: [2])  # already cached
+    assert prefetcher.take(("graph", "a")) == [1]
+    assert prefetcher.take(("graph", "b")) is None
+    report = prefetcher.report()
+    assert report["hits"] == 1 and report["misses"] == 1
+    assert report["hit_rate"] == 0.5 and report["useful_rate"] == 1.0
+
+def test_cancel_and_saturation():
+    prefetcher = Prefetcher(max_workers=1, max_pending=2)
+    release = threading.Event()
+    prefetcher.schedule("s", ("graph", "slow"), release.wait)
+    prefetcher.schedule("s", ("graph", "queued"), lambda: [])
+    assert not prefetcher.schedule("t", ("graph", "extra"), lambda: [])
+    assert prefetcher.stats["dropped"] == 1
+    assert prefetcher.cancel("s") == 1  # the running job finishes, the queued one is cancelled
+    release.set()
+    prefetcher.executor.shutdown(wait=True)
+    assert prefetcher.take(("graph", "queued")) is None
+    assert prefetcher.report()["pending"] == 0
+
+def test_stale_values_are_dropped():
+    prefetcher = Prefetcher(max_workers=1)
+    prefetcher.schedule("s", ("graph", "a"), lambda: ((1, 0), ["fact"]))
+    prefetcher.executor.shutdown(wait=True)
+    assert prefetcher.take(("graph", "a"), accept=lambda v: v[0] == (2, 0)) is None
+    assert ("graph", "a") not in prefetcher.entries
+    assert prefetcher.stats["stale"] == 1 and prefetcher.stats["misses"] == 1
+
+def test_plan_and_pool_ranking():
+    aggregates = {"city_lookup": {"hue": "city_hue"}, "cities": {"city_hue": {
+        "name": "Hue", "members": {"Hotel": [{"id": "h1"}, {"id": "h2"}], "Activity": []}}}}
+    matches = [{"id": "h1", "metadata": {"type": "Hotel", "city": "Hue"}}]
+    facts = [{"source": "h1", "target_id": "a1"}, {"source": "h1", "target_id": "city_hue"}]
+    nodes, pools = prefetch_plan(matches, facts, aggregates, known=["city_hue"])
+    assert nodes == ["a1", "h2"] and pools == [("city_hue", "Hotel")]
+    assert pool_key("city_hue", "hotel") == ("pool", "city_hue", "Hotel") and pool_key("city_hue", "City") is None
+    lookup = aggregates["city_lookup"]
+    assert request_pool_key({"city": ["Hue"], "type": ["Hotel"]}, lookup) == ("pool", "city_hue", "Hotel")
+    assert request_pool_key({"city": ["Hue"]}, lookup) is None
+    assert request_pool_key(None, lookup) is None
+
+    pool = [{"id": "x", "values": [1.0, 0.0]}, {"id": "y", "values": [0.0, 2.0]}]
+    ranked = rank_pool([0.1, 1.0], pool, 1)
+    assert [m["id"] for m in ranked] == ["y"] and abs(ranked[0]["score"] - 0.995) < 1e-3
+
+def test_session_follow_up_uses_pool():
+    os.environ["BLUE_ENIGMA_BACKEND"] = "local"
+    import app
+    hotels = {m["id"] for m in app.aggregates["cities"]["city_hue"]["members"]["Hotel"]}
+    filters = {"city": ["Hue"], "type": ["Hotel"]}
+    pool = app.filtered_query(app.index, app.encode(["hotels"])[0].tolist(), POOL_K,
+                              filters, app.attr_index, include_values=True)[0]
+    key = pool_key("city_hue", "Hotel")
+
+    # An unfiltered follow-up is narrowed to Hue hotels the same way with and without a
+    # prefetched pool, and never consumes the pool
+    answers = []
+    for prefetched in (False, True):
+        with app.prefetcher.lock:
+            app.prefetcher.entries.pop(key, None)
+            if prefetched:
+                app.prefetcher.entries[key] = {"value": pool, "used": False}
+        session = app.sessions.get()
+        session.last_city = "Hue"
+        result = app.chat_session_turn(session, "Any quiet hotels there?")  # contextualized to Hue
+        assert result["success"] and set(result["sources"]) <= hotels
+        assert result["plan"] == {"filters": filters, "narrowed": True}
+        answers.append(result["sources"])
+    assert answers[0] == answers[1] and not app.prefetcher.entries[key]["used"]
+
+    # Explicit filters are answered from the pool
+    result = app.chat_session_turn(app.sessions.get(), "Any quiet hotels?", filters=filters)
+    assert result["success"] and set(result["sources"]) <= hotels
+    assert result["plan"] == {"filters": filters, "narrowed": False}
+    assert app.prefetcher.entries[key]["used"]
+    # prefetched facts read before a graph version bump are not served
+    warmed = app.prefetch_graph_facts(result["sources"][0])
+    assert app.current_snapshot(warmed)
+    with app.get_neo4j_driver().session() as graph:
+        bump_graph_version(graph)
+    app.graph_cache.refresh(force=True)
+    assert not app.current_snapshot(warmed)
+
+if __name__ == "__main__":
+    print("🧪 Testing speculative prefetch...")
+    test_schedule_take_and_stats()
+    test_cancel_and_saturation()
+    test_stale_values_are_dropped()
+    test_plan_and_pool_ranking()
+    test_session_follow_up_uses_pool()
+    print("✅ Speculative prefetch test passed!")
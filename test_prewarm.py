@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# Checks for startup / scheduled prewarming and readiness gating
+import json
+import os
+import tempfile
+import threading
+from prewarm import Prewarmer, load_queries, DEFAULT_QUERIES
+
+def test_first_pass_gates_readiness():
+    release = threading.Event()
+    calls, encodes = [], []
+
+    def search(query, filters):
+        release.wait(5)
+        calls.append(("search", query))
+        return {"success": True}
+
+    def chat(query, filters):
+        calls.append(("chat", query))
+        raise RuntimeError("LLM unavailable")
+
+    warmer = Prewarmer(search, chat, encode=encodes.append, interval_s=3600)
+    warmer.start()
+    assert not warmer.ready.is_set() and warmer.report()["state"] in ("pending", "warming")
+    release.set()
+    assert warmer.ready.wait(5)
+    warmer.stop()
+    report = warmer.report()
+    assert report["passes"] == 1 and report["failures"] == 4 and len(calls) == len(DEFAULT_QUERIES)
+    assert len(encodes) == 3 and all(r["ok"] == (r["endpoint"] == "search") for r in report["last_run"])
+
+def test_scheduled_pass_adds_trending():
+    path = os.path.join(tempfile.mkdtemp(), "prewarm.jsonl")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("Beach destinations in Vietnam\n" + json.dumps(
+            {"endpoint": "chat", "query": "Food experiences", "filters": {"city": ["Hue"]}}) + "\n")
+    queries = load_queries(path)
+    assert queries[0] == {"endpoint": "search", "query": "Beach destinations in Vietnam", "filters": {}}
+    trending = [{"query": "Beach destinations in Vietnam", "filters": {}, "count": 9},
+                {"query": "hotels in Hoi An", "filters": {}, "count": 4}]
+    warmer = Prewarmer(lambda q, f: {"success": True}, lambda q, f: {"success": True},
+                       queries=queries, trending=lambda n: trending)
+    assert len(warmer.plan(include_trending=False)) == 2
+    assert [q["query"] for q in warmer.run_once(include_trending=True)] == [
+        "Beach destinations in Vietnam", "Food experiences", "hotels in Hoi An"]
+
+if __name__ == "__main__":
+    print("🧪 Testing prewarm and readiness...")
+    test_first_pass_gates_readiness()
+    test_scheduled_pass_adds_trending()
+    print("✅ Prewarm test passed!")
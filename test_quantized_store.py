@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+# Checks that quantized search with rescoring matches exact float32 search
+import tempfile
+
+import numpy as np
+
+from quantized_store import QuantizedVectorStore, hamming_distances, quantize_binary
+
+def test_hamming():
+    a = quantize_binary(np.array([[1.0] * 16], dtype=np.float32))
+    b = quantize_binary(np.array([[1.0] * 8 + [-1.0] * 8], dtype=np.float32))
+    assert hamming_distances(a, b[0]).tolist() == [8]
+
+def test_rescored_search_matches_exact():
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((500, 64)).astype(np.float32)
+    store = QuantizedVectorStore.build([f"n{i}" for i in range(500)], vectors, tempfile.mkdtemp())
+    assert store.memory_report()["binary_bytes_per_vector"] == 8
+    for q in vectors[:10]:
+        exact = [row for row, _ in store.search(q, 5, "float32")]
+        assert [row for row, _ in store.search(q, 5, "int8", rescore_factor=4)] == exact
+        assert store.query(q, 5, "binary", rescore_factor=100)["matches"][0]["id"] == store.ids[exact[0]]
+
+if __name__ == "__main__":
+    print("🧪 Testing quantized vector store...")
+    test_hamming()
+    test_rescored_search_matches_exact()
+    print("✅ Quantized vector store test passed!")
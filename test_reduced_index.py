@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+# Checks for the PCA / truncated reduced-dimension index
+import tempfile
+
+import numpy as np
+
+from reduced_index import ReducedIndex, fit_projection
+
+def test_low_rank_data_is_lossless():
+    rng = np.random.default_rng(1)
+    vectors = rng.standard_normal((300, 8)) @ rng.standard_normal((8, 48))
+    index = ReducedIndex.build([f"n{i}" for i in range(300)], vectors, 8, "pca", tempfile.mkdtemp())
+    assert abs(index.explained_energy() - 1.0) < 1e-4
+    for q in vectors[:10]:
+        exact = index.search(q, 5, rescore_factor=len(index) // 5)
+        assert [row for row, _ in index.search(q, 5, rescore_factor=0)] == [row for row, _ in exact]
+
+def test_truncate_projection():
+    assert fit_projection(np.ones((4, 6), dtype=np.float32), 3, "truncate").shape == (6, 3)
+
+if __name__ == "__main__":
+    print("🧪 Testing reduced-dimension index...")
+    test_low_rank_data_is_lossless()
+    test_truncate_projection()
+    print("✅ Reduced-dimension index test passed!")
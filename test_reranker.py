@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# Checks for the cross-encoder stage: budget fallback, re-probing and stale batches
+import threading
+import time
+
+import reranker
+from reranker import CrossEncoderReranker
+
+class FakeModel:
+    """Scores a pair by the length of its text; sleeps delay_ms per pair."""
+
+    def __init__(self, delay_ms=0.0):
+        self.delay_ms = delay_ms
+        self.release = threading.Event()
+        self.release.set()
+        self.calls = 0
+
+    def predict(self, pairs, batch_size=None):
+        self.calls += 1
+        self.release.wait(5)
+        time.sleep(self.delay_ms * len(pairs) / 1000)
+        return [len(text) for _, text in pairs]
+
+TEXTS = {"a": "a", "b": "bbb", "c": "cc"}
+MATCHES = [{"id": i, "score": 0.5} for i in "abc"]
+
+def test_reranks_and_caches():
+    rr = CrossEncoderReranker(TEXTS, model=FakeModel())
+    ranked, status = rr.rerank("Query", MATCHES, 2)
+    assert status == "reranked" and [m["id"] for m in ranked] == ["b", "c"]
+    assert rr.rerank("query ", MATCHES, 2)[1] == "cached"
+
+def test_slow_estimate_is_reprobed():
+    model = FakeModel()
+    rr = CrossEncoderReranker(TEXTS, model=model, budget_ms=100)
+    rr.ms_per_pair, rr.estimated_at = 500.0, time.monotonic()  # e.g. one cold-start batch
+    assert rr.rerank("q1", MATCHES, 2)[1] == "fallback_budget" and model.calls == 0
+    rr.estimated_at -= reranker.REPROBE_S + 1
+    assert rr.rerank("q2", MATCHES, 2)[1] == "reranked" and rr.stats["probes"] == 1
+    assert rr.ms_per_pair < 500.0 and rr.rerank("q3", MATCHES, 2)[1] == "reranked"
+
+def test_abandoned_batches_do_not_queue():
+    model = FakeModel()
+    rr = CrossEncoderReranker(TEXTS, model=model, budget_ms=50)
+    model.release.clear()  # the first batch hangs past its budget
+    assert rr.rerank("q1", MATCHES, 2)[1] == "fallback_timeout"
+    assert rr.rerank("q2", MATCHES, 2)[1] == "fallback_timeout"  # queued behind it, then stale
+    assert rr.rerank("q3", MATCHES, 2)[1] == "fallback_busy"
+    model.release.set()
+    deadline = time.time() + 5
+    while rr.pending and time.time() < deadline:
+        time.sleep(0.01)
+    assert rr.stats["dropped"] == 1 and model.calls == 1
+    # the hung batch left a huge estimate; the next probe recovers
+    assert rr.rerank("q4", MATCHES, 2)[1] == "fallback_budget"
+    rr.estimated_at -= reranker.REPROBE_S + 1
+    assert rr.rerank("q5", MATCHES, 2)[1] == "reranked"
+
+def test_rerank_flag_is_parsed_strictly():
+    import os
+    os.environ["BLUE_ENIGMA_BACKEND"] = "local"
+    import app
+    assert app.parse_flag("false", True) is False and app.parse_flag(None, True) is True
+    client = app.app.test_client()
+    assert client.post('/api/search', json={"query": "Hanoi", "rerank": "maybe"}).status_code == 400
+    assert client.post('/api/search', json={"query": "Hanoi", "cache": "nope"}).status_code == 400
+
+if __name__ == "__main__":
+    print("🧪 Testing reranker...")
+    test_reranks_and_caches()
+    test_slow_estimate_is_reprobed()
+    test_abandoned_batches_do_not_queue()
+    test_rerank_flag_is_parsed_strictly()
+    print("✅ Reranker test passed!")
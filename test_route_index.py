@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# Checks that incremental route updates match a rebuild and that plans are optimal
+import itertools
+import os
+
+import numpy as np
+
+from route_index import RouteIndex
+
+def ring(n, extra=()):
+    edges = {(i, i + 1): 1.0 for i in range(n - 1)}
+    edges[(0, n - 1)] = 1.0
+    edges.update(extra)
+    ids = [f"city_{i}" for i in range(n)]
+    aliases = {f"town {i}": f"city_{i}" for i in range(n)}
+    return RouteIndex(ids, {c: c.title() for c in ids}, edges, aliases)
+
+def test_paths_and_alternatives():
+    index = ring(6)
+    assert index.path("city_0", "city_3") in (["city_0", "city_1", "city_2", "city_3"],
+                                              ["city_0", "city_5", "city_4", "city_3"])
+    routes = index.alternatives_between("city_0", "city_2", k=2)
+    assert [r["distance"] for r in routes] == [2.0, 4.0]
+    assert index.cities_in("From Town 4 to town 1") == ["city_4", "city_1"]
+
+def test_incremental_matches_rebuild():
+    index = ring(8)
+    index.set_edge("city_0", "city_4", 1.0)
+    index.set_edge("city_2", "city_6", 0.5)
+    index.remove_edge("city_0", "city_1")
+    index.set_edge("city_2", "city_6", 3.0)
+    fresh = RouteIndex(index.city_ids, index.names, index.edges)
+    assert np.allclose(index.dist, fresh.dist)
+    for a, b in itertools.permutations(index.city_ids, 2):
+        path = index.path(a, b)
+        assert path[0] == a and path[-1] == b
+        hops = sum(index.edges[tuple(sorted((index.positions[x], index.positions[y])))]
+                   for x, y in zip(path, path[1:]))
+        assert abs(hops - fresh.distance(a, b)) < 1e-9
+
+def test_plan_is_shortest_order():
+    index = ring(8, extra={(1, 5): 1.0})
+    stops = ["city_0", "city_3", "city_5", "city_7"]
+    plan = index.plan(stops, start="city_0")
+    best = min(sum(index.distance(a, b) for a, b in zip(("city_0",) + p, p))
+               for p in itertools.permutations(stops[1:]))
+    assert plan["stops"][0] == "city_0" and plan["distance"] == best
+    assert index.plan(stops, start="city_0") is plan  # served from the plan cache
+
+def test_routes_only_for_itinerary_questions():
+    index = ring(6)
+    matches = [{"id": "h1", "metadata": {"type": "Hotel", "city": "City_1"}},
+               {"id": "h2", "metadata": {"type": "Hotel", "city": "City_4"}}]
+    assert index.route_for("romantic hotels with a view", matches) is None
+    assert index.route_for("best food in town 1", matches) is None
+    assert index.route_for("Plan a 3 day trip", matches)["stops"] == ["city_1", "city_4"]
+    assert index.route_for("town 2 or town 5?") is None
+    assert index.route_for("Is town 2 or town 5 better for food?", matches) is None
+    assert index.route_for("Route from town 2 to town 5")["stops"] == ["city_2", "city_5"]
+    assert list(index.alternatives) == [(1, 4), (2, 5)]  # Yen runs only for the planned legs
+
+def test_alternatives_reach_the_prompt():
+    index = ring(6)
+    route = index.route_for("Plan a trip from town 0 to town 2")
+    assert route["cities"] == ["city_0", "city_1", "city_2"]
+    assert route["alternatives"] == [{"from": "city_0", "to": "city_2", "routes": [
+        {"distance": 4.0, "cities": ["city_0", "city_5", "city_4", "city_3", "city_2"]}]}]
+    text = index.describe(route)
+    assert text.splitlines()[1] == "Alternative City_0 to City_2: City_0 -> City_5 -> City_4 -> City_3 -> City_2 (distance 4)"
+
+def test_sync_links_matches_rebuild():
+    index = ring(8)
+    assert index.sync_links({"city_0": ["city_4", "city_7"], "city_9": ["city_0"]}) == 2
+    fresh = RouteIndex(index.city_ids, index.names, index.edges)
+    assert (0, 1) not in index.edges and (0, 4) in index.edges
+    assert np.allclose(index.dist, fresh.dist)
+
+def test_change_feed_updates_app_routes():
+    os.environ["BLUE_ENIGMA_BACKEND"] = "local"
+    os.environ["BLUE_ENIGMA_LATENCY_SCALE"] = "0"
+    import app
+    from graph_cache import publish_changes
+    a, b = max(itertools.combinations(app.routes.city_ids, 2), key=lambda p: app.routes.distance(*p))
+    assert app.routes.distance(a, b) > 1
+    driver = app.get_neo4j_driver()
+    driver.adjacency[a].append(("Connected_To", b))
+    driver.adjacency[b].append(("Connected_To", a))
+    try:
+        app.graph_cache.refresh(force=True)  # take up any earlier version first
+        with driver.session() as session:
+            publish_changes(session, [a])
+        app.graph_cache.refresh(force=True)
+        assert app.routes.distance(a, b) == 1
+    finally:
+        driver.adjacency[a].pop()
+        driver.adjacency[b].pop()
+        app.routes.sync_links({a: [o for r, o in driver.adjacency[a] if r == "Connected_To"],
+                               b: [o for r, o in driver.adjacency[b] if r == "Connected_To"]})
+
+if __name__ == "__main__":
+    print("🧪 Testing route index...")
+    test_paths_and_alternatives()
+    test_incremental_matches_rebuild()
+    test_plan_is_shortest_order()
+    test_routes_only_for_itinerary_questions()
+    test_alternatives_reach_the_prompt()
+    test_sync_links_matches_rebuild()
+    test_change_feed_updates_app_routes()
+    print("✅ Route index test passed!")
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# Checks for conversation sessions: context reuse, bounded turns and LRU eviction
+import os
+import sessions
+from deadlines import Deadline, StageCosts
+from sessions import ConversationSession, SessionStore
+
+def match(nid, city="Hue"):
+    return {"id": nid, "score": 0.9, "metadata": {"name": nid, "type": "Hotel", "city": city}}
+
+def fact(nid):
+    return {"source": nid, "rel": "Located_In", "target_id": "city_hue", "target_name": "Hue",
+            "target_desc": "", "labels": ["City"]}
+
+def test_followup_reuses_context():
+    session = ConversationSession("s")
+    assert session.contextualize("romantic hotels") == "romantic hotels"
+    session.add_context([match("h1"), match("h2")], [fact("h1")])
+    session.record_turn("romantic hotels", "...", "answer", ["h1", "h2"])
+
+    assert session.contextualize("what about food there?") == "what about food there? in Hue"
+    assert session.missing_neighborhoods(["h2", "h3"]) == ["h3"]
+    session.add_context([match("h2"), match("h3")], [fact("h3")])
+    new_matches, new_facts, known = session.split_context(["h2", "h3"])
+    assert [m["id"] for m in new_matches] == ["h3"] and known == ["h2"]
+    assert [f["source"] for f in new_facts] == ["h3"]
+
+def test_old_turns_fold_into_summary():
+    session = ConversationSession("s")
+    for i in range(sessions.MAX_TURNS + 2):
+        session.record_turn(f"question {i}", f"message {i}", f"answer {i}", [f"n{i}"])
+    assert len(session.history()) == 2 * sessions.MAX_TURNS
+    assert "question 0" in session.summary and "question 1" in session.summary
+    # n0 was only sent in a folded turn, so it has to be sent again
+    session.add_context([match("n0")], [])
+    assert [m["id"] for m in session.split_context(["n0"])[0]] == ["n0"]
+
+def test_store_evicts_least_recently_used():
+    store = SessionStore(max_sessions=2)
+    a, b = store.get("a"), store.get("b")
+    assert store.get("a") is a
+    store.get("c")
+    assert set(store.sessions) == {"a", "c"} and store.stats["evicted"] == 1
+    assert store.get("b") is not b
+
+def test_skipped_neighborhoods_are_sent_next_turn():
+    os.environ["BLUE_ENIGMA_BACKEND"] = "local"
+    os.environ["BLUE_ENIGMA_LATENCY_SCALE"] = "0"
+    import app
+    session = app.sessions.get()
+    query = "Romantic riverside stay in Hoi An"
+    tight = Deadline(5000, StageCosts({"graph": 1e6, "rerank": 1e6, "llm": 0.0}))
+    first = app.chat_session_turn(session, query, deadline=tight)
+    assert first["success"] and first["context"]["fetched_neighborhoods"] > 0
+    skipped = set(first["sources"])
+    assert not skipped & set(session.sent_in) and not skipped & set(session.facts)
+    second = app.chat_session_turn(session, query)
+    refetched = skipped & set(second["sources"])
+    assert refetched and refetched <= set(session.sent_in)
+    message = session.turns[-1][2]
+    assert "New graph facts" in message
+    assert all(f["target_id"] in message for nid in refetched for f in session.facts[nid][:1])
+
+if __name__ == "__main__":
+    print("🧪 Testing conversation sessions...")
+    test_followup_reuses_context()
+    test_old_turns_fold_into_summary()
+    test_store_evicts_least_recently_used()
+    test_skipped_neighborhoods_are_sent_next_turn()
+    print("✅ Conversation session test passed!")
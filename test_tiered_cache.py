@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# Checks for the two-tier result / embedding cache against local kv_server.py shards
+import threading
+import time
+import numpy as np
+from kv_server import start_background
+from tiered_cache import TieredCache, ShardedStore, HashRing, cached_encoder, dumps, loads
+
+def test_serialization_is_compact_and_exact():
+    vec = np.random.default_rng(0).random(384, dtype=np.float32)
+    blob = dumps(vec)
+    assert len(blob) == 1 + 384 * 4 and np.array_equal(loads(blob), vec)
+    result = {"results": [{"id": f"p{i}", "score": 0.5, "tags": ["beach"] * 5} for i in range(40)]}
+    blob = dumps(result)
+    assert blob[:1] == b"Z" and loads(blob) == result
+
+def test_ring_moves_few_keys():
+    keys = [f"search:{i}" for i in range(2000)]
+    three = HashRing(["a", "b", "c"])
+    four = HashRing(["a", "b", "c", "d"])
+    moved = sum(three.node_for(k) != four.node_for(k) for k in keys)
+    assert moved < len(keys) * 0.4  # only keys claimed by the new shard move
+    assert all(four.node_for(k) == "d" for k in keys if three.node_for(k) != four.node_for(k))
+
+def test_workers_share_l2_and_coalesce():
+    shards = [start_background() for _ in range(2)]
+    urls = [s.url for s in shards]
+    calls = []
+
+    def slow_compute():
+        calls.append(1)
+        time.sleep(0.1)
+        return {"success": True, "answer": 42}
+
+    # two "workers": separate L1s and clients, same shards
+    a, b = TieredCache("t", ShardedStore(urls)), TieredCache("t", ShardedStore(urls))
+    results = []
+    threads = [threading.Thread(target=lambda c=c: results.append(c.get_or_compute("q", slow_compute)))
+               for c in (a, a, b)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1 and all(value == {"success": True, "answer": 42} for value, _ in results)
+    assert {source for _, source in results} == {"computed", "coalesced"}
+
+    b.clear()
+    assert b.get_or_compute("q", slow_compute)[1] == "l2"
+    assert b.get_or_compute("q", slow_compute)[1] == "l1"
+    assert sum(s.store.get(b"lock:" + a.key("q").encode()) is None for s in shards) == 2
+    report = b.report()
+    assert report["l1"]["hits"] == 1 and report["l2"]["hits"] == 1 and report["l2"]["errors"] == 0
+
+    # degraded values stay out of both tiers
+    a.get_or_compute("d", lambda: {"success": False}, cacheable=lambda r: r["success"])
+    assert b.get_or_compute("d", lambda: {"success": True})[1] == "computed"
+
+def test_unreachable_l2_falls_through():
+    cache = TieredCache("emb", ShardedStore(["redis://127.0.0.1:1"]))
+    encode = cached_encoder(lambda texts: np.ones((len(texts), 4), dtype=np.float32), cache)
+    assert encode(["hue", "hue"]).shape == (2, 4)  # batches bypass the cache
+    assert encode(["hue"]).shape == encode(["hue"]).shape == (1, 4)
+    report = cache.report()
+    assert report["computed"] == 1 and report["l1"]["hits"] == 1 and report["l2"]["errors"] >= 1
+
+if __name__ == "__main__":
+    print("🧪 Testing two-tier result cache...")
+    test_serialization_is_compact_and_exact()
+    test_ring_moves_few_keys()
+    test_workers_share_l2_and_coalesce()
+    test_unreachable_l2_falls_through()
+    print("✅ Two-tier result cache test passed!")
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# Checks for W-TinyLFU admission, the decaying sketch and trending queries
+from tinylfu import CountMinSketch, TinyLFUCache, replay, synthetic_trace, COUNTER_MAX
+
+def test_sketch_counts_and_decays():
+    sketch = CountMinSketch(64, sample_size=100)
+    for _ in range(20):
+        sketch.add("Beach destinations in Vietnam")
+    assert sketch.estimate("Beach destinations in Vietnam") == COUNTER_MAX
+    assert sketch.estimate("never asked") <= 1
+    for i in range(80):
+        sketch.add(f"one-off {i}")
+    assert sketch.resets == 1 and sketch.estimate("Beach destinations in Vietnam") == COUNTER_MAX // 2
+
+def test_one_off_scan_does_not_flush_popular_entries():
+    cache = TinyLFUCache(50)
+    popular = [f"popular {i}" for i in range(20)]
+    for _ in range(5):
+        for query in popular:
+            if cache.get(query, label=query) is None:
+                cache.put(query, {"query": query})
+    for i in range(500):
+        query = f"one-off {i}"
+        if cache.get(query, label=query) is None:
+            cache.put(query, {"query": query})
+    assert all(cache.get(query) is not None for query in popular)
+    assert cache.report()["rejected"] > 400
+    trending = [item["key"] for item in cache.trending(5)]
+    assert len(trending) == 5 and all(key.startswith("popular") for key in trending)
+
+def test_replay_beats_lru_on_heavy_tailed_trace():
+    result = replay(synthetic_trace(requests=8000, popular=100), capacity=40)
+    assert result["tinylfu"] > result["lru"]
+
+if __name__ == "__main__":
+    print("🧪 Testing W-TinyLFU cache admission...")
+    test_sketch_counts_and_decays()
+    test_one_off_scan_does_not_flush_popular_entries()
+    test_replay_beats_lru_on_heavy_tailed_trace()
+    print("✅ W-TinyLFU cache admission test passed!")
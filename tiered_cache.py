@@ -0,0 +1,426 @@
+# tiered_cache.py
+# Two-tier cache for query results and embeddings shared by several app.py workers:
+# an in-process LRU (L1) in front of a shared Redis-protocol store (L2) whose keys are
+# spread over several nodes by consistent hashing. kv_server.py is the local stand-in
+# for the L2 nodes; a real Redis works the same way. Values are stored compactly (raw
+# float32 bytes for vectors, orjson + zlib for results), and a worker that misses
+# takes a short lock key on the owning shard so other workers wait for its value
+# instead of computing the same query again.
+import bisect
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+import zlib
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+import numpy as np
+
+from tinylfu import LRUCache
+
+try:
+    import orjson
+except ImportError:  # falls back to the stdlib encoder
+    orjson = None
+
+# -----------------------------
+# Config
+# -----------------------------
+L1_ENTRIES = 2048          # values kept per namespace in process
+L2_TTL_S = 3600            # backstop expiry for shared entries
+L2_URLS = [u.strip() for u in os.environ.get("RESULT_CACHE_URLS", "").split(",") if u.strip()]
+VNODES = 64                # ring points per shard, evens out the key spread
+SOCKET_TIMEOUT_S = 0.05    # the L2 is an optimization: a slow shard counts as a miss
+RETRY_DOWN_S = 5.0         # a shard that failed is skipped for this long
+LOCK_TTL_MS = 5000         # compute lock lifetime, in case its holder dies
+COALESCE_WAIT_S = 2.0      # how long a worker waits for another worker's value
+POLL_S = 0.01
+COMPRESS_OVER = 512        # bytes; smaller JSON payloads are stored uncompressed
+
+# -----------------------------
+# Serialization
+# -----------------------------
+def _to_builtin(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def dumps(value) -> bytes:
+    """Tagged bytes: V = float32 vector, J = JSON, Z = zlib-compressed JSON."""
+    if isinstance(value, np.ndarray):
+        return b"V" + np.ascontiguousarray(value, dtype="<f4").tobytes()
+    if orjson is not None:
+        data = orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY)
+    else:
+        data = json.dumps(value, separators=(",", ":"), default=_to_builtin).encode()
+    if len(data) > COMPRESS_OVER:
+        return b"Z" + zlib.compress(data, 1)
+    return b"J" + data
+
+def loads(blob: bytes):
+    tag, body = blob[:1], blob[1:]
+    if tag == b"V":
+        return np.frombuffer(body, dtype="<f4").copy()
+    if tag == b"Z":
+        body = zlib.decompress(body)
+    return orjson.loads(body) if orjson is not None else json.loads(body)
+
+# -----------------------------
+# L2: sharded Redis-protocol store
+# -----------------------------
+class RespClient:
+    """Minimal Redis-protocol client for one shard (one connection per thread)."""
+
+    def __init__(self, url: str, timeout=SOCKET_TIMEOUT_S):
+        parsed = urlparse(url)
+        self.url = url
+        self.address = (parsed.hostname or "127.0.0.1", parsed.port or 6379)
+        self.timeout = timeout
+        self.local = threading.local()
+        self.down_until = 0.0
+
+    def _connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            sock = socket.create_connection(self.address, timeout=self.timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            conn = self.local.conn = (sock, sock.makefile("rb"))
+        return conn
+
+    def _close(self):
+        conn = getattr(self.local, "conn", None)
+        self.local.conn = None
+        if conn is not None:
+            conn[1].close()
+            conn[0].close()
+
+    def execute(self, *args):
+        return self.pipeline([args])[0]
+
+    def pipeline(self, commands: List[tuple]) -> list:
+        """Send several commands in one write and read their replies in order."""
+        if time.monotonic() < self.down_until:
+            raise ConnectionError(f"{self.url} is marked down")
+        request = []
+        for args in commands:
+            request.append(b"*%d\r\n" % len(args))
+            for arg in args:
+                arg = arg if isinstance(arg, bytes) else str(arg).encode()
+                request.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        try:
+            sock, reader = self._connection()
+            sock.sendall(b"".join(request))
+            return [self._read(reader) for _ in commands]
+        except (OSError, ValueError) as e:
+            self._close()
+            self.down_until = time.monotonic() + RETRY_DOWN_S
+            raise ConnectionError(f"{self.url}: {e}") from e
+
+    def _read(self, reader):
+        line = reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("connection closed")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise RuntimeError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            size = int(rest)
+            return None if size < 0 else reader.read(size + 2)[:-2]
+        if kind == b"*":
+            size = int(rest)
+            return None if size < 0 else [self._read(reader) for _ in range(size)]
+        raise ValueError(f"unexpected reply {line[:20]!r}")
+
+def _hash(text: str) -> int:
+    return int.from_bytes(hashlib.md5(text.encode()).digest()[:8], "big")
+
+class HashRing:
+    """Consistent hashing: adding or removing a shard only moves that shard's keys."""
+
+    def __init__(self, nodes: List[str], vnodes=VNODES):
+        points = sorted((_hash(f"{node}#{i}"), node) for node in nodes for i in range(vnodes))
+        self.hashes = [h for h, _ in points]
+        self.nodes = [node for _, node in points]
+
+    def node_for(self, key: str) -> str:
+        return self.nodes[bisect.bisect(self.hashes, _hash(key)) % len(self.nodes)]
+
+class ShardedStore:
+    """L2 over Redis-protocol nodes; a key and its compute lock live on the same shard."""
+
+    def __init__(self, urls: List[str], ttl_s=L2_TTL_S):
+        self.clients = {url: RespClient(url) for url in urls}
+        self.ring = HashRing(list(self.clients))
+        self.ttl_s = ttl_s
+
+    def client(self, key: str) -> RespClient:
+        return self.clients[self.ring.node_for(key)]
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client(key).execute("GET", key)
+
+    def set(self, key: str, blob: bytes, ttl_s=None):
+        self.client(key).execute("SET", key, blob, "EX", int(ttl_s or self.ttl_s))
+
+    def _by_shard(self, keys) -> Dict[str, list]:
+        shards: Dict[str, list] = {}
+        for key in keys:
+            shards.setdefault(self.ring.node_for(key), []).append(key)
+        return shards
+
+    def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        """One MGET per shard; keys on a shard that is down count as missing."""
+        found = {}
+        for url, shard_keys in self._by_shard(keys).items():
+            try:
+                blobs = self.clients[url].execute("MGET", *shard_keys)
+            except ConnectionError:
+                continue
+            found.update((k, b) for k, b in zip(shard_keys, blobs) if b is not None)
+        return found
+
+    def set_many(self, items: Dict[str, bytes], ttl_s=None):
+        ttl = int(ttl_s or self.ttl_s)
+        for url, shard_keys in self._by_shard(items).items():
+            self.clients[url].pipeline([("SET", k, items[k], "EX", ttl) for k in shard_keys])
+
+    def delete(self, keys: List[str]):
+        for url, shard_keys in self._by_shard(keys).items():
+            self.clients[url].execute("DEL", *shard_keys)
+
+    def lock(self, key: str, token: str, ttl_ms=LOCK_TTL_MS) -> bool:
+        return self.client(key).execute("SET", f"lock:{key}", token, "PX", ttl_ms, "NX") == "OK"
+
+    def locked(self, key: str) -> bool:
+        return self.client(key).execute("EXISTS", f"lock:{key}") == 1
+
+    def unlock(self, key: str, token: str):
+        client = self.client(key)
+        if client.execute("GET", f"lock:{key}") == token.encode():
+            client.execute("DEL", f"lock:{key}")
+
+    def ping(self) -> Dict[str, bool]:
+        status = {}
+        for url, client in self.clients.items():
+            try:
+                status[url] = client.execute("PING") == "PONG"
+            except Exception:
+                status[url] = False
+        return status
+
+def shared_store_from_env() -> Optional[ShardedStore]:
+    if not L2_URLS:
+        return None
+    store = ShardedStore(L2_URLS)
+    status = store.ping()
+    up = sum(status.values())
+    if up:
+        print(f"✅ Shared result cache: {up}/{len(status)} shards reachable")
+    else:
+        print("⚠️ Shared result cache unreachable; misses fall through until the shards come up")
+    return store
+
+# -----------------------------
+# Two-tier cache
+# -----------------------------
+class TieredCache:
+    """One namespace of cached values: in-process LRU, then the shared store, then compute.
+
+    Concurrent misses for one key are coalesced twice: threads of this worker share one
+    in-flight computation, and workers share one through a lock key on the L2 shard.
+    """
+
+    def __init__(self, namespace: str, l2: Optional[ShardedStore] = None, l1=None,
+                 ttl_s=L2_TTL_S, wait_s=COALESCE_WAIT_S):
+        self.namespace = namespace
+        self.l2 = l2
+        self.l1 = l1 if l1 is not None else LRUCache(L1_ENTRIES)  # or tinylfu.TinyLFUCache
+        self.ttl_s = ttl_s
+        self.wait_s = wait_s
+        self.flights: Dict[str, Future] = {}
+        self.lock = threading.Lock()
+        self.stats = {"l1_hits": 0, "l1_misses": 0, "l2_hits": 0, "l2_misses": 0, "l2_errors": 0,
+                      "l2_ms": 0.0, "l2_bytes_written": 0, "computed": 0, "uncacheable": 0,
+                      "coalesced_local": 0, "coalesced_remote": 0}
+
+    def key(self, parts) -> str:
+        raw = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+        return f"{self.namespace}:{hashlib.sha1(raw.encode()).hexdigest()}"
+
+    def _count(self, stat: str, amount=1):
+        with self.lock:
+            self.stats[stat] += amount
+
+    def _l2(self, method: str, *args):
+        """Call the shared store; errors count as misses, never fail the request."""
+        start = time.perf_counter()
+        try:
+            return getattr(self.l2, method)(*args)
+        except Exception:
+            self._count("l2_errors")
+            return None
+        finally:
+            self._count("l2_ms", (time.perf_counter() - start) * 1000)
+
+    def get_or_compute(self, parts, compute: Callable[[], object],
+                       cacheable: Optional[Callable[[object], bool]] = None):
+        """(value, source) with source one of l1, l2, coalesced, computed.
+
+        `cacheable(value)` False keeps a value out of both tiers (e.g. degraded results).
+        """
+        key = self.key(parts)
+        with self.lock:
+            value = self.l1.get(key, label=parts)
+            if value is not None:
+                self.stats["l1_hits"] += 1
+                return value, "l1"
+            self.stats["l1_misses"] += 1
+            flight = self.flights.get(key)
+            leads = flight is None
+            if leads:
+                flight = self.flights[key] = Future()
+            else:
+                self.stats["coalesced_local"] += 1
+        if not leads:
+            try:
+                return flight.result(timeout=self.wait_s), "coalesced"
+            except Exception:
+                return self._compute(key, compute, cacheable), "computed"
+        try:
+            value, source = self._load(key, compute, cacheable)
+            flight.set_result(value)
+            return value, source
+        except Exception as e:
+            flight.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                self.flights.pop(key, None)
+
+    def get(self, parts):
+        """(value, "l1" | "l2") without computing on a miss; (None, None) when absent."""
+        key = self.key(parts)
+        with self.lock:
+            value = self.l1.get(key, label=parts)
+            self.stats["l1_hits" if value is not None else "l1_misses"] += 1
+        if value is not None:
+            return value, "l1"
+        if self.l2 is None:
+            return None, None
+        blob = self._l2("get", key)
+        if blob is None:
+            self._count("l2_misses")
+            return None, None
+        self._count("l2_hits")
+        value = loads(blob)
+        self._l1_put(key, value)
+        return value, "l2"
+
+    def put(self, parts, value):
+        """Store a value computed outside get_or_compute (e.g. assembled from a stream)."""
+        self._store(self.key(parts), value)
+
+    def _load(self, key: str, compute, cacheable):
+        if self.l2 is None:
+            return self._compute(key, compute, cacheable), "computed"
+        blob = self._l2("get", key)
+        if blob is not None:
+            self._count("l2_hits")
+            value = loads(blob)
+            self._l1_put(key, value)
+            return value, "l2"
+        self._count("l2_misses")
+        token = uuid.uuid4().hex
+        locked = self._l2("lock", key, token)
+        if locked is False:
+            # another worker is computing it: wait for its value
+            value = self._wait_for_peer(key)
+            if value is not None:
+                self._count("coalesced_remote")
+                return value, "coalesced"
+        try:
+            return self._compute(key, compute, cacheable), "computed"
+        finally:
+            if locked:
+                self._l2("unlock", key, token)
+
+    def _wait_for_peer(self, key: str):
+        give_up = time.monotonic() + self.wait_s
+        while time.monotonic() < give_up:
+            time.sleep(POLL_S)
+            blob = self._l2("get", key)
+            if blob is not None:
+                value = loads(blob)
+                self._l1_put(key, value)
+                return value
+            if not self._l2("locked", key):
+                return None  # the peer finished without a cacheable value
+        return None
+
+    def _compute(self, key: str, compute, cacheable):
+        value = compute()
+        self._count("computed")
+        if cacheable is not None and not cacheable(value):
+            self._count("uncacheable")
+            return value
+        self._store(key, value)
+        return value
+
+    def _store(self, key: str, value):
+        self._l1_put(key, value)
+        if self.l2 is not None:
+            blob = dumps(value)
+            self._l2("set", key, blob, self.ttl_s)
+            self._count("l2_bytes_written", len(blob))
+
+    def _l1_put(self, key: str, value):
+        with self.lock:
+            self.l1.put(key, value)
+
+    def trending(self, n=10) -> list:
+        """Most requested keys (as the `parts` they were looked up with) if the L1 tracks them."""
+        with self.lock:
+            return self.l1.trending(n) if hasattr(self.l1, "trending") else []
+
+    def clear(self):
+        """Drop the in-process tier (shared entries expire on their own)."""
+        with self.lock:
+            self.l1.clear()
+
+    def report(self) -> dict:
+        with self.lock:
+            s = dict(self.stats)
+            entries, l1_report = len(self.l1), self.l1.report()
+        l1_lookups = s["l1_hits"] + s["l1_misses"]
+        l2_lookups = s["l2_hits"] + s["l2_misses"]
+        return {
+            "l1": dict(l1_report, hits=s["l1_hits"], misses=s["l1_misses"], entries=entries,
+                       hit_rate=round(s["l1_hits"] / l1_lookups, 4) if l1_lookups else 0.0),
+            "l2": {"enabled": self.l2 is not None, "hits": s["l2_hits"], "misses": s["l2_misses"],
+                   "errors": s["l2_errors"], "bytes_written": s["l2_bytes_written"],
+                   "hit_rate": round(s["l2_hits"] / l2_lookups, 4) if l2_lookups else 0.0,
+                   "ms_per_lookup": round(s["l2_ms"] / max(l2_lookups, 1), 3)},
+            "computed": s["computed"], "uncacheable": s["uncacheable"],
+            "coalesced_local": s["coalesced_local"], "coalesced_remote": s["coalesced_remote"],
+            "hit_rate": round((s["l1_hits"] + s["l2_hits"]) / l1_lookups, 4) if l1_lookups else 0.0,
+        }
+
+def cached_encoder(encode: Callable, cache: TieredCache) -> Callable:
+    """Wrap model.encode so single-query calls go through `cache`; batches encode directly."""
+    def encode_cached(texts, **kwargs):
+        if kwargs or isinstance(texts, str) or len(texts) != 1:
+            return encode(texts, **kwargs)
+        vector, _ = cache.get_or_compute(texts[0], lambda: np.asarray(encode(texts)[0], dtype=np.float32))
+        return vector[None, :]
+    return encode_cached
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# tinylfu.py
+# Frequency-aware admission for the in-process caches. Query traffic is heavy-tailed:
+# a few suggestion-chip queries dominate, plus a long tail of one-off questions that
+# flushes a plain LRU. W-TinyLFU keeps a small LRU window for new keys; a key leaving
+# the window only enters the main cache if a decaying count-min sketch says it is
+# asked for more often than the entry it would evict. The sketch also tracks the
+# currently most frequent queries, which the prewarmer can replay.
+#
+# python tinylfu.py --trace queries.jsonl --capacity 100   (hit rate vs plain LRU)
+import argparse
+import hashlib
+import heapq
+import json
+import random
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional
+
+# -----------------------------
+# Config
+# -----------------------------
+SKETCH_DEPTH = 4
+WIDTH_FACTOR = 4           # sketch counters per row, per cache entry
+COUNTER_MAX = 15           # 4-bit counters, as in the TinyLFU paper
+SAMPLE_FACTOR = 10         # counters are halved every capacity * SAMPLE_FACTOR accesses
+WINDOW_PCT = 0.01          # share of the capacity kept as the LRU admission window
+TRENDING_SIZE = 32         # most frequent keys tracked for prewarming
+HALVE = bytes(i >> 1 for i in range(256))
+
+class CountMinSketch:
+    """Approximate access counts with periodic halving, so old popularity fades."""
+
+    def __init__(self, width: int, depth=SKETCH_DEPTH, sample_size: Optional[int] = None):
+        self.width = max(16, int(width))
+        self.depth = depth
+        self.rows = [bytearray(self.width) for _ in range(depth)]
+        self.sample_size = sample_size or self.width * SAMPLE_FACTOR // WIDTH_FACTOR
+        self.additions = 0
+        self.resets = 0
+
+    def _columns(self, key: Hashable) -> List[int]:
+        digest = hashlib.md5(repr(key).encode()).digest()
+        return [int.from_bytes(digest[4 * i:4 * i + 4], "little") % self.width for i in range(self.depth)]
+
+    def estimate(self, key: Hashable) -> int:
+        return min(row[col] for row, col in zip(self.rows, self._columns(key)))
+
+    def add(self, key: Hashable) -> int:
+        """Count one access (conservative update: only the smallest counters grow)."""
+        cols = self._columns(key)
+        low = min(row[col] for row, col in zip(self.rows, cols))
+        if low < COUNTER_MAX:
+            for row, col in zip(self.rows, cols):
+                if row[col] == low:
+                    row[col] += 1
+            low += 1
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self.rows = [bytearray(row.translate(HALVE)) for row in self.rows]
+            self.additions //= 2
+            self.resets += 1
+        return low
+
+class LRUCache:
+    """Plain LRU with the same interface as TinyLFUCache (callers hold their own lock)."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.entries: "OrderedDict[Hashable, object]" = OrderedDict()
+
+    def get(self, key: Hashable, label=None):
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def report(self) -> dict:
+        return {"policy": "lru", "capacity": self.capacity}
+
+class TinyLFUCache:
+    """W-TinyLFU: an LRU window, then a main LRU guarded by sketch-based admission.
+
+    `label` passed to get() is what trending() reports for a key (e.g. the raw
+    query parameters behind a hashed cache key). Values must not be None.
+    """
+
+    def __init__(self, capacity: int, window_pct=WINDOW_PCT, trending_size=TRENDING_SIZE):
+        self.capacity = capacity
+        self.window_size = max(1, int(capacity * window_pct))
+        self.main_size = max(1, capacity - self.window_size)
+        self.window: "OrderedDict[Hashable, object]" = OrderedDict()
+        self.main: "OrderedDict[Hashable, object]" = OrderedDict()
+        self.sketch = CountMinSketch(capacity * WIDTH_FACTOR, sample_size=max(capacity, 16) * SAMPLE_FACTOR)
+        self.trending_size = trending_size
+        self.hot: Dict[Hashable, object] = {}    # key -> label of the most frequent keys
+        self.hot_floor = (0, 0)                  # (count of the coldest hot key, sketch resets)
+        self.stats = {"admitted": 0, "rejected": 0}
+
+    def get(self, key: Hashable, label=None):
+        count = self.sketch.add(key)
+        self._track(key, label, count)
+        for segment in (self.window, self.main):
+            value = segment.get(key)
+            if value is not None:
+                segment.move_to_end(key)
+                return value
+        return None
+
+    def put(self, key: Hashable, value):
+        if key in self.main:
+            self.main[key] = value
+            self.main.move_to_end(key)
+            return
+        self.window[key] = value
+        self.window.move_to_end(key)
+        if len(self.window) > self.window_size:
+            self._admit(*self.window.popitem(last=False))
+
+    def _admit(self, key: Hashable, value):
+        if len(self.main) < self.main_size:
+            self.main[key] = value
+            return
+        victim = next(iter(self.main))
+        if self.sketch.estimate(key) > self.sketch.estimate(victim):
+            del self.main[victim]
+            self.main[key] = value
+            self.stats["admitted"] += 1
+        else:
+            self.stats["rejected"] += 1
+
+    def _track(self, key: Hashable, label, count: int):
+        if key in self.hot or label is None:
+            return
+        if len(self.hot) < self.trending_size:
+            self.hot[key] = label
+            return
+        floor, resets = self.hot_floor
+        if count <= floor and resets == self.sketch.resets:
+            return  # colder than every tracked key (cached until the sketch decays)
+        coldest = min(self.hot, key=self.sketch.estimate)
+        floor = self.sketch.estimate(coldest)
+        if count > floor:
+            del self.hot[coldest]
+            self.hot[key] = label
+            floor = min(self.sketch.estimate(k) for k in self.hot)
+        self.hot_floor = (floor, self.sketch.resets)
+
+    def trending(self, n=10) -> List[dict]:
+        """Most frequently requested keys right now, with their decayed counts."""
+        counts = [(self.sketch.estimate(key), key) for key in self.hot]
+        top = heapq.nlargest(n, counts, key=lambda item: item[0])
+        return [{"key": self.hot[key], "count": count} for count, key in top if count > 0]
+
+    def clear(self):
+        self.window.clear()
+        self.main.clear()
+
+    def __len__(self):
+        return len(self.window) + len(self.main)
+
+    def report(self) -> dict:
+        return dict(self.stats, policy="w-tinylfu", capacity=self.capacity,
+                    window=len(self.window), sketch_resets=self.sketch.resets)
+
+# -----------------------------
+# Trace replay
+# -----------------------------
+def hit_rate(cache, trace: List[str]) -> float:
+    hits = 0
+    for query in trace:
+        if cache.get(query, label=query) is not None:
+            hits += 1
+        else:
+            cache.put(query, True)
+    return round(hits / len(trace), 4) if trace else 0.0
+
+def replay(trace: List[str], capacity: int) -> dict:
+    return {"requests": len(trace), "unique": len(set(trace)), "capacity": capacity,
+            "lru": hit_rate(LRUCache(capacity), trace),
+            "tinylfu": hit_rate(TinyLFUCache(capacity), trace)}
+
+def synthetic_trace(requests=50000, popular=200, zipf_s=1.0, one_off_share=0.5, seed=0) -> List[str]:
+    """Zipf-distributed repeat queries mixed with queries that are never asked again."""
+    rng = random.Random(seed)
+    weights = [1 / (rank ** zipf_s) for rank in range(1, popular + 1)]
+    trace = []
+    for i in range(requests):
+        if rng.random() < one_off_share:
+            trace.append(f"one-off question {i}")
+        else:
+            trace.append(f"popular query {rng.choices(range(popular), weights)[0]}")
+    return trace
+
+def load_trace(path: str) -> List[str]:
+    """One query per line, or JSONL objects with a "query" field (app.py's QUERY_TRACE_FILE)."""
+    trace = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                trace.append(json.loads(line)["query"] if line.startswith("{") else line)
+    return trace
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a query trace through LRU and W-TinyLFU")
+    parser.add_argument("--trace", help="Query trace (default: synthetic heavy-tailed trace)")
+    parser.add_argument("--capacity", type=int, default=100)
+    args = parser.parse_args()
+    trace = load_trace(args.trace) if args.trace else synthetic_trace()
+    result = replay(trace, args.capacity)
+    print(f"📊 {result['requests']} requests, {result['unique']} unique, capacity {result['capacity']}")
+    print(f"   LRU hit rate:       {result['lru']:.2%}")
+    print(f"   W-TinyLFU hit rate: {result['tinylfu']:.2%}")